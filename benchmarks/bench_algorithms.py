@@ -0,0 +1,66 @@
+"""
+Signing algorithm benchmark.
+
+Encodes and decodes access-token sized payloads with HS256, RS256, ES256 and
+EdDSA, once passing PEM/secret keys straight to PyJWT (the key is parsed on
+every call) and once through a KeyRing holding the parsed key objects.
+Reports operations per second for each combination. Parsing an RSA private
+key is slow enough that the PEM runs use fewer iterations.
+
+    python benchmarks/bench_algorithms.py --iterations 2000 --pem-iterations 100
+"""
+import argparse
+import time
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from fastapi_jwtauth.jwtauth.core import KeyRing
+
+
+def pem_pair(private_key):
+    private_pem = private_key.private_bytes(serialization.Encoding.PEM,
+                                            serialization.PrivateFormat.PKCS8,
+                                            serialization.NoEncryption())
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                       serialization.PublicFormat.SubjectPublicKeyInfo)
+    return private_pem, public_pem
+
+
+def rate(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--pem-iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    secret = b"benchmark-secret-key-of-32-bytes!"
+    keys = {"HS256": (secret, secret),
+            "RS256": pem_pair(rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+            "ES256": pem_pair(ec.generate_private_key(ec.SECP256R1())),
+            "EdDSA": pem_pair(ed25519.Ed25519PrivateKey.generate())}
+    payload = {"sub": "bench", "iss": "bench", "role": "user",
+               "iat": int(time.time()), "exp": int(time.time()) + 900}
+
+    print(f"{'algorithm':<10}{'mode':<9}{'encode/s':>12}{'decode/s':>12}")
+    for algorithm, (private_key, public_key) in keys.items():
+        token = jwt.encode(payload, private_key, algorithm=algorithm)
+        raw_encode = rate(lambda: jwt.encode(payload, private_key, algorithm=algorithm), args.pem_iterations)
+        raw_decode = rate(lambda: jwt.decode(token, public_key, algorithms=[algorithm]), args.pem_iterations)
+        print(f"{algorithm:<10}{'pem':<9}{raw_encode:>12.0f}{raw_decode:>12.0f}")
+
+        ring = KeyRing(algorithm)
+        ring.add_key("bench", private_key)
+        ring_token = ring.encode(payload)
+        ring_encode = rate(lambda: ring.encode(payload), args.iterations)
+        ring_decode = rate(lambda: ring.decode(ring_token), args.iterations)
+        print(f"{algorithm:<10}{'keyring':<9}{ring_encode:>12.0f}{ring_decode:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
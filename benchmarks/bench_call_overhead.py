@@ -0,0 +1,52 @@
+"""
+Argument validation overhead benchmark.
+
+Times JWTAuthHandler.jwt_token_validate on a cached token (so the call body is
+small) wrapped the old way with pydantic's deprecated @validate_arguments,
+with the @validate_call validator compiled at import time, and through the
+trusted fast path that skips argument validation. Reports microseconds per
+call and the overhead over the undecorated method.
+
+    python benchmarks/bench_call_overhead.py --calls 100000
+"""
+import argparse
+import timeit
+import types
+import warnings
+from fastapi_jwtauth.jwtauth.core import TokenCache
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from pydantic import validate_arguments
+
+    secret = "benchmark-secret-key-of-32-bytes!"
+    raw = JWTAuthHandler.jwt_token_validate.raw_function
+    handlers = {"undecorated": JWTAuthHandler(secret, "HS256", token_cache=TokenCache()),
+                "validate_arguments": JWTAuthHandler(secret, "HS256", token_cache=TokenCache()),
+                "validate_call": JWTAuthHandler(secret, "HS256", token_cache=TokenCache()),
+                "trusted": JWTAuthHandler(secret, "HS256", token_cache=TokenCache(), trusted_validate=True)}
+    handlers["undecorated"].jwt_token_validate = types.MethodType(raw, handlers["undecorated"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        legacy = validate_arguments(raw)
+    handlers["validate_arguments"].jwt_token_validate = types.MethodType(legacy, handlers["validate_arguments"])
+
+    token = handlers["undecorated"].keyring.encode({"sub": "bench"})
+    baseline = None
+    print(f"{'mode':<20}{'us/call':>10}{'overhead us':>13}")
+    for mode, handler in handlers.items():
+        assert handler.jwt_token_validate(token) is True
+        per_call = timeit.timeit(lambda: handler.jwt_token_validate(token), number=args.calls) / args.calls * 1e6
+        baseline = per_call if baseline is None else baseline
+        print(f"{mode:<20}{per_call:>10.2f}{per_call - baseline:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
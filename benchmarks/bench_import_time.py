@@ -0,0 +1,58 @@
+"""
+Import time benchmark.
+
+Starts a fresh interpreter per run and times importing each entry point: the
+validate-only TokenValidator, JWTAuthHandler, and the handler plus the
+services after configure_db. Reports the median wall time in milliseconds and
+which heavy dependencies each entry point loaded (cryptography imports bcrypt
+itself, for SSH keys, whenever bcrypt is installed).
+
+    python benchmarks/bench_import_time.py --runs 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = {
+    "validate-only": "from fastapi_jwtauth.jwtauth.core.validation import TokenValidator",
+    "handler": "from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler",
+    "handler+services": (
+        "from sqlalchemy.orm import declarative_base, sessionmaker\n"
+        "from fastapi_jwtauth.jwtauth.config import configure_db\n"
+        "configure_db(declarative_base(), sessionmaker())\n"
+        "from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler\n"
+        "from fastapi_jwtauth.jwtauth.services import get_user"),
+}
+HEAVY_MODULES = ("sqlalchemy", "bcrypt", "pydantic", "jwt", "starlette")
+
+TEMPLATE = """
+import json, sys, time
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(code, runs):
+    script = TEMPLATE.format(code=code, heavy=HEAVY_MODULES)
+    results = [json.loads(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                         check=True).stdout) for _ in range(runs)]
+    return statistics.median(result["ms"] for result in results), results[0]["loaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'entry point':<18}{'median ms':>10}  loaded")
+    for name, code in ENTRY_POINTS.items():
+        median, loaded = measure(code, args.runs)
+        print(f"{name:<18}{median:>10.1f}  {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
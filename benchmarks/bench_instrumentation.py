@@ -0,0 +1,60 @@
+"""
+Instrumentation overhead benchmark.
+
+Measures token validation and login throughput of JWTAuthHandler with the
+default (disabled) instrumentation and with a MetricsRegistry, and prints the
+per-call overhead of recording metrics.
+
+    python benchmarks/bench_instrumentation.py --validations 100000 --logins 50
+"""
+import argparse
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from fastapi_jwtauth.jwtauth.config import configure_db
+from fastapi_jwtauth.jwtauth.core import MetricsRegistry, configure_instrumentation
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--validations", type=int, default=100000)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    Base.metadata.create_all(bind=engine)
+
+    from fastapi_jwtauth.jwtauth.services import create_user
+    from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+    create_user({"username": "bench", "password": "password", "email": "bench@example.com",
+                 "firstname": "Bench", "lastname": "User"})
+    handler = JWTAuthHandler("benchmark-secret-key-of-32-bytes!", "HS256", 15, 30, trusted_validate=True)
+    token = handler.jwt_generate_token("bench", "password")["access_token"]
+
+    results = {}
+    for name, instrumentation in (("disabled", None), ("registry", MetricsRegistry())):
+        configure_instrumentation(instrumentation)
+        results[name] = (per_call(lambda: handler.jwt_token_validate(token), args.validations),
+                         per_call(lambda: handler.jwt_generate_token("bench", "password"), args.logins))
+    configure_instrumentation(None)
+
+    print(f"{'variant':<10} {'validate us':>12} {'login ms':>10}")
+    for name, (validate, login) in results.items():
+        print(f"{name:<10} {validate * 1e6:>12.2f} {login * 1e3:>10.2f}")
+    print(f"overhead   {(results['registry'][0] - results['disabled'][0]) * 1e6:>12.2f} "
+          f"{(results['registry'][1] - results['disabled'][1]) * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Auth lifecycle load test.
+
+Runs register, login, validate, refresh and logout for --users users through
+JWTAuthHandler, one phase after the other, each phase spread over
+--concurrency threads. For every phase it reports throughput, p50/p99
+latency, errors, SQL statements per operation and password hash calls per
+operation.
+
+The default database is a temporary SQLite file. Point --database-url at a
+local PostgreSQL (or a wire-compatible stand-in such as CockroachDB) to
+measure a server database; the tables are created if missing and the
+benchmark users are deleted afterwards.
+
+--json writes the results to a file ("-" for stdout). --baseline compares them
+with an earlier --json file and exits with status 1 if a phase lost more than
+--max-regression of its throughput, got that much slower at p99, or issues
+more queries or hash calls per operation.
+
+    python benchmarks/bench_lifecycle.py --users 200 --concurrency 8 --json results.json
+    python benchmarks/bench_lifecycle.py --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi_jwtauth.jwtauth.config import configure_db
+from fastapi_jwtauth.jwtauth.core import BcryptHasher, PasswordHasher, configure_password_hasher
+
+PHASES = ("register", "login", "validate", "refresh", "logout")
+
+
+class Counters:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.hashes = 0
+
+    def add(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def take(self):
+        with self._lock:
+            values = self.queries, self.hashes
+            self.queries = self.hashes = 0
+            return values
+
+
+class CountingHasher(PasswordHasher):
+    """Delegates to another hasher and counts hash and verify calls."""
+
+    def __init__(self, hasher: PasswordHasher, counters: Counters) -> None:
+        self.hasher = hasher
+        self.counters = counters
+        self.scheme = hasher.scheme
+        self.prefixes = hasher.prefixes
+
+    def hash(self, password):
+        self.counters.add("hashes")
+        return self.hasher.hash(password)
+
+    def verify(self, password, hashed):
+        self.counters.add("hashes")
+        return self.hasher.verify(password, hashed)
+
+    def needs_rehash(self, hashed):
+        return self.hasher.needs_rehash(hashed)
+
+
+def run_phase(name, operation, items, concurrency, counters):
+    counters.take()
+    latencies = []
+    errors = 0
+
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            operation(item)
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for seconds, ok in executor.map(timed, items):
+            latencies.append(seconds * 1000)
+            errors += not ok
+    elapsed = time.perf_counter() - started
+    queries, hashes = counters.take()
+    latencies.sort()
+    count = len(latencies)
+    return {"phase": name,
+            "operations": count,
+            "errors": errors,
+            "ops_per_second": count / elapsed if elapsed else 0.0,
+            "p50_ms": statistics.median(latencies) if latencies else 0.0,
+            "p99_ms": latencies[max(int(count * 0.99) - 1, 0)] if latencies else 0.0,
+            "queries_per_op": queries / count if count else 0.0,
+            "hashes_per_op": hashes / count if count else 0.0}
+
+
+def compare(results, baseline, max_regression):
+    """Return a list of regressions of `results` against `baseline`."""
+    previous = {phase["phase"]: phase for phase in baseline["phases"]}
+    regressions = []
+    for phase in results["phases"]:
+        old = previous.get(phase["phase"])
+        if old is None:
+            continue
+        name = phase["phase"]
+        if phase["ops_per_second"] < old["ops_per_second"] * (1 - max_regression):
+            regressions.append(f"{name}: {phase['ops_per_second']:.0f} ops/s, was {old['ops_per_second']:.0f}")
+        if phase["p99_ms"] > old["p99_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p99 {phase['p99_ms']:.2f} ms, was {old['p99_ms']:.2f}")
+        for metric in ("queries_per_op", "hashes_per_op"):
+            if phase[metric] > old[metric] + 1e-9:
+                regressions.append(f"{name}: {metric} {phase[metric]:.2f}, was {old[metric]:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--validations", type=int, default=20, help="validate calls per user")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--json", help="write the results to this file, - for stdout")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'lifecycle.db')}"
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.concurrency, max_overflow=0)
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    Base.metadata.create_all(bind=engine)
+
+    from fastapi_jwtauth.jwtauth.models import JwtTokens, Users
+    from fastapi_jwtauth.jwtauth.services import create_user
+    from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+    counters = Counters()
+    event.listen(engine, "before_cursor_execute", lambda *_: counters.add("queries"))
+    configure_password_hasher(CountingHasher(BcryptHasher(rounds=args.bcrypt_rounds), counters))
+    handler = JWTAuthHandler("benchmark-secret-key-of-32-bytes!", "HS256", 15, 30)
+
+    prefix = f"lifecycle-{os.getpid()}-"
+    usernames = [f"{prefix}{i}" for i in range(args.users)]
+    tokens = {}
+
+    def register(username):
+        create_user({"username": username, "password": "password", "email": f"{username}@example.com",
+                     "firstname": "Load", "lastname": "Test"})
+
+    def login(username):
+        tokens[username] = handler.jwt_generate_token(username, "password")
+
+    def validate(username):
+        if not handler.jwt_token_validate(tokens[username]["access_token"]):
+            raise ValueError("invalid token")
+
+    def refresh(username):
+        tokens[username] = handler.jwt_refresh_token(username, tokens[username]["refresh_token"], "refresh_token")
+
+    operations = {"register": (register, usernames),
+                  "login": (login, usernames),
+                  "validate": (validate, usernames * args.validations),
+                  "refresh": (refresh, usernames),
+                  "logout": (handler.jwt_logout, usernames)}
+    results = {"python": platform.python_version(),
+               "database": engine.dialect.name,
+               "users": args.users,
+               "concurrency": args.concurrency,
+               "bcrypt_rounds": args.bcrypt_rounds,
+               "phases": []}
+    try:
+        print(f"{'phase':<9} {'ops':>6} {'errors':>6} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'queries/op':>10} {'hashes/op':>9}", file=sys.stderr)
+        for name in PHASES:
+            operation, items = operations[name]
+            phase = run_phase(name, operation, items, args.concurrency, counters)
+            results["phases"].append(phase)
+            print(f"{name:<9} {phase['operations']:>6} {phase['errors']:>6} {phase['ops_per_second']:>9.1f} "
+                  f"{phase['p50_ms']:>8.2f} {phase['p99_ms']:>8.2f} {phase['queries_per_op']:>10.2f} "
+                  f"{phase['hashes_per_op']:>9.2f}", file=sys.stderr)
+    finally:
+        with engine.begin() as conn:
+            user_ids = select(Users.id).where(Users.username.startswith(prefix))
+            conn.execute(delete(JwtTokens).where(JwtTokens.user_id.in_(user_ids)))
+            conn.execute(delete(Users).where(Users.username.startswith(prefix)))
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Login benchmark.
+
+Issues token pairs through JWTAuthHandler.jwt_generate_token against an
+in-memory SQLite database and reports the latency, bcrypt calls and SQL
+statements per issued pair. The run fails if a login pays for more than one
+password hash or more than one user lookup.
+
+    python benchmarks/bench_login.py --logins 50
+"""
+import argparse
+import time
+import bcrypt
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from fastapi_jwtauth.jwtauth.config import configure_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    Base.metadata.create_all(bind=engine)
+
+    from fastapi_jwtauth.jwtauth.services import create_user
+    from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+    create_user({"username": "bench", "password": "password", "email": "bench@example.com",
+                 "firstname": "Bench", "lastname": "User"})
+    handler = JWTAuthHandler("benchmark-secret-key-of-32-bytes!", "HS256", 15, 30)
+
+    counts = {"hash": 0, "queries": 0, "user_lookups": 0, "commits": 0}
+    checkpw = bcrypt.checkpw
+
+    def counting_checkpw(*a):
+        counts["hash"] += 1
+        return checkpw(*a)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["queries"] += 1
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            counts["user_lookups"] += 1
+
+    @event.listens_for(engine, "commit")
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    bcrypt.checkpw = counting_checkpw
+    start = time.perf_counter()
+    for _ in range(args.logins):
+        handler.jwt_generate_token("bench", "password")
+    elapsed = time.perf_counter() - start
+    bcrypt.checkpw = checkpw
+
+    per_login = {key: value / args.logins for key, value in counts.items()}
+    print(f"logins:            {args.logins}")
+    print(f"ms per login:      {elapsed / args.logins * 1000:.2f}")
+    print(f"hash calls/login:  {per_login['hash']:.2f}")
+    print(f"user lookups/login:{per_login['user_lookups']:.2f}")
+    print(f"statements/login:  {per_login['queries']:.2f}")
+    print(f"commits/login:     {per_login['commits']:.2f}")
+    assert per_login["hash"] == 1, "login must verify the password exactly once"
+    assert per_login["user_lookups"] == 1, "login must look the user up exactly once"
+    assert per_login["commits"] == 1, "login must write tokens in a single transaction"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Login throttle benchmark.
+
+Replays a credential-stuffing burst (wrong passwords for existing and
+made-up usernames from a handful of client keys) against JWTAuthHandler with
+and without a LoginThrottle, and reports attempts per second, how many were
+rejected before any work, and the password hashes and SQL statements the
+burst cost.
+
+    python benchmarks/bench_login_throttle.py --attempts 500 --clients 5
+"""
+import argparse
+import random
+import time
+import bcrypt
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from fastapi_jwtauth.jwtauth.config import configure_db
+from fastapi_jwtauth.jwtauth.core import LoginThrottle, LoginThrottledError, RateLimit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--attempts", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    Base.metadata.create_all(bind=engine)
+
+    from fastapi_jwtauth.jwtauth.services import create_user
+    from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+    for i in range(args.users):
+        create_user({"username": f"user{i}", "password": "password", "email": f"user{i}@example.com",
+                     "firstname": "Bench", "lastname": "User"})
+    counts = {"hashes": 0, "queries": 0}
+    checkpw = bcrypt.checkpw
+
+    def counting_checkpw(*a):
+        counts["hashes"] += 1
+        return checkpw(*a)
+
+    bcrypt.checkpw = counting_checkpw
+    event.listen(engine, "before_cursor_execute", lambda *_: counts.__setitem__("queries", counts["queries"] + 1))
+
+    rng = random.Random(0)
+    burst = [(rng.choice([f"user{i}" for i in range(args.users)] + [f"ghost{i}" for i in range(args.users)]),
+              f"client{rng.randrange(args.clients)}") for _ in range(args.attempts)]
+    secret = "benchmark-secret-key-of-32-bytes!"
+    variants = {"unthrottled": JWTAuthHandler(secret, "HS256", 15, 30),
+                "throttled": JWTAuthHandler(secret, "HS256", 15, 30,
+                                            login_throttle=LoginThrottle(per_username=RateLimit(5, 60),
+                                                                         per_client=RateLimit(20, 60)))}
+    print(f"{'variant':<12} {'attempts/s':>10} {'rejected':>9} {'hashes':>7} {'queries':>8}")
+    for name, handler in variants.items():
+        counts.update(hashes=0, queries=0)
+        rejected = 0
+        start = time.perf_counter()
+        for username, client_key in burst:
+            try:
+                handler.jwt_generate_token(username, "wrong-password", client_key=client_key)
+            except LoginThrottledError:
+                rejected += 1
+            except ValueError:
+                pass
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {args.attempts / elapsed:>10.0f} {rejected:>9} {counts['hashes']:>7} {counts['queries']:>8}")
+    bcrypt.checkpw = checkpw
+
+
+if __name__ == "__main__":
+    main()
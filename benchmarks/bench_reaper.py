@@ -0,0 +1,69 @@
+"""
+Token reaper benchmark.
+
+Fills a SQLite jwttokens table with expired and revoked rows next to a set of
+live ones, purges it with TokenReaper at several batch sizes and reports rows
+purged per second and the average/maximum batch latency, i.e. the longest time
+a purge transaction holds its locks.
+
+    python benchmarks/bench_reaper.py --rows 100000 --batch-sizes 500 1000 5000
+"""
+import argparse
+import datetime
+import os
+import secrets
+import tempfile
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi_jwtauth.jwtauth.config import configure_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="purgeable rows per run")
+    parser.add_argument("--live", type=int, default=10000, help="rows that must be kept")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[500, 1000, 5000])
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    Base.metadata.create_all(bind=engine)
+
+    from fastapi_jwtauth.jwtauth.models import JwtTokens, TokenStatus
+    from fastapi_jwtauth.jwtauth.services import TokenReaper, create_user
+
+    user = create_user({"username": "bench", "password": "password", "email": "bench@example.com",
+                        "firstname": "Bench", "lastname": "User"})
+    now = datetime.datetime.now(datetime.UTC)
+
+    def rows(count, expiry, active):
+        return [{"user_id": user.id,
+                 "access_token_digest": secrets.token_hex(32),
+                 "refresh_token_digest": secrets.token_hex(32),
+                 "access_expiry_time": expiry,
+                 "refresh_expiry_time": expiry,
+                 "is_revoked": not active,
+                 "status": TokenStatus.ACTIVE if active else TokenStatus.EXPIRED,
+                 "is_active": active,
+                 "created_at": now,
+                 "updated_at": now} for _ in range(count)]
+
+    with engine.begin() as conn:
+        conn.execute(insert(JwtTokens), rows(args.live, now + datetime.timedelta(days=30), True))
+
+    print(f"{'batch size':>10} {'purged':>8} {'batches':>8} {'rows/s':>9} {'avg ms':>8} {'max ms':>8} {'left':>7}")
+    for batch_size in args.batch_sizes:
+        past = now - datetime.timedelta(days=1)
+        with engine.begin() as conn:
+            conn.execute(insert(JwtTokens), rows(args.rows // 2, past, True) + rows(args.rows - args.rows // 2,
+                                                                                     past, False))
+        report = TokenReaper(batch_size=batch_size).run_once()
+        print(f"{batch_size:>10} {report['purged']:>8} {report['batches']:>8} "
+              f"{report['purged'] / report['elapsed']:>9.0f} {report['batch_seconds_avg'] * 1000:>8.2f} "
+              f"{report['batch_seconds_max'] * 1000:>8.2f} {report['table_rows']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Scope check benchmark.
+
+Compares three ways of checking that verified claims grant a set of required
+scopes, for registries of increasing size: scanning a list of scope strings,
+splitting a space separated "scope" string into a set on every request, and
+the precompiled bitmask check from ScopeRegistry.require. Reports nanoseconds
+per check.
+
+    python benchmarks/bench_scopes.py --scopes 16 64 256 --granted 0.5 --required 4
+"""
+import argparse
+import random
+import timeit
+from fastapi_jwtauth.jwtauth.core import ScopeRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scopes", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--granted", type=float, default=0.5, help="fraction of the scopes a token grants")
+    parser.add_argument("--required", type=int, default=4, help="scopes a route requires")
+    parser.add_argument("--checks", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'scopes':>6} {'list ns':>9} {'split ns':>9} {'int ns':>9} {'base64 ns':>10}")
+    for size in args.scopes:
+        names = [f"resource{i}:{'read' if i % 2 else 'write'}" for i in range(size)]
+        granted = rng.sample(names, max(args.required, int(size * args.granted)))
+        required = rng.sample(granted, args.required)
+
+        list_claims = {"scopes": granted}
+        string_claims = {"scope": " ".join(granted)}
+        int_registry = ScopeRegistry(names)
+        b64_registry = ScopeRegistry(names, encoding="base64")
+        int_claims = int_registry.claims(granted)
+        b64_claims = b64_registry.claims(granted)
+        int_check = int_registry.require(*required)
+        b64_check = b64_registry.require(*required)
+
+        def list_check():
+            return all(scope in list_claims["scopes"] for scope in required)
+
+        def split_check():
+            return set(required) <= set(string_claims["scope"].split())
+
+        assert list_check() and split_check() and int_check(int_claims) and b64_check(b64_claims)
+        timings = [timeit.timeit(check, number=args.checks) / args.checks * 1e9
+                   for check in (list_check, split_check, lambda: int_check(int_claims),
+                                 lambda: b64_check(b64_claims))]
+        print(f"{size:>6} {timings[0]:>9.0f} {timings[1]:>9.0f} {timings[2]:>9.0f} {timings[3]:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Token history benchmark.
+
+Measures the token write step of a login (expire previous sessions + insert
+the new pair) for a user whose jwttokens history holds an increasing number
+of rows. Password hashing is left out because its cost is constant and would
+hide the effect being measured. Latency should stay flat as history grows.
+
+    python benchmarks/bench_token_history.py --history 0 1000 10000 100000
+"""
+import argparse
+import datetime
+import os
+import secrets
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi_jwtauth.jwtauth.config import configure_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 1000, 10000, 100000])
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    Base.metadata.create_all(bind=engine)
+
+    from fastapi_jwtauth.jwtauth.models import JwtTokens, TokenStatus
+    from fastapi_jwtauth.jwtauth.services import create_user, save_tokens_db
+
+    user = create_user({"username": "bench", "password": "password", "email": "bench@example.com",
+                        "firstname": "Bench", "lastname": "User"})
+    now = datetime.datetime.now(datetime.UTC)
+    history = 0
+    print(f"{'history rows':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for target in sorted(args.history):
+        rows = [{"user_id": user.id,
+                 "access_token_digest": secrets.token_hex(32),
+                 "refresh_token_digest": secrets.token_hex(32),
+                 "access_expiry_time": now,
+                 "refresh_expiry_time": now,
+                 "is_revoked": True,
+                 "status": TokenStatus.EXPIRED,
+                 "is_active": False,
+                 "created_at": now,
+                 "updated_at": now} for _ in range(target - history)]
+        if rows:
+            with engine.begin() as conn:
+                conn.execute(insert(JwtTokens), rows)
+        history = target
+
+        timings = []
+        for _ in range(args.logins):
+            start = time.perf_counter()
+            save_tokens_db("bench", secrets.token_hex(32), now, secrets.token_hex(32), now, user_id=user.id)
+            timings.append((time.perf_counter() - start) * 1000)
+        history += args.logins
+        timings.sort()
+        print(f"{target:>12} {statistics.median(timings):>8.3f} {timings[int(len(timings) * 0.99) - 1]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
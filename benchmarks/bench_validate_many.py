@@ -0,0 +1,54 @@
+"""
+Batch validation benchmark.
+
+Validates a batch of access tokens, where each distinct token appears
+--repeat times, by calling JWTAuthHandler.jwt_token_validate in a loop, with
+validate_many, and with validate_many on a process pool. Runs for HS256 and
+RS256 and reports tokens per second.
+
+    python benchmarks/bench_validate_many.py --tokens 2000 --repeat 4 --workers 4
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi_jwtauth.jwtauth.core import KeyRing
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rsa_ring = KeyRing("RS256")
+    rsa_ring.add_key("bench", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    handlers = {"HS256": JWTAuthHandler("benchmark-secret-key-of-32-bytes!", "HS256", 15, 30),
+                "RS256": JWTAuthHandler(None, "RS256", 15, 30, keyring=rsa_ring)}
+    now = int(time.time())
+
+    print(f"{'algorithm':<10}{'mode':<16}{'tokens/s':>12}")
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        executor.submit(int).result()  # start the workers before timing
+        for algorithm, handler in handlers.items():
+            distinct = max(args.tokens // args.repeat, 1)
+            unique = [handler.keyring.encode({"sub": f"user{i}", "iat": now, "exp": now + 900})
+                      for i in range(distinct)]
+            batch = unique * args.repeat
+            random.shuffle(batch)
+            runs = {"loop": lambda: [handler.jwt_token_validate(token) for token in batch],
+                    "validate_many": lambda: handler.validate_many(batch),
+                    "process pool": lambda: handler.validate_many(batch, executor=executor)}
+            for mode, run in runs.items():
+                start = time.perf_counter()
+                results = run()
+                elapsed = time.perf_counter() - start
+                assert all(results), f"{algorithm} {mode} rejected a valid token"
+                print(f"{algorithm:<10}{mode:<16}{len(batch) / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Command line tools for jwtauth.
+
+    jwtauth import-users --database-url sqlite:///app.db users.csv
+    jwtauth reap-tokens --database-url sqlite:///app.db --expired-retention-days 7
+    python -m fastapi_jwtauth.jwtauth.cli import-users --database-url ... users.jsonl
+"""
+import argparse
+import sys
+from datetime import timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+
+def _configure(database_url, create_tables=False):
+    from fastapi_jwtauth.jwtauth.config import configure_db
+    engine = create_engine(database_url)
+    Base = declarative_base()
+    configure_db(Base, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    if create_tables:
+        Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _print_progress(report):
+    print(f"\rread {report['read']}  created {report['created']}  skipped {report['skipped']}  "
+          f"invalid {report['invalid']}  {report['rows_per_second']:.0f} rows/s",
+          end="", file=sys.stderr, flush=True)
+
+
+def import_users(args) -> int:
+    _configure(args.database_url, args.create_tables)
+    from fastapi_jwtauth.jwtauth.services import bulk_create_users, read_users
+    report = bulk_create_users(read_users(args.file, args.format),
+                               chunk_size=args.chunk_size,
+                               workers=args.workers,
+                               use_processes=not args.threads,
+                               progress=None if args.quiet else _print_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    for line, error in report["errors"]:
+        print(f"row {line}: {error}", file=sys.stderr)
+    print(f"read {report['read']}, created {report['created']}, skipped {report['skipped']}, "
+          f"invalid {report['invalid']} in {report['elapsed']:.1f}s "
+          f"({report['rows_per_second']:.0f} rows/s)")
+    return 1 if report["invalid"] else 0
+
+
+def reap_tokens(args) -> int:
+    _configure(args.database_url)
+    from fastapi_jwtauth.jwtauth.services import TokenReaper
+    reaper = TokenReaper(expired_retention=timedelta(days=args.expired_retention_days),
+                         revoked_retention=timedelta(hours=args.revoked_retention_hours),
+                         batch_size=args.batch_size,
+                         pause=args.pause)
+    report = reaper.run_once(max_batches=args.max_batches)
+    print(f"purged {report['purged']} (expired {report['purged_expired']}, revoked {report['purged_revoked']}) "
+          f"in {report['batches']} batches, {report['batch_seconds_avg'] * 1000:.1f} ms avg / "
+          f"{report['batch_seconds_max'] * 1000:.1f} ms max per batch; {report['table_rows']} rows left")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="jwtauth", description="jwtauth command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import-users", help="bulk import users from a CSV or JSON Lines file")
+    importer.add_argument("file", help="CSV with a header row, or JSON Lines")
+    importer.add_argument("--database-url", required=True, help="SQLAlchemy database URL")
+    importer.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    importer.add_argument("--chunk-size", type=int, default=1000, help="rows per transaction")
+    importer.add_argument("--workers", type=int, help="password hashing workers, defaults to the CPU count")
+    importer.add_argument("--threads", action="store_true", help="hash in threads instead of processes")
+    importer.add_argument("--create-tables", action="store_true", help="create the jwtauth tables first")
+    importer.add_argument("--quiet", action="store_true", help="do not report progress")
+    importer.set_defaults(handler=import_users)
+
+    reaper = commands.add_parser("reap-tokens", help="delete expired and revoked token rows in batches")
+    reaper.add_argument("--database-url", required=True, help="SQLAlchemy database URL")
+    reaper.add_argument("--expired-retention-days", type=float, default=0,
+                        help="keep rows this long after their refresh token expired")
+    reaper.add_argument("--revoked-retention-hours", type=float, default=0,
+                        help="keep revoked rows this long after their access token expired")
+    reaper.add_argument("--batch-size", type=int, default=1000, help="rows deleted per transaction")
+    reaper.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    reaper.add_argument("--max-batches", type=int, help="stop after this many batches")
+    reaper.set_defaults(handler=reap_tokens)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,5 @@
 from .settings import configure_db
+from .runtime import (RuntimeConfig,
+                      RuntimeConfigStore,
+                      configure_runtime_config,
+                      get_runtime_config)
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+# Settings read from the jwt_env_vars table, falling back to the process environment.
+DEFAULTS = {"JWT_SECRET_KEY": None,
+            "JWT_ALGORITHM": "HS256",
+            "JWT_ACCESS_TOKEN_EXPIRY": "15",
+            "JWT_REFRESH_TOKEN_EXPIRY": "30"}
+
+
+class RuntimeConfig(NamedTuple):
+    """Immutable snapshot of the runtime settings and the access token claim template."""
+
+    version: int
+    settings: Mapping[str, Any]
+    claims_template: Mapping[str, Any]
+    loaded_at: float
+
+    @property
+    def secret_key(self) -> Optional[str]:
+        return self.settings["JWT_SECRET_KEY"]
+
+    @property
+    def algorithm(self) -> str:
+        return self.settings["JWT_ALGORITHM"]
+
+    @property
+    def access_token_expiry(self) -> int:
+        return int(self.settings["JWT_ACCESS_TOKEN_EXPIRY"])
+
+    @property
+    def refresh_token_expiry(self) -> int:
+        return int(self.settings["JWT_REFRESH_TOKEN_EXPIRY"])
+
+
+def _load_from_db() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    from fastapi_jwtauth.jwtauth.services import get_env_vars, get_jwt_access_payload
+    return get_env_vars(), get_jwt_access_payload()
+
+
+class RuntimeConfigStore:
+    """
+    Process-local cache of the configuration kept in the jwt_env_vars and
+    jwt_access_token_payload tables.
+
+    The tables are read once, on the first `get()` or an explicit `load()` at
+    startup, and again after `refresh_interval` seconds or after `bump()`.
+    Every other `get()` returns the current snapshot without touching the
+    database. While one thread reloads, the others keep using the previous
+    snapshot.
+
+    Args:
+        refresh_interval (float, optional): Seconds a snapshot is used before reloading.
+            None never reloads on its own. Defaults to 300.
+        loader (callable, optional): Returns (settings, claims_template). Defaults to reading the tables.
+    """
+
+    def __init__(self, refresh_interval: Optional[float] = 300.0,
+                 loader: Optional[Callable[[], Tuple[Dict[str, Any], Dict[str, Any]]]] = None) -> None:
+        self.refresh_interval = refresh_interval
+        self.loader = loader or _load_from_db
+        self._snapshot: Optional[RuntimeConfig] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> RuntimeConfig:
+        """Read the configuration now and make it the current snapshot."""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> RuntimeConfig:
+        version = self._version
+        stored, claims = self.loader()
+        settings = {name: stored.get(name, os.environ.get(name, default)) for name, default in DEFAULTS.items()}
+        settings.update({name: value for name, value in stored.items() if name not in settings})
+        self._snapshot = RuntimeConfig(version, MappingProxyType(settings),
+                                       MappingProxyType(dict(claims)), time.monotonic())
+        return self._snapshot
+
+    def _stale(self, snapshot: RuntimeConfig) -> bool:
+        if snapshot.version != self._version:
+            return True
+        return self.refresh_interval is not None and time.monotonic() - snapshot.loaded_at >= self.refresh_interval
+
+    def get(self) -> RuntimeConfig:
+        """Return the current snapshot, reloading it first if it is stale."""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale(snapshot):
+            return snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None or self._stale(self._snapshot):
+                    return self._load()
+                return self._snapshot
+        if not self._lock.acquire(blocking=False):
+            return snapshot
+        try:
+            return self._load() if self._stale(self._snapshot) else self._snapshot
+        finally:
+            self._lock.release()
+
+    def bump(self) -> int:
+        """Mark the snapshot as outdated, e.g. after editing the config tables. Returns the new version."""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+
+runtime_config = RuntimeConfigStore()
+
+
+def configure_runtime_config(refresh_interval: Optional[float] = 300.0, loader=None) -> RuntimeConfigStore:
+    """Replace the process-wide runtime config store used by the module-level jwt helpers."""
+    global runtime_config
+    runtime_config = RuntimeConfigStore(refresh_interval=refresh_interval, loader=loader)
+    return runtime_config
+
+
+def get_runtime_config() -> RuntimeConfig:
+    """Return the current snapshot of the process-wide runtime config."""
+    return runtime_config.get()
@@ -1,7 +1,16 @@
 from fastapi_jwtauth.jwtauth.db.database import db_config
 
-def configure_db(base, session):
-    """Configure the auth package with database settings"""
-    base = db_config.configure(base, session)
+def configure_db(base, session, async_session=None, readers=None, async_readers=None,
+                 reader_strategy="round_robin", replica_retry_after=30.0, replica_lag=5.0):
+    """
+    Configure the auth package with database settings.
+
+    `session` is bound to the primary. Pure reads that tolerate replication lag
+    (user lookups, runtime config) go to `readers` when given;
+    see DatabaseConfig.configure for the remaining arguments.
+    """
+    base = db_config.configure(base, session, async_session=async_session, readers=readers,
+                               async_readers=async_readers, reader_strategy=reader_strategy,
+                               replica_retry_after=replica_retry_after, replica_lag=replica_lag)
     from fastapi_jwtauth.jwtauth.models import Users, JwtTokens
     return base
\ No newline at end of file
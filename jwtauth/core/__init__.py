@@ -0,0 +1,62 @@
+# Submodules are imported on first attribute access, so e.g. token validation
+# never loads bcrypt and password hashing never loads PyJWT.
+_exports = {"hash_password": "passwords",
+            "verify_password": "passwords",
+            "needs_rehash": "passwords",
+            "PasswordHasher": "passwords",
+            "BcryptHasher": "passwords",
+            "ScryptHasher": "passwords",
+            "Argon2Hasher": "passwords",
+            "configure_password_hasher": "passwords",
+            "get_password_hasher": "passwords",
+            "identify_hasher": "passwords",
+            "token_digest": "tokens",
+            "PasswordHashPool": "hash_pool",
+            "HashPoolBusyError": "hash_pool",
+            "get_hash_pool": "hash_pool",
+            "configure_hash_pool": "hash_pool",
+            "TTLCache": "cache",
+            "TokenCache": "cache",
+            "RevocationStore": "revocation",
+            "MemoryRevocationStore": "revocation",
+            "RedisRevocationStore": "revocation",
+            "KeyRing": "keyring",
+            "SigningKey": "keyring",
+            "TokenClaims": "claims",
+            "ScopeRegistry": "scopes",
+            "ScopeRequirement": "scopes",
+            "require_scopes": "scopes",
+            "LoginThrottle": "throttle",
+            "LoginThrottledError": "throttle",
+            "RateLimit": "throttle",
+            "ThrottleStore": "throttle",
+            "MemoryThrottleStore": "throttle",
+            "RedisThrottleStore": "throttle",
+            "configure_login_throttle": "throttle",
+            "get_login_throttle": "throttle",
+            "Instrumentation": "metrics",
+            "MetricsRegistry": "metrics",
+            "OpenTelemetryInstrumentation": "metrics",
+            "configure_instrumentation": "metrics",
+            "get_instrumentation": "metrics",
+            "TokenValidator": "validation",
+            "JWKSVerifier": "jwks",
+            "keyring_from_jwks": "jwks",
+            "verify_token": "validation",
+            "validate_token": "validation",
+            "validate_many": "validation"}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{_exports[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries also expire after a TTL.
+
+    Args:
+        maxsize (int, optional): Maximum number of entries kept. Defaults to 1024.
+        ttl (float, optional): Default lifetime of an entry in seconds. Defaults to 300.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Reentrant so subclasses can combine their own checks with set()/pop() atomically.
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """Store a value until `expires_at` (epoch seconds) or the default TTL, whichever is sooner."""
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, deadline)
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> Any:
+        # Callers must hold the lock.
+        return self._data.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions,
+                    "size": len(self._data),
+                    "maxsize": self.maxsize}
+
+
+class TokenCache(TTLCache):
+    """
+    Cache of verified access token claims.
+
+    Entries are keyed by the SHA-256 digest of the token, so raw bearer tokens are
+    never held as keys, and are evicted no later than the token's `exp` claim.
+    Tokens are also indexed by their `sub` claim so that every cached token of a
+    user can be dropped on logout.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._subjects: Dict[Any, Set[bytes]] = {}
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached claims of a previously verified token."""
+        return self.get(self.key(token))
+
+    def put_claims(self, token: str, claims: Dict[str, Any]) -> None:
+        """Cache the verified claims of a token until its expiry."""
+        key = self.key(token)
+        self.set(key, claims, expires_at=claims.get("exp"))
+        subject = claims.get("sub")
+        if subject is not None:
+            with self._lock:
+                if key in self._data:
+                    self._subjects.setdefault(subject, set()).add(key)
+
+    def invalidate(self, token: str) -> None:
+        self.pop(self.key(token))
+
+    def invalidate_subject(self, subject: Any) -> None:
+        """Drop every cached token issued to `subject`."""
+        with self._lock:
+            for key in self._subjects.pop(subject, set()):
+                if key in self._data:
+                    self._remove(key)
+
+    def _remove(self, key: Hashable) -> Any:
+        value, expires_at = super()._remove(key)
+        subject = value.get("sub") if isinstance(value, dict) else None
+        keys = self._subjects.get(subject)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._subjects[subject]
+        return value, expires_at
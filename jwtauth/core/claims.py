@@ -0,0 +1,26 @@
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class TokenClaims(NamedTuple):
+    """
+    Claims of a token whose signature was verified once, with its expiry state.
+
+    Attributes:
+        claims (dict): The token payload.
+        expired (bool): The `exp` claim is in the past.
+        expires_in (float | None): Seconds until `exp`, negative once expired, None without `exp`.
+    """
+
+    claims: Dict[str, Any]
+    expired: bool
+    expires_in: Optional[float]
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], now: Optional[float] = None) -> "TokenClaims":
+        exp = payload.get("exp")
+        if exp is None:
+            return cls(payload, False, None)
+        expires_in = float(exp) - (time.time() if now is None else now)
+        # Same boundary as PyJWT, which rejects a token once exp <= now.
+        return cls(payload, expires_in <= 0, expires_in)
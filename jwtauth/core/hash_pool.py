@@ -0,0 +1,140 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from .metrics import stage
+from .passwords import get_password_hasher, identify_hasher
+
+
+class HashPoolBusyError(RuntimeError):
+    """Raised when the hash pool already holds `max_pending` jobs."""
+
+
+class PasswordHashPool:
+    """
+    Bounded worker pool for password hashing.
+
+    bcrypt deliberately burns CPU for a long time, so running it on the event
+    loop or in the request threadpool lets a burst of logins starve every
+    other request. This pool runs the work on a dedicated set of threads or
+    processes and rejects new jobs with HashPoolBusyError once `max_pending`
+    jobs are queued or running, so callers can shed load instead of queueing
+    without limit.
+
+    Args:
+        max_workers (int, optional): Number of worker threads/processes. Defaults to min(4, cpu count).
+        max_pending (int, optional): Maximum queued + running jobs. Defaults to 8 per worker.
+        use_processes (bool, optional): Use a process pool instead of threads. Defaults to False.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 use_processes: bool = False) -> None:
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending if max_pending is not None else self.max_workers * 8
+        if self.max_pending < 1:
+            raise ValueError("max_pending must be at least 1.")
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="jwtauth-hash")
+        return self._executor
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """Queue `fn(*args)` on the pool, raising HashPoolBusyError when it is full."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HashPoolBusyError("Too many concurrent password checks, please try again.")
+            self._pending += 1
+            executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    # The hasher itself is submitted, so process workers use the parent's configuration.
+    # Stages time the wait for a worker as well as the hashing.
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Verify a password on the pool and block until the result is ready."""
+        with stage("password.verify", pool=True):
+            return self.submit(identify_hasher(hashed).verify, password, hashed).result()
+
+    def hash(self, password: str) -> str:
+        """Hash a password on the pool and block until the result is ready."""
+        with stage("password.hash", pool=True):
+            return self.submit(get_password_hasher().hash, password).result()
+
+    async def averify(self, password: str, hashed: str) -> bool:
+        """Verify a password on the pool without blocking the event loop."""
+        with stage("password.verify", pool=True):
+            return await asyncio.wrap_future(self.submit(identify_hasher(hashed).verify, password, hashed))
+
+    async def ahash(self, password: str) -> str:
+        """Hash a password on the pool without blocking the event loop."""
+        with stage("password.hash", pool=True):
+            return await asyncio.wrap_future(self.submit(get_password_hasher().hash, password))
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def stats(self) -> Dict[str, int]:
+        """Return the current queue depth and lifetime counters."""
+        with self._lock:
+            return {"pending": self._pending,
+                    "max_pending": self.max_pending,
+                    "completed": self.completed,
+                    "rejected": self.rejected}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_default_pool: Optional[PasswordHashPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_hash_pool() -> PasswordHashPool:
+    """Return the process-wide hash pool, creating it with defaults on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = PasswordHashPool()
+        return _default_pool
+
+
+def configure_hash_pool(max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                        use_processes: bool = False) -> PasswordHashPool:
+    """Replace the process-wide hash pool, shutting down the previous one."""
+    global _default_pool
+    pool = PasswordHashPool(max_workers=max_workers, max_pending=max_pending,
+                            use_processes=use_processes)
+    with _default_pool_lock:
+        previous, _default_pool = _default_pool, pool
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return pool
@@ -0,0 +1,184 @@
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Mapping, Optional, Tuple
+import jwt
+from .keyring import KeyRing, _unverified_header
+from .validation import verify_token
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def keyring_from_jwks(document: Mapping[str, Any]) -> KeyRing:
+    """
+    Build a verify-only KeyRing from a JWKS document.
+
+    Symmetric ("oct") keys, encryption keys and keys of unsupported types are skipped.
+
+    Raises:
+        ValueError: If the document is not a JSON object with a list of key objects.
+    """
+    if not isinstance(document, Mapping):
+        raise ValueError("The JWKS document must be a JSON object.")
+    keys = document.get("keys", ())
+    if not isinstance(keys, (list, tuple)) or not all(isinstance(jwk, Mapping) for jwk in keys):
+        raise ValueError("The JWKS \"keys\" member must be a list of JSON objects.")
+    ring = KeyRing()
+    for jwk in keys:
+        if jwk.get("use", "sig") != "sig" or jwk.get("kty") == "oct":
+            continue
+        try:
+            key = jwt.PyJWK(jwk)
+        except jwt.PyJWKError:
+            continue
+        ring.add_key(jwk.get("kid"), key.key, algorithm=key.algorithm_name, not_before=0)
+    return ring
+
+
+def _http_get(url: str, headers: Dict[str, str], timeout: float) -> Tuple[int, Mapping[str, str], bytes]:
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return 304, error.headers, b""
+        raise
+
+
+class JWKSVerifier:
+    """
+    Verify access tokens with the public keys published by an auth service's JWKS endpoint.
+
+    Needs neither the signing secret nor a database. The JWKS document is
+    fetched on first use and cached for the `max-age` the server sends (or
+    `default_max_age`); after that it is revalidated with `If-None-Match`, so
+    an unchanged key set costs a 304. While one thread refreshes, the others
+    keep verifying with the cached keys, and a failed refresh keeps the cached
+    keys until the next attempt.
+
+    A token whose `kid` is unknown triggers an early refetch, e.g. right after
+    a key rotation, but at most once per `min_refresh_interval` seconds so that
+    tokens with made-up `kid`s cannot flood the auth service.
+
+    Args:
+        url (str): URL of the JWKS document.
+        default_max_age (float, optional): Cache lifetime when the response has no max-age.
+            Defaults to 300.
+        min_refresh_interval (float, optional): Minimum seconds between fetches triggered by
+            unknown kids or failed fetches. Defaults to 30.
+        timeout (float, optional): HTTP timeout in seconds. Defaults to 5.
+        cache (TokenCache, optional): Verified-token cache.
+        revocation_store (RevocationStore, optional): Tokens revoked in this store are rejected,
+            e.g. a RedisRevocationStore shared with the auth service.
+    """
+
+    def __init__(self, url: str, default_max_age: float = 300.0, min_refresh_interval: float = 30.0,
+                 timeout: float = 5.0, cache=None, revocation_store=None) -> None:
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.cache = cache
+        self.revocation_store = revocation_store
+        self.fetches = 0
+        self.last_error: Optional[BaseException] = None
+        # Raised again instead of refetching while no key set has been fetched yet.
+        self._failure: Optional[RuntimeError] = None
+        self._ring: Optional[KeyRing] = None
+        self._etag: Optional[str] = None
+        self._expires_at = 0.0
+        self._last_fetch = float("-inf")
+        self._lock = threading.Lock()
+
+    def _max_age(self, cache_control: Optional[str]) -> float:
+        match = _MAX_AGE.search(cache_control or "")
+        max_age = float(match.group(1)) if match else self.default_max_age
+        return max(max_age, self.min_refresh_interval)
+
+    def _refresh(self) -> KeyRing:
+        now = time.monotonic()
+        self._last_fetch = now
+        self.fetches += 1
+        headers = {"Accept": "application/json"}
+        if self._etag and self._ring is not None:
+            headers["If-None-Match"] = self._etag
+        try:
+            status, response_headers, body = _http_get(self.url, headers, self.timeout)
+            if status != 304:
+                ring = keyring_from_jwks(json.loads(body))
+                self._ring, self._etag = ring, response_headers.get("ETag")
+        except (OSError, ValueError) as error:
+            self.last_error = error
+            if self._ring is None:
+                self._failure = RuntimeError(f"Could not fetch the JWKS document from {self.url}: {error}")
+                raise self._failure
+            self._expires_at = now + self.min_refresh_interval
+            return self._ring
+        self.last_error = self._failure = None
+        self._expires_at = now + self._max_age(response_headers.get("Cache-Control"))
+        return self._ring
+
+    def refresh(self) -> KeyRing:
+        """Fetch the JWKS document now and return the resulting keys."""
+        with self._lock:
+            return self._refresh()
+
+    def _raise_recent_failure(self) -> None:
+        # Without any keys every call would fetch; limit that to one per min_refresh_interval.
+        failure = self._failure
+        if failure is not None and time.monotonic() - self._last_fetch < self.min_refresh_interval:
+            raise failure
+
+    def keyring(self) -> KeyRing:
+        """Return the cached keys, revalidating them first once they are stale."""
+        ring = self._ring
+        if ring is not None and time.monotonic() < self._expires_at:
+            return ring
+        if ring is None:
+            self._raise_recent_failure()
+            with self._lock:
+                if self._ring is not None and time.monotonic() < self._expires_at:
+                    return self._ring
+                if self._ring is None:
+                    self._raise_recent_failure()
+                return self._refresh()
+        if not self._lock.acquire(blocking=False):
+            return ring
+        try:
+            return self._refresh() if time.monotonic() >= self._expires_at else self._ring
+        finally:
+            self._lock.release()
+
+    def _keyring_for(self, kid: Optional[str]) -> KeyRing:
+        ring = self.keyring()
+        if kid is None or kid in ring or time.monotonic() - self._last_fetch < self.min_refresh_interval:
+            return ring
+        with self._lock:
+            if kid not in self._ring and time.monotonic() - self._last_fetch >= self.min_refresh_interval:
+                self._refresh()
+            return self._ring
+
+    def decode(self, token: str, **kwargs) -> Dict[str, Any]:
+        """
+        Verify `token` and return its payload.
+
+        Raises:
+            jwt.InvalidTokenError: If the token is invalid or signed with an unknown key.
+        """
+        return self._keyring_for(_unverified_header(token).get("kid")).decode(token, **kwargs)
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the claims of a valid, unrevoked token, or None."""
+        try:
+            ring = self._keyring_for(_unverified_header(token).get("kid"))
+        except jwt.InvalidTokenError:
+            return None
+        return verify_token(token, None, None, cache=self.cache, revocation_store=self.revocation_store,
+                            keyring=ring)
+
+    def validate(self, token: str) -> bool:
+        return self.verify(token) is not None
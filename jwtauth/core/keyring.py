@@ -0,0 +1,287 @@
+import base64
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import jwt
+from cryptography.hazmat.primitives import serialization
+from .claims import TokenClaims
+
+
+def _unverified_header(token: str) -> Dict[str, Any]:
+    # Only the header segment is needed to pick the key, jwt.decode parses the rest.
+    try:
+        segment = token.split(".", 1)[0]
+        header = json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except (ValueError, TypeError, AttributeError):
+        raise jwt.DecodeError("Invalid header padding")
+    if not isinstance(header, dict):
+        raise jwt.DecodeError("Invalid header string: must be a json object")
+    return header
+
+
+class SigningKey:
+    """One key of a KeyRing, parsed once when it is added."""
+
+    __slots__ = ("kid", "algorithm", "signing_key", "verifying_key", "not_before", "not_after", "_public_pem",
+                 "_jwk")
+
+    def __init__(self, kid, algorithm, signing_key, verifying_key, not_before, not_after) -> None:
+        self.kid = kid
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.verifying_key = verifying_key
+        self.not_before = not_before
+        self.not_after = not_after
+        self._public_pem = None
+        self._jwk = None
+
+    def can_sign(self, now: float) -> bool:
+        return (self.signing_key is not None and self.not_before <= now
+                and (self.not_after is None or now < self.not_after))
+
+    def can_verify(self, now: float) -> bool:
+        return self.not_after is None or now < self.not_after
+
+    def public_pem(self) -> Optional[bytes]:
+        """PEM of the verification key, or None for HMAC secrets."""
+        if self._public_pem is None and hasattr(self.verifying_key, "public_bytes"):
+            self._public_pem = self.verifying_key.public_bytes(serialization.Encoding.PEM,
+                                                               serialization.PublicFormat.SubjectPublicKeyInfo)
+        return self._public_pem
+
+    def jwk(self) -> Optional[Dict[str, Any]]:
+        """Public JWK of the verification key with its kid, alg and use, or None for HMAC secrets."""
+        if self._jwk is None and hasattr(self.verifying_key, "public_bytes"):
+            jwk = jwt.get_algorithm_by_name(self.algorithm).to_jwk(self.verifying_key, as_dict=True)
+            jwk.update({"alg": self.algorithm, "use": "sig"})
+            if self.kid is not None:
+                jwk["kid"] = self.kid
+            self._jwk = jwk
+        return self._jwk
+
+
+class KeyRing:
+    """
+    Signing and verification keys for access tokens.
+
+    PyJWT parses PEM keys on every encode/decode call, which dominates the cost
+    of RS256/ES256/EdDSA tokens. A KeyRing parses each key once and keeps the
+    resulting key objects. Tokens are signed with the newest active key and
+    carry its `kid` header; on decode the verification key is picked by `kid`
+    and only that key's algorithm is accepted.
+
+    Rotation keeps both keys valid for verification during an overlap window,
+    so tokens signed with the previous key keep working until they expire.
+
+    Args:
+        algorithm (str, optional): Default algorithm for keys added without one. Defaults to "HS256".
+    """
+
+    def __init__(self, algorithm: str = "HS256") -> None:
+        self.algorithm = algorithm
+        self._keys: Dict[Optional[str], SigningKey] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_secret(cls, secret_key, algorithm: str = "HS256") -> "KeyRing":
+        """Build a ring holding a single key. Tokens signed with it carry no `kid` header."""
+        ring = cls(algorithm)
+        ring.add_key(None, secret_key, algorithm=algorithm)
+        return ring
+
+    def add_key(self, kid: Optional[str], key, algorithm: Optional[str] = None, public_key=None,
+                not_before: Optional[float] = None, not_after: Optional[float] = None) -> SigningKey:
+        """
+        Parse and add a key.
+
+        Args:
+            kid (str): Key id stamped into the `kid` header. None only for a single-key ring.
+            key: HMAC secret, or private key as PEM or a cryptography key object.
+                Pass a public key alone (and no private key) for a verify-only key.
+            algorithm (str, optional): Signing algorithm. Defaults to the ring's algorithm.
+            public_key (optional): Public key, derived from the private key when omitted.
+            not_before (float, optional): Epoch seconds from which the key signs. Defaults to now.
+            not_after (float, optional): Epoch seconds after which the key neither signs nor verifies.
+
+        Returns:
+            SigningKey: The parsed key entry.
+        """
+        algorithm = algorithm or self.algorithm
+        try:
+            algorithm_obj = jwt.get_algorithm_by_name(algorithm)
+        except NotImplementedError:
+            raise ValueError(f"Unsupported algorithm '{algorithm}'.")
+        if key is None and public_key is None:
+            raise ValueError("A key or public_key is required.")
+        prepared = algorithm_obj.prepare_key(key) if key is not None else None
+        if isinstance(prepared, bytes):
+            signing_key = verifying_key = prepared
+        elif hasattr(prepared, "public_key"):
+            signing_key, verifying_key = prepared, prepared.public_key()
+        else:
+            # A public key was passed as `key`, so this entry can only verify.
+            signing_key, verifying_key = None, prepared
+        if public_key is not None:
+            verifying_key = algorithm_obj.prepare_key(public_key)
+        entry = SigningKey(kid, algorithm, signing_key, verifying_key,
+                           time.time() if not_before is None else not_before, not_after)
+        with self._lock:
+            keys = dict(self._keys)
+            keys[kid] = entry
+            self._keys = keys
+        return entry
+
+    def rotate(self, kid: str, key, algorithm: Optional[str] = None, public_key=None,
+               overlap: float = 3600) -> SigningKey:
+        """
+        Start signing with a new key and retire the current ones after `overlap` seconds.
+
+        `overlap` should be at least the access token lifetime, so every token signed
+        with an old key expires before that key stops verifying.
+        """
+        entry = self.add_key(kid, key, algorithm=algorithm, public_key=public_key)
+        retire_at = entry.not_before + overlap
+        with self._lock:
+            for other in self._keys.values():
+                if other is not entry and (other.not_after is None or other.not_after > retire_at):
+                    other.not_after = retire_at
+        return entry
+
+    def remove_key(self, kid: Optional[str]) -> None:
+        with self._lock:
+            keys = dict(self._keys)
+            keys.pop(kid, None)
+            self._keys = keys
+
+    def __contains__(self, kid: Optional[str]) -> bool:
+        return kid in self._keys
+
+    def keys(self) -> List[SigningKey]:
+        """Return the keys that can still verify tokens."""
+        now = time.time()
+        return [entry for entry in self._keys.values() if entry.can_verify(now)]
+
+    def jwks(self) -> Dict[str, Any]:
+        """
+        Return the public keys as a JWKS document ({"keys": [...]}) for remote verifiers.
+
+        HMAC secrets are never published. Keys added with a future `not_before` are
+        included, so verifiers know them before the first token is signed with them.
+        """
+        return {"keys": [jwk for jwk in (entry.jwk() for entry in self.keys()) if jwk is not None]}
+
+    def current_key(self) -> SigningKey:
+        """Return the newest key that may sign right now."""
+        now = time.time()
+        candidates = [entry for entry in self._keys.values() if entry.can_sign(now)]
+        if not candidates:
+            raise RuntimeError("KeyRing has no active signing key.")
+        return max(candidates, key=lambda entry: entry.not_before)
+
+    def encode(self, payload: Dict[str, Any], headers: Optional[Dict[str, Any]] = None) -> str:
+        """Sign `payload` with the current key and stamp its `kid` header."""
+        entry = self.current_key()
+        if entry.kid is not None:
+            headers = {**(headers or {}), "kid": entry.kid}
+        return jwt.encode(payload, entry.signing_key, algorithm=entry.algorithm, headers=headers)
+
+    def decode(self, token: str, options: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Verify `token` with the key named by its `kid` header and return the payload.
+
+        Tokens without a `kid` are checked against the keys using the token's algorithm.
+
+        Raises:
+            jwt.InvalidTokenError: If no usable key matches or verification fails.
+        """
+        candidates = self._candidates(_unverified_header(token), time.time())
+        return self._decode_with(token, candidates, options, **kwargs)
+
+    def inspect(self, token: str) -> TokenClaims:
+        """
+        Verify the signature of `token` once and report its expiry instead of raising on it.
+
+        Raises:
+            jwt.InvalidTokenError: If the signature or any claim other than `exp` is invalid.
+        """
+        return TokenClaims.from_payload(self.decode(token, options={"verify_exp": False}))
+
+    def decode_many(self, tokens: List[str], executor=None, chunk_size: int = 256) -> List[Optional[Dict[str, Any]]]:
+        """
+        Verify several tokens and return the payload of each, or None if it is invalid.
+
+        Tokens sharing a header segment share one header parse and key lookup. With an
+        `executor` (e.g. a ProcessPoolExecutor), RSA/EC/EdDSA tokens are verified in
+        chunks of `chunk_size` on the executor; HMAC tokens are cheap and stay inline.
+
+        Returns:
+            list: Payloads in the order of `tokens`.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tokens)
+        groups: Dict[str, List[int]] = {}
+        for index, token in enumerate(tokens):
+            if isinstance(token, str):
+                groups.setdefault(token.split(".", 1)[0], []).append(index)
+        now = time.time()
+        futures = []
+        for segment, indexes in groups.items():
+            try:
+                candidates = self._candidates(_unverified_header(segment), now)
+            except jwt.InvalidTokenError:
+                continue
+            if executor is not None and len(candidates) == 1 and candidates[0].public_pem() is not None:
+                entry = candidates[0]
+                for start in range(0, len(indexes), chunk_size):
+                    chunk = indexes[start:start + chunk_size]
+                    futures.append((chunk, executor.submit(_decode_batch, entry.algorithm, entry.public_pem(),
+                                                           [tokens[index] for index in chunk])))
+                continue
+            for index in indexes:
+                try:
+                    results[index] = self._decode_with(tokens[index], candidates)
+                except jwt.InvalidTokenError:
+                    pass
+        for chunk, future in futures:
+            for index, payload in zip(chunk, future.result()):
+                results[index] = payload
+        return results
+
+    def _candidates(self, header: Dict[str, Any], now: float) -> List[SigningKey]:
+        kid = header.get("kid")
+        if kid is not None:
+            entry = self._keys.get(kid)
+            return [entry] if entry is not None and entry.can_verify(now) else []
+        return [entry for entry in self._keys.values()
+                if entry.algorithm == header.get("alg") and entry.can_verify(now)]
+
+    @staticmethod
+    def _decode_with(token: str, candidates: List[SigningKey], options=None, **kwargs) -> Dict[str, Any]:
+        if not candidates:
+            raise jwt.InvalidTokenError("No verification key for this token.")
+        for entry in candidates[:-1]:
+            try:
+                return jwt.decode(token, entry.verifying_key, algorithms=[entry.algorithm],
+                                  options=options, **kwargs)
+            except jwt.InvalidSignatureError:
+                continue
+        entry = candidates[-1]
+        return jwt.decode(token, entry.verifying_key, algorithms=[entry.algorithm], options=options, **kwargs)
+
+
+# Public keys parsed by _decode_batch, per worker process.
+_worker_keys: Dict[Tuple[str, bytes], Any] = {}
+
+
+def _decode_batch(algorithm: str, public_pem: bytes, tokens: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """Executor entry point of KeyRing.decode_many. Key objects do not pickle, so the PEM is sent."""
+    key = _worker_keys.get((algorithm, public_pem))
+    if key is None:
+        key = _worker_keys[(algorithm, public_pem)] = jwt.get_algorithm_by_name(algorithm).prepare_key(public_pem)
+    payloads = []
+    for token in tokens:
+        try:
+            payloads.append(jwt.decode(token, key, algorithms=[algorithm]))
+        except jwt.InvalidTokenError:
+            payloads.append(None)
+    return payloads
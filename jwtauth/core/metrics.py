@@ -0,0 +1,279 @@
+import functools
+import inspect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Public operation (login, refresh, ...) the current code runs in, used to label queries.
+_current_operation: ContextVar[Optional[str]] = ContextVar("jwtauth_operation", default=None)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("instrumentation", "name", "labels", "operation", "span", "started", "token")
+
+    def __init__(self, instrumentation, name, labels, operation) -> None:
+        self.instrumentation = instrumentation
+        self.name = name
+        self.labels = labels
+        self.operation = operation
+
+    def __enter__(self):
+        # Nested operations (e.g. services called by the handler) keep the outer label.
+        self.token = (_current_operation.set(self.name)
+                      if self.operation and _current_operation.get() is None else None)
+        self.span = self.instrumentation.start_span(self.name, self.labels)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        try:
+            self.instrumentation.record_stage(self.name, seconds, exc_type is None, self.labels)
+            self.instrumentation.end_span(self.span, exc_type, exc, tb)
+        finally:
+            if self.token is not None:
+                _current_operation.reset(self.token)
+        return False
+
+
+class Instrumentation:
+    """
+    Instrumentation hooks called by the handler, helpers and services.
+
+    This base class records nothing and is the default, so a disabled
+    instrumentation costs one attribute check per public operation. Subclasses
+    set `enabled` and override record_stage/increment (metrics) and/or
+    start_span/end_span (tracing).
+    """
+
+    enabled = False
+
+    def stage(self, name: str, **labels) -> Any:
+        """Context manager timing one stage, e.g. `with stage("password.verify"): ...`."""
+        if not self.enabled:
+            return _NOOP_STAGE
+        return _Stage(self, name, labels, False)
+
+    def operation(self, name: str, **labels) -> Any:
+        """Like stage(), and queries run inside are labelled with `name`."""
+        if not self.enabled:
+            return _NOOP_STAGE
+        return _Stage(self, name, labels, True)
+
+    def record_stage(self, name: str, seconds: float, ok: bool, labels: Dict[str, Any]) -> None:
+        pass
+
+    def increment(self, name: str, amount: float = 1.0, **labels) -> None:
+        pass
+
+    def start_span(self, name: str, labels: Dict[str, Any]) -> Any:
+        return None
+
+    def end_span(self, span: Any, exc_type, exc, tb) -> None:
+        pass
+
+
+class MetricsRegistry(Instrumentation):
+    """
+    In-process Prometheus-style metrics: one latency histogram per stage and plain counters.
+
+    `render()` returns the Prometheus text exposition format, e.g. for a
+    /metrics route; `snapshot()` returns the same data as a dict.
+
+    Series:
+        <namespace>_stage_seconds{stage, outcome}: histogram of stage and operation latency.
+        <namespace>_<name>_total{...}: counters such as db_queries, token_cache_hits and
+            login_throttled.
+
+    Args:
+        namespace (str, optional): Metric name prefix. Defaults to "jwtauth".
+        buckets (iterable, optional): Histogram upper bounds in seconds.
+    """
+
+    enabled = True
+
+    def __init__(self, namespace: str = "jwtauth", buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], list] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def record_stage(self, name, seconds, ok, labels):
+        key = (name, "ok" if ok else "error")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def increment(self, name, amount=1.0, **labels):
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return {"stages": {(stage, outcome): {"count", "sum", "buckets"}},
+        "counters": {(name, ((label, value), ...)): total}}. Buckets are cumulative.
+        """
+        with self._lock:
+            stages = {}
+            for key, (counts, total, count) in self._histograms.items():
+                cumulative, running = [], 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    running += bucket_count
+                    cumulative.append((bound, running))
+                stages[key] = {"count": count, "sum": total, "buckets": cumulative}
+            counters = dict(self._counters)
+        return {"stages": stages, "counters": counters}
+
+    def counter(self, name: str, **labels) -> float:
+        """Current value of one counter series."""
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            return self._counters.get(key, 0.0)
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        histogram = f"{self.namespace}_stage_seconds"
+        lines = [f"# HELP {histogram} Latency of jwtauth operations and their stages.",
+                 f"# TYPE {histogram} histogram"]
+        for (stage, outcome), data in sorted(snapshot["stages"].items()):
+            labels = f'stage="{stage}",outcome="{outcome}"'
+            for bound, count in data["buckets"]:
+                lines.append(f'{histogram}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{histogram}_bucket{{{labels},le="+Inf"}} {data["count"]}')
+            lines.append(f"{histogram}_sum{{{labels}}} {data['sum']}")
+            lines.append(f"{histogram}_count{{{labels}}} {data['count']}")
+        declared = set()
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            metric = f"{self.namespace}_{name}_total"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            rendered = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+            lines.append(f"{metric}{{{rendered}}} {value}" if rendered else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Wrap every operation and stage in an OpenTelemetry span.
+
+    Spans nest under the caller's current span (e.g. the FastAPI request span)
+    and record exceptions. Metrics are delegated to `metrics`, e.g. a
+    MetricsRegistry, so both can be used together.
+
+    Args:
+        tracer (optional): Tracer providing `start_as_current_span`. Defaults to
+            `opentelemetry.trace.get_tracer("fastapi_jwtauth")`, which needs the
+            opentelemetry-api package.
+        metrics (Instrumentation, optional): Receives stage latencies and counters.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer=None, metrics: Optional[Instrumentation] = None) -> None:
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise RuntimeError("OpenTelemetry tracing requires the opentelemetry-api package.")
+            tracer = trace.get_tracer("fastapi_jwtauth")
+        self.tracer = tracer
+        self.metrics = metrics or Instrumentation()
+
+    def start_span(self, name, labels):
+        context = self.tracer.start_as_current_span(f"jwtauth.{name}", attributes=labels or None)
+        context.__enter__()
+        return context
+
+    def end_span(self, span, exc_type, exc, tb):
+        span.__exit__(exc_type, exc, tb)
+
+    def record_stage(self, name, seconds, ok, labels):
+        self.metrics.record_stage(name, seconds, ok, labels)
+
+    def increment(self, name, amount=1.0, **labels):
+        self.metrics.increment(name, amount, **labels)
+
+
+_instrumentation: Instrumentation = Instrumentation()
+
+
+def configure_instrumentation(instrumentation: Optional[Instrumentation]) -> Instrumentation:
+    """Set the process-wide instrumentation. None restores the no-op default."""
+    global _instrumentation
+    _instrumentation = instrumentation or Instrumentation()
+    return _instrumentation
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def stage(name: str, **labels) -> Any:
+    """Time a stage with the process-wide instrumentation."""
+    return _instrumentation.stage(name, **labels)
+
+
+def current_operation() -> Optional[str]:
+    """Name of the instrumented public operation running in this context, if any."""
+    return _current_operation.get()
+
+
+def instrumented(name: str):
+    """
+    Decorator recording every call of a public operation (sync or async) as `name`.
+
+    A call made while an operation of the same name is running, e.g. an async
+    variant delegating to its sync counterpart, is not recorded twice.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                instrumentation = _instrumentation
+                if not instrumentation.enabled or _current_operation.get() == name:
+                    return await func(*args, **kwargs)
+                with instrumentation.operation(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            instrumentation = _instrumentation
+            if not instrumentation.enabled or _current_operation.get() == name:
+                return func(*args, **kwargs)
+            with instrumentation.operation(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,210 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from typing import Dict, Optional
+import bcrypt
+from .metrics import stage
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class PasswordHasher:
+    """
+    One password hashing scheme.
+
+    Hashes are self-describing: the scheme and its cost parameters are encoded
+    in the hash string, so a hash can be verified after the configured
+    parameters change, and `needs_rehash` reports hashes made with old ones.
+    """
+
+    scheme = ""
+    prefixes = ()
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(self.prefixes)
+
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    def verify(self, password: str, hashed: str) -> bool:
+        raise NotImplementedError
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Return True if `hashed` was made with parameters other than this hasher's."""
+        raise NotImplementedError
+
+
+class BcryptHasher(PasswordHasher):
+    """bcrypt with a configurable cost (log2 rounds). Defaults to 12, bcrypt's own default."""
+
+    scheme = "bcrypt"
+    prefixes = ("$2a$", "$2b$", "$2y$")
+
+    def __init__(self, rounds: int = 12) -> None:
+        if not 4 <= rounds <= 31:
+            raise ValueError("bcrypt rounds must be between 4 and 31.")
+        self.rounds = rounds
+
+    def hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # $2b$<rounds>$<salt+hash>
+        return int(hashed.split("$")[2]) != self.rounds
+
+
+class ScryptHasher(PasswordHasher):
+    """
+    scrypt from the standard library, stored as `$scrypt$ln=<log2 n>,r=<r>,p=<p>$<salt>$<hash>`.
+
+    Args:
+        ln (int, optional): log2 of the CPU/memory cost n. Defaults to 14 (16 MiB with r=8).
+        r (int, optional): Block size. Defaults to 8.
+        p (int, optional): Parallelism. Defaults to 1.
+    """
+
+    scheme = "scrypt"
+    prefixes = ("$scrypt$",)
+
+    def __init__(self, ln: int = 14, r: int = 8, p: int = 1) -> None:
+        self.ln = ln
+        self.r = r
+        self.p = p
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, ln: int, r: int, p: int, length: int) -> bytes:
+        n = 1 << ln
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * r * (n + p), dklen=length)
+
+    def _parse(self, hashed: str):
+        _, _, params, salt, digest = hashed.split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        return int(values["ln"]), int(values["r"]), int(values["p"]), _b64decode(salt), _b64decode(digest)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        digest = self._derive(password, salt, self.ln, self.r, self.p, 32)
+        return f"$scrypt$ln={self.ln},r={self.r},p={self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password: str, hashed: str) -> bool:
+        ln, r, p, salt, digest = self._parse(hashed)
+        return hmac.compare_digest(self._derive(password, salt, ln, r, p, len(digest)), digest)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        ln, r, p, _, _ = self._parse(hashed)
+        return (ln, r, p) != (self.ln, self.r, self.p)
+
+
+class Argon2Hasher(PasswordHasher):
+    """
+    argon2id through the optional `argon2-cffi` package, in the standard PHC format.
+
+    Arguments are passed to `argon2.PasswordHasher` (time_cost, memory_cost, parallelism, ...).
+    """
+
+    scheme = "argon2"
+    prefixes = ("$argon2id$", "$argon2i$", "$argon2d$")
+
+    def __init__(self, **params) -> None:
+        self.params = params
+        self._hasher = None
+
+    def __getstate__(self):
+        # The argon2 hasher is rebuilt on demand, e.g. in hash pool worker processes.
+        return {"params": self.params, "_hasher": None}
+
+    def _get_hasher(self):
+        if self._hasher is None:
+            try:
+                import argon2
+            except ImportError:
+                raise RuntimeError("argon2 hashing requires the argon2-cffi package.")
+            self._hasher = argon2.PasswordHasher(**self.params)
+        return self._hasher
+
+    def hash(self, password: str) -> str:
+        return self._get_hasher().hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        from argon2.exceptions import InvalidHashError, VerificationError
+        try:
+            return self._get_hasher().verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return self._get_hasher().check_needs_rehash(hashed)
+
+
+_hashers: Dict[str, PasswordHasher] = {"bcrypt": BcryptHasher(),
+                                       "scrypt": ScryptHasher(),
+                                       "argon2": Argon2Hasher()}
+_default_scheme = "bcrypt"
+_hashers_lock = threading.Lock()
+
+
+def configure_password_hasher(hasher: PasswordHasher) -> PasswordHasher:
+    """
+    Hash new passwords with `hasher`, e.g. BcryptHasher(rounds=13) or Argon2Hasher().
+
+    Hashes of the other registered schemes keep verifying and are upgraded to
+    this hasher the next time their user logs in.
+    """
+    global _hashers, _default_scheme
+    with _hashers_lock:
+        _hashers = {**_hashers, hasher.scheme: hasher}
+        _default_scheme = hasher.scheme
+    return hasher
+
+
+def get_password_hasher(scheme: Optional[str] = None) -> PasswordHasher:
+    """Return the hasher for `scheme`, or the one used for new passwords."""
+    try:
+        return _hashers[scheme or _default_scheme]
+    except KeyError:
+        raise ValueError(f"Unknown password hashing scheme '{scheme}'.")
+
+
+def identify_hasher(hashed: str) -> PasswordHasher:
+    """Return the registered hasher that produced `hashed`."""
+    for hasher in _hashers.values():
+        if hasher.identify(hashed):
+            return hasher
+    raise ValueError("Unrecognised password hash format.")
+
+
+def hash_password(password: str) -> str:
+    """Hash a plain text password with the configured hasher."""
+    hasher = get_password_hasher()
+    with stage("password.hash", scheme=hasher.scheme):
+        return hasher.hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """
+    Check a plain text password against a stored hash of any registered scheme.
+
+    Kept as a module-level function without database imports so it can be
+    shipped to worker threads or processes by PasswordHashPool.
+    """
+    hasher = identify_hasher(hashed)
+    with stage("password.verify", scheme=hasher.scheme):
+        return hasher.verify(password, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Return True if `hashed` uses another scheme or older parameters than the configured hasher."""
+    hasher = get_password_hasher()
+    return not hasher.identify(hashed) or hasher.needs_rehash(hashed)
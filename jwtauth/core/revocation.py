@@ -0,0 +1,140 @@
+import datetime
+import threading
+import time
+from typing import Iterable, Set, Tuple, Union
+
+Expiry = Union[datetime.datetime, float, int]
+
+
+def _epoch(expires_at: Expiry) -> float:
+    """Convert an expiry to epoch seconds. Naive datetimes are treated as UTC, as stored in the DB."""
+    if isinstance(expires_at, datetime.datetime):
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=datetime.UTC)
+        return expires_at.timestamp()
+    return float(expires_at)
+
+
+class RevocationStore:
+    """
+    Interface of the token revocation (denylist) stores used by JWTAuthHandler.
+
+    Tokens are identified by their SHA-256 digest (see token_digest). An entry only
+    has to live until the token's own expiry, after which signature validation
+    rejects the token anyway, so every backend drops entries at that point.
+    """
+
+    # True for stores that read revocation state from the jwttokens rows, which the
+    # services update themselves; other stores are sent every row they expire.
+    uses_token_rows = False
+    # Whether revoke_many() may block on I/O; async callers then run it in a thread.
+    blocking = True
+
+    def revoke(self, digest: str, expires_at: Expiry) -> None:
+        """Mark the token with this digest as revoked until `expires_at`."""
+        raise NotImplementedError
+
+    def revoke_many(self, entries: Iterable[Tuple[str, Expiry]]) -> None:
+        """Revoke several (digest, expires_at) pairs."""
+        for digest, expires_at in entries:
+            self.revoke(digest, expires_at)
+
+    def is_revoked(self, digest: str) -> bool:
+        """Return True if the token with this digest has been revoked."""
+        raise NotImplementedError
+
+    def revoked_digests(self, digests: Iterable[str]) -> Set[str]:
+        """Return the subset of `digests` that has been revoked."""
+        return {digest for digest in digests if self.is_revoked(digest)}
+
+
+class MemoryRevocationStore(RevocationStore):
+    """
+    In-process revocation store backed by a dict.
+
+    Lookups are O(1). Expired entries are dropped when they are looked up and in a
+    sweep every `purge_every` revocations. Entries are not shared between processes,
+    so this backend is meant for tests and single-process deployments.
+    """
+
+    blocking = False
+
+    def __init__(self, purge_every: int = 1024) -> None:
+        self.purge_every = purge_every
+        self._entries = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def revoke(self, digest: str, expires_at: Expiry) -> None:
+        deadline = _epoch(expires_at)
+        with self._lock:
+            self._entries[digest] = max(deadline, self._entries.get(digest, deadline))
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(time.time())
+
+    def is_revoked(self, digest: str) -> bool:
+        deadline = self._entries.get(digest)
+        if deadline is None:
+            return False
+        if deadline <= time.time():
+            with self._lock:
+                self._entries.pop(digest, None)
+            return False
+        return True
+
+    def _purge(self, now: float) -> None:
+        for digest in [digest for digest, deadline in self._entries.items() if deadline <= now]:
+            del self._entries[digest]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisRevocationStore(RevocationStore):
+    """
+    Revocation store for Redis or any server speaking the Redis protocol.
+
+    Each revoked token is a key with a millisecond TTL ending at the token's
+    expiry, so the server drops entries on its own and lookups are a single
+    EXISTS. The client is not created here: pass a redis-py compatible client
+    (`redis.Redis`, `fakeredis.FakeRedis`, ...).
+
+    Args:
+        client: Object providing `set(name, value, px=...)` and `exists(name)`.
+        prefix (str, optional): Key prefix. Defaults to "jwtauth:revoked:".
+    """
+
+    def __init__(self, client, prefix: str = "jwtauth:revoked:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def revoke(self, digest: str, expires_at: Expiry) -> None:
+        ttl_ms = int((_epoch(expires_at) - time.time()) * 1000)
+        if ttl_ms > 0:
+            self.client.set(self.prefix + digest, 1, px=ttl_ms)
+
+    def revoke_many(self, entries: Iterable[Tuple[str, Expiry]]) -> None:
+        pipeline = getattr(self.client, "pipeline", None)
+        if pipeline is None:
+            return super().revoke_many(entries)
+        pipe = pipeline()
+        now = time.time()
+        for digest, expires_at in entries:
+            ttl_ms = int((_epoch(expires_at) - now) * 1000)
+            if ttl_ms > 0:
+                pipe.set(self.prefix + digest, 1, px=ttl_ms)
+        pipe.execute()
+
+    def is_revoked(self, digest: str) -> bool:
+        return bool(self.client.exists(self.prefix + digest))
+
+    def revoked_digests(self, digests: Iterable[str]) -> Set[str]:
+        pipeline = getattr(self.client, "pipeline", None)
+        if pipeline is None:
+            return super().revoked_digests(digests)
+        digests = list(digests)
+        pipe = pipeline()
+        for digest in digests:
+            pipe.exists(self.prefix + digest)
+        return {digest for digest, found in zip(digests, pipe.execute()) if found}
@@ -0,0 +1,146 @@
+import base64
+import functools
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Union
+
+_SEPARATORS = re.compile(r"[,\s]+")
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_base64_mask(value: str) -> int:
+    # Tokens of the same user/role share a mask string, so decoded masks are reused.
+    try:
+        return int.from_bytes(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)), "big")
+    except (TypeError, ValueError):
+        return 0
+
+
+class ScopeRequirement:
+    """
+    Precompiled scope check: a token passes when its scope mask has every required bit set.
+
+    Built by ScopeRegistry.require(); calling it with the verified claims is a
+    dict lookup and one bitwise AND.
+    """
+
+    __slots__ = ("registry", "scopes", "mask")
+
+    def __init__(self, registry: "ScopeRegistry", scopes: List[str], mask: int) -> None:
+        self.registry = registry
+        self.scopes = scopes
+        self.mask = mask
+
+    def __call__(self, claims: Mapping[str, Any]) -> bool:
+        value = claims.get(self.registry.claim)
+        if value is None:
+            return self.mask == 0
+        granted = value if type(value) is int else self.registry.decode(value)
+        return granted & self.mask == self.mask
+
+
+class ScopeRegistry:
+    """
+    Maps scope names to bit positions so a token can carry its scopes as one integer.
+
+    Positions are assigned in registration order and are part of the token
+    format: only ever append scopes, never reorder or remove them, or tokens
+    issued before the change grant the wrong scopes.
+
+    Args:
+        scopes (iterable, optional): Scope names to register, in bit order.
+        claim (str, optional): Claim that holds the mask. Defaults to "scp".
+        encoding (str, optional): "int" stores the mask as a JSON integer; "base64" as an
+            unpadded base64url string of its big-endian bytes, for clients that lose
+            precision above 2**53. Defaults to "int".
+    """
+
+    def __init__(self, scopes: Iterable[str] = (), claim: str = "scp", encoding: str = "int") -> None:
+        if encoding not in ("int", "base64"):
+            raise ValueError("encoding must be 'int' or 'base64'.")
+        self.claim = claim
+        self.encoding = encoding
+        self._bits: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+        for scope in scopes:
+            self.register(scope)
+
+    def register(self, scope: str) -> int:
+        """Register `scope` if needed and return its bit position."""
+        with self._lock:
+            if scope not in self._bits:
+                if not scope or _SEPARATORS.search(scope):
+                    raise ValueError(f"Invalid scope name '{scope}'.")
+                self._bits[scope] = len(self._names)
+                self._names.append(scope)
+            return self._bits[scope]
+
+    def __contains__(self, scope: str) -> bool:
+        return scope in self._bits
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def mask(self, scopes: Union[str, Iterable[str], None], strict: bool = True) -> int:
+        """
+        Return the bitmask of `scopes`.
+
+        Args:
+            scopes (str | iterable | None): Scope names, or a comma and/or space separated
+                string such as the `Users.scopes` column.
+            strict (bool, optional): Raise ValueError for unregistered scopes instead of
+                leaving them out. Defaults to True.
+        """
+        if not scopes:
+            return 0
+        if isinstance(scopes, str):
+            scopes = _SEPARATORS.split(scopes.strip())
+        mask = 0
+        for scope in scopes:
+            if not scope:
+                continue
+            bit = self._bits.get(scope)
+            if bit is None:
+                if strict:
+                    raise ValueError(f"Unknown scope '{scope}'.")
+                continue
+            mask |= 1 << bit
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        """Return the scope names set in `mask`, in bit order."""
+        return [name for bit, name in enumerate(self._names) if mask >> bit & 1]
+
+    def encode(self, mask: int) -> Union[int, str]:
+        """Return the claim value for `mask`."""
+        if self.encoding == "int":
+            return mask
+        data = mask.to_bytes(max(1, (mask.bit_length() + 7) // 8), "big")
+        return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+    def decode(self, value: Union[int, str]) -> int:
+        """Return the mask stored in a claim value of either encoding."""
+        if isinstance(value, int):
+            return value
+        if not isinstance(value, str):
+            return 0
+        return _decode_base64_mask(value)
+
+    def claims(self, scopes: Union[str, Iterable[str], None], strict: bool = False) -> Dict[str, Any]:
+        """Return the scope claim for `scopes`, e.g. to add to an access token's payload."""
+        return {self.claim: self.encode(self.mask(scopes, strict=strict))}
+
+    def scopes_of(self, claims: Mapping[str, Any]) -> List[str]:
+        """Return the scope names granted by verified token claims."""
+        value = claims.get(self.claim)
+        return self.names(self.decode(value)) if value is not None else []
+
+    def require(self, *scopes: str) -> ScopeRequirement:
+        """Precompile a check for tokens that grant all of `scopes`. Unknown scopes raise ValueError."""
+        return ScopeRequirement(self, list(scopes), self.mask(scopes))
+
+
+def require_scopes(registry: ScopeRegistry, *scopes: str) -> ScopeRequirement:
+    """Shorthand for registry.require(*scopes)."""
+    return registry.require(*scopes)
@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+from .metrics import get_instrumentation
+
+
+class LoginThrottledError(RuntimeError):
+    """
+    Raised when a login attempt exceeds a rate limit, before any password hashing.
+
+    Attributes:
+        limit (str): The limit that was hit: "client", "username" or "global".
+        retry_after (float): Seconds until the next attempt would be allowed.
+    """
+
+    def __init__(self, limit: str, retry_after: float) -> None:
+        super().__init__(f"Too many login attempts ({limit} limit), retry in {retry_after:.0f}s.")
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class RateLimit(NamedTuple):
+    """Token bucket of `capacity` attempts that refills completely over `period` seconds."""
+
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+class ThrottleStore:
+    """Storage of token buckets. Subclasses must update a bucket atomically."""
+
+    # Whether consume() may block on I/O; async callers then run it in a thread.
+    blocking = True
+
+    def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """
+        Take `cost` tokens from the bucket `key` if it holds enough.
+
+        Returns:
+            tuple: (allowed, tokens remaining, seconds until `cost` tokens are available)
+        """
+        raise NotImplementedError
+
+    def remaining(self, key: str, limit: RateLimit) -> float:
+        """Tokens currently in the bucket `key`, without taking any."""
+        raise NotImplementedError
+
+
+class MemoryThrottleStore(ThrottleStore):
+    """
+    Per-process buckets. Suited to a single worker; use RedisThrottleStore to share limits.
+
+    Args:
+        max_keys (int, optional): Buckets kept; the least recently used is dropped beyond
+            that, so random usernames cannot grow memory without bound. Defaults to 100000.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refilled(self, key: str, limit: RateLimit, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (limit.capacity, now))
+        return min(limit.capacity, tokens + (now - updated) * limit.rate)
+
+    def consume(self, key, limit, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._refilled(key, limit, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, 0.0 if allowed else (cost - tokens) / limit.rate
+
+    def remaining(self, key, limit):
+        with self._lock:
+            return self._refilled(key, limit, time.monotonic())
+
+
+# KEYS[1] bucket; ARGV capacity, rate (tokens/s), cost. Uses the server clock so that
+# every application server sees the same refill.
+_REDIS_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry = (cost - tokens) / rate
+if cost > 0 and tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+    retry = 0
+end
+if cost > 0 then
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+end
+return {allowed, tostring(tokens), tostring(math.max(retry, 0))}
+"""
+
+
+class RedisThrottleStore(ThrottleStore):
+    """
+    Buckets shared by every process through Redis (or a server speaking its protocol).
+
+    Each bucket is a hash updated by one Lua script, so concurrent attempts on
+    different servers cannot overspend it, and it expires once it would be full.
+
+    Args:
+        client: redis-py compatible client providing `eval`.
+        prefix (str, optional): Key prefix. Defaults to "jwtauth:throttle:".
+    """
+
+    def __init__(self, client, prefix: str = "jwtauth:throttle:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def _eval(self, key, limit, cost):
+        allowed, tokens, retry_after = self.client.eval(_REDIS_BUCKET, 1, self.prefix + key,
+                                                        limit.capacity, limit.rate, cost)
+        return bool(int(allowed)), float(tokens), float(retry_after)
+
+    def consume(self, key, limit, cost=1.0):
+        return self._eval(key, limit, cost)
+
+    def remaining(self, key, limit):
+        return self._eval(key, limit, 0)[1]
+
+
+class LoginThrottle:
+    """
+    Token-bucket limits checked before a login does any database or hashing work.
+
+    An attempt is checked against the client's bucket (e.g. keyed by IP), then
+    the username's, then the global one, and stops at the first empty bucket,
+    so a client that is already blocked does not drain the budget of the
+    usernames it targets. Usernames are compared case-insensitively. Every
+    attempt counts, successful or not.
+
+    Args:
+        per_username (RateLimit, optional): Attempts per username. Defaults to 5 per minute.
+            None disables the limit.
+        per_client (RateLimit, optional): Attempts per client key. Defaults to 20 per minute.
+        global_limit (RateLimit, optional): Attempts across all users, e.g. sized to the
+            hashing capacity. Defaults to None (no limit).
+        store (ThrottleStore, optional): Bucket storage. Defaults to a MemoryThrottleStore.
+    """
+
+    def __init__(self, per_username: Optional[RateLimit] = RateLimit(5, 60),
+                 per_client: Optional[RateLimit] = RateLimit(20, 60),
+                 global_limit: Optional[RateLimit] = None,
+                 store: Optional[ThrottleStore] = None) -> None:
+        self.per_username = per_username
+        self.per_client = per_client
+        self.global_limit = global_limit
+        self.store = store or MemoryThrottleStore()
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._rejected = {"client": 0, "username": 0, "global": 0}
+
+    def _buckets(self, username: Optional[str], client_key: Optional[str]):
+        if self.per_client is not None and client_key is not None:
+            yield "client", f"client:{client_key}", self.per_client
+        if self.per_username is not None and username is not None:
+            yield "username", f"user:{username.strip().lower()}", self.per_username
+        if self.global_limit is not None:
+            yield "global", "global", self.global_limit
+
+    def check(self, username: str, client_key: Optional[str] = None) -> Dict[str, float]:
+        """
+        Count one login attempt.
+
+        Args:
+            username (str): The username being logged in to.
+            client_key (str, optional): Identifies the caller, e.g. its IP address or API key.
+
+        Returns:
+            dict: Attempts left in each checked bucket, keyed by "client", "username", "global".
+
+        Raises:
+            LoginThrottledError: If a bucket is empty.
+        """
+        remaining = {}
+        for limit_name, key, limit in self._buckets(username, client_key):
+            allowed, tokens, retry_after = self.store.consume(key, limit)
+            if not allowed:
+                with self._lock:
+                    self._rejected[limit_name] += 1
+                get_instrumentation().increment("login_throttled", limit=limit_name)
+                raise LoginThrottledError(limit_name, retry_after)
+            remaining[limit_name] = tokens
+        with self._lock:
+            self._allowed += 1
+        return remaining
+
+    def remaining(self, username: Optional[str] = None, client_key: Optional[str] = None) -> Dict[str, float]:
+        """Attempts left in the buckets of `username`, `client_key` and the global bucket."""
+        return {limit_name: self.store.remaining(key, limit)
+                for limit_name, key, limit in self._buckets(username, client_key)}
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of allowed attempts and of rejections per limit."""
+        with self._lock:
+            return {"allowed": self._allowed,
+                    "rejected": sum(self._rejected.values()),
+                    **{f"rejected_{name}": count for name, count in self._rejected.items()}}
+
+
+_login_throttle: Optional[LoginThrottle] = None
+
+
+def configure_login_throttle(throttle: Optional[LoginThrottle]) -> Optional[LoginThrottle]:
+    """Set the process-wide login throttle used by the module-level jwt_login. None disables it."""
+    global _login_throttle
+    _login_throttle = throttle
+    return throttle
+
+
+def get_login_throttle() -> Optional[LoginThrottle]:
+    return _login_throttle
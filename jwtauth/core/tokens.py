@@ -0,0 +1,6 @@
+import hashlib
+
+
+def token_digest(token: str) -> str:
+    """Return the fixed-width SHA-256 hex digest that tokens are stored and looked up by."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
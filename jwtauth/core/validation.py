@@ -0,0 +1,137 @@
+from typing import Any, Dict, List, Optional
+import jwt
+from .keyring import KeyRing
+from .metrics import get_instrumentation, stage
+from .tokens import token_digest
+
+
+def verify_token(token, secret_key, algorithm, cache=None, revocation_store=None, keyring=None):
+    """
+    Verify a JWT access token and return its claims.
+
+    Args:
+        token (str): The JWT access token.
+        secret_key (str): The key used to verify the signature.
+        algorithm (str): The signing algorithm.
+        cache (TokenCache, optional): Verified-token cache. A token found in the cache
+            is accepted without verifying its signature again.
+        revocation_store (RevocationStore, optional): Tokens revoked in this store are rejected.
+        keyring (KeyRing, optional): Verify with the ring's key selected by `kid` instead of `secret_key`.
+
+    Returns:
+        dict | None: The token claims, or None if the token is invalid, expired or revoked.
+    """
+    if revocation_store is not None and revocation_store.is_revoked(token_digest(token)):
+        get_instrumentation().increment("tokens_rejected", reason="revoked")
+        return None
+    if cache is not None:
+        claims = cache.get_claims(token)
+        if claims is not None:
+            get_instrumentation().increment("token_cache_hits")
+            return claims
+    try:
+        with stage("token.decode"):
+            if keyring is not None:
+                payload = keyring.decode(token)
+            else:
+                payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+    except jwt.InvalidTokenError:
+        get_instrumentation().increment("tokens_rejected", reason="invalid")
+        return None
+    if cache is not None:
+        cache.put_claims(token, payload)
+    return payload
+
+
+def validate_token(token, secret_key, algorithm, cache=None, revocation_store=None, keyring=None):
+    """
+    Verify a JWT access token.
+
+    Takes the same arguments as verify_token.
+
+    Returns:
+        bool: True if the token is valid, otherwise False.
+    """
+    return verify_token(token, secret_key, algorithm, cache=cache, revocation_store=revocation_store,
+                        keyring=keyring) is not None
+
+
+def validate_many(tokens, secret_key, algorithm, cache=None, revocation_store=None, keyring=None, executor=None):
+    """
+    Verify a batch of JWT access tokens.
+
+    Identical tokens are verified once, revocation is checked with one store
+    lookup for the whole batch, and tokens signed with the same key share the
+    header parse and key lookup.
+
+    Args:
+        tokens (list): The JWT access tokens.
+        secret_key (str): The key used to verify the signatures when no keyring is given.
+        algorithm (str): The signing algorithm when no keyring is given.
+        cache (TokenCache, optional): Verified-token cache, read and filled like validate_token does.
+        revocation_store (RevocationStore, optional): Tokens revoked in this store are rejected.
+        keyring (KeyRing, optional): Verify with the ring's keys instead of `secret_key`.
+        executor (Executor, optional): Pool used to verify RSA/EC/EdDSA signatures, e.g. a ProcessPoolExecutor.
+
+    Returns:
+        list: One bool per token, in input order.
+    """
+    if keyring is None:
+        keyring = KeyRing.from_secret(secret_key, algorithm or "HS256")
+    # Items that are not strings (possibly unhashable, e.g. from a JSON frame) are simply invalid.
+    unique = list(dict.fromkeys(token for token in tokens if isinstance(token, str)))
+    results = dict.fromkeys(unique, False)
+    if revocation_store is not None:
+        digests = {token_digest(token): token for token in unique}
+        revoked = revocation_store.revoked_digests(digests)
+        unique = [token for digest, token in digests.items() if digest not in revoked]
+    pending = []
+    for token in unique:
+        if cache is not None and cache.get_claims(token) is not None:
+            results[token] = True
+        else:
+            pending.append(token)
+    for token, payload in zip(pending, keyring.decode_many(pending, executor=executor)):
+        if payload is not None:
+            results[token] = True
+            if cache is not None:
+                cache.put_claims(token, payload)
+    return [results.get(token, False) if isinstance(token, str) else False for token in tokens]
+
+
+class TokenValidator:
+    """
+    Validate-only entry point for services that check tokens but never issue them.
+
+    Importing this module loads PyJWT but not SQLAlchemy, bcrypt or the
+    models, and constructing a validator needs no configured database.
+
+    Args:
+        secret_key (str, optional): Verification key when no keyring is given.
+        algorithm (str, optional): Signing algorithm when no keyring is given. Defaults to "HS256".
+        keyring (KeyRing, optional): Verify with the ring's keys instead of `secret_key`.
+        cache (TokenCache, optional): Verified-token cache.
+        revocation_store (RevocationStore, optional): Tokens revoked in this store are rejected.
+    """
+
+    def __init__(self, secret_key: Optional[str] = None, algorithm: str = "HS256", keyring: Optional[KeyRing] = None,
+                 cache=None, revocation_store=None) -> None:
+        if keyring is None:
+            if not secret_key:
+                raise ValueError("Secret key is required.")
+            keyring = KeyRing.from_secret(secret_key, algorithm or "HS256")
+        self.keyring = keyring
+        self.cache = cache
+        self.revocation_store = revocation_store
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the claims of a valid token, or None."""
+        return verify_token(token, None, None, cache=self.cache, revocation_store=self.revocation_store,
+                            keyring=self.keyring)
+
+    def validate(self, token: str) -> bool:
+        return self.verify(token) is not None
+
+    def validate_many(self, tokens: List[str], executor=None) -> List[bool]:
+        return validate_many(tokens, None, None, cache=self.cache, revocation_store=self.revocation_store,
+                             keyring=self.keyring, executor=executor)
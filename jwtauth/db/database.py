@@ -1,40 +1,459 @@
-from typing import Optional
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+import inspect
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from fastapi_jwtauth.jwtauth.core.metrics import current_operation, get_instrumentation, stage
+
+
+class _ScopeState:
+    """Session shared by the nested session scopes of one unit of work."""
+
+    def __init__(self, session: Session, readonly: bool, replica: bool = False) -> None:
+        self.session = session
+        self.readonly = readonly
+        self.replica = replica
+        # Called once the unit of work has committed, e.g. to mirror revocations.
+        self.on_commit: List[Callable[[], Any]] = []
+
+
+_current_scope: ContextVar[Optional[_ScopeState]] = ContextVar("jwtauth_session_scope", default=None)
+_current_async_scope: ContextVar[Optional[_ScopeState]] = ContextVar("jwtauth_async_session_scope", default=None)
+# Set by DatabaseConfig.primary_reads() to keep replica reads on the primary.
+_primary_reads: ContextVar[bool] = ContextVar("jwtauth_primary_reads", default=False)
+
+
+class PoolMetrics:
+    """Connection pool checkout and wait counters collected by DatabaseConfig."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pools = weakref.WeakSet()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sessions_opened = 0
+            self.sessions_closed = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.wait_count = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def watch(self, engine) -> None:
+        """Attach checkout/checkin listeners to the engine's pool, and a query counter to the engine, once."""
+        pool = engine.pool
+        with self._lock:
+            if pool in self._pools:
+                return
+            self._pools.add(pool)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    @staticmethod
+    def _on_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        instrumentation = get_instrumentation()
+        if instrumentation.enabled:
+            instrumentation.increment("db_queries", operation=current_operation() or "other")
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_session(self, opened: bool) -> None:
+        with self._lock:
+            if opened:
+                self.sessions_opened += 1
+            else:
+                self.sessions_closed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sessions_opened": self.sessions_opened,
+                    "sessions_closed": self.sessions_closed,
+                    "checkouts": self.checkouts,
+                    "checkins": self.checkins,
+                    "checked_out": self.checked_out,
+                    "peak_checked_out": self.peak_checked_out,
+                    "wait_count": self.wait_count,
+                    "wait_seconds_total": self.wait_seconds_total,
+                    "wait_seconds_max": self.wait_seconds_max,
+                    "wait_seconds_avg": self.wait_seconds_total / self.wait_count if self.wait_count else 0.0}
+
+
+class ReplicaSet:
+    """
+    Read replicas used by session scopes opened with `replica=True`.
+
+    A replica whose connection fails is skipped for `retry_after` seconds. When
+    no replica is healthy the scope falls back to the primary.
+
+    Args:
+        factories (iterable): sessionmakers (or async_sessionmakers) bound to the replicas.
+        strategy (str, optional): "round_robin", or "least_loaded" to pick the replica with
+            the fewest open sessions. Defaults to "round_robin".
+        retry_after (float, optional): Seconds an unhealthy replica is skipped. Defaults to 30.
+    """
+
+    STRATEGIES = ("round_robin", "least_loaded")
+
+    def __init__(self, factories: Iterable[Any], strategy: str = "round_robin", retry_after: float = 30.0) -> None:
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"strategy must be one of {', '.join(self.STRATEGIES)}.")
+        self.factories = list(factories)
+        if not self.factories:
+            raise ValueError("At least one replica session factory is required.")
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._open = [0] * len(self.factories)
+        self._down_until = [0.0] * len(self.factories)
+        self._next = 0
+        self.reads = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    def candidates(self) -> List[int]:
+        """Indexes of the healthy replicas in the order they should be tried."""
+        now = time.monotonic()
+        count = len(self.factories)
+        with self._lock:
+            healthy = [index for index in range(count) if self._down_until[index] <= now]
+            if self.strategy == "least_loaded":
+                healthy.sort(key=self._open.__getitem__)
+            else:
+                start = self._next
+                self._next = (self._next + 1) % count
+                healthy.sort(key=lambda index: (index - start) % count)
+        return healthy
+
+    def acquire(self, index: int) -> None:
+        with self._lock:
+            self._open[index] += 1
+            self.reads += 1
+
+    def release(self, index: int) -> None:
+        with self._lock:
+            self._open[index] -= 1
+
+    def mark_down(self, index: int) -> None:
+        """Skip a replica for `retry_after` seconds, e.g. after a connection error."""
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+            self.failures += 1
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {"replicas": len(self.factories),
+                    "healthy": sum(1 for until in self._down_until if until <= now),
+                    "open_sessions": list(self._open),
+                    "reads": self.reads,
+                    "failures": self.failures,
+                    "fallbacks": self.fallbacks}
+
 
 class DatabaseConfig:
     """Singleton class to manage database configuration state"""
     _instance = None
     _initialized = False
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
         if not DatabaseConfig._initialized:
             self.Base: Optional[DeclarativeBase] = None
             self.SessionLocal: Optional[sessionmaker] = None
+            self.AsyncSessionLocal = None
+            self.readers: Optional[ReplicaSet] = None
+            self.async_readers: Optional[ReplicaSet] = None
+            self.replica_lag = 5.0
+            self._recent_writes: "OrderedDict[Any, float]" = OrderedDict()
+            self._recent_writes_lock = threading.Lock()
+            self.metrics = PoolMetrics()
             DatabaseConfig._initialized = True
-    
-    def configure(self, base: DeclarativeBase, session: sessionmaker) -> None:
-        """Configure the database settings"""
+
+    def configure(self, base: DeclarativeBase, session: sessionmaker, async_session=None,
+                  readers=None, async_readers=None, reader_strategy: str = "round_robin",
+                  replica_retry_after: float = 30.0, replica_lag: float = 5.0) -> None:
+        """
+        Configure the database settings
+
+        Args:
+            base (DeclarativeBase): The declarative base the models are created on.
+            session (sessionmaker): Factory for synchronous sessions on the primary (writer).
+            async_session (async_sessionmaker, optional): Factory for AsyncSession objects,
+                used by the async service layer.
+            readers (list, optional): sessionmakers bound to read replicas, used for pure reads.
+            async_readers (list, optional): async_sessionmakers bound to read replicas.
+            reader_strategy (str, optional): "round_robin" or "least_loaded". Defaults to "round_robin".
+            replica_retry_after (float, optional): Seconds a failing replica is skipped. Defaults to 30.
+            replica_lag (float, optional): Seconds after a write during which reads of the written
+                rows stay on the primary (see mark_written). Defaults to 5.
+        """
         self.Base = base
         self.SessionLocal = session
+        self.AsyncSessionLocal = async_session
+        self.readers = ReplicaSet(readers, reader_strategy, replica_retry_after) if readers else None
+        self.async_readers = (ReplicaSet(async_readers, reader_strategy, replica_retry_after)
+                              if async_readers else None)
+        self.replica_lag = replica_lag
         return self.Base
-    
+
     def get_base(self) -> DeclarativeBase:
         """Get the configured Base class"""
         if self.Base is None:
             raise RuntimeError("Database Base class not configured. Call configure() first")
         return self.Base
-    
+
     def get_session(self) -> sessionmaker:
         """Get the configured SessionLocal"""
         if self.SessionLocal is None:
             raise RuntimeError("Database Session not configured. Call configure() first")
         return self.SessionLocal
 
+    def after_commit(self, callback: Callable[[], Any]) -> None:
+        """
+        Call `callback()` once the current session_scope() unit of work has committed.
+
+        Outside a scope it is called right away; if the unit of work rolls back it is dropped.
+        """
+        state = _current_scope.get()
+        if state is None:
+            callback()
+        else:
+            state.on_commit.append(callback)
+
+    async def async_after_commit(self, callback: Callable[[], Any]) -> None:
+        """Async counterpart of after_commit() for async_session_scope(). `callback` may return an awaitable."""
+        state = _current_async_scope.get()
+        if state is not None:
+            state.on_commit.append(callback)
+            return
+        result = callback()
+        if inspect.isawaitable(result):
+            await result
+
+    def mark_written(self, *keys) -> None:
+        """
+        Record that the rows identified by `keys`, e.g. ("users", username), were just written.
+
+        For `replica_lag` seconds written_recently() is True for them, so reads that
+        must see the write can stay on the primary. Nothing is recorded without replicas.
+        """
+        if self.readers is None and self.async_readers is None:
+            return
+        now = time.monotonic()
+        with self._recent_writes_lock:
+            for key in keys:
+                self._recent_writes.pop(key, None)
+                self._recent_writes[key] = now
+            cutoff = now - self.replica_lag
+            while self._recent_writes and next(iter(self._recent_writes.values())) <= cutoff:
+                self._recent_writes.popitem(last=False)
+
+    def written_recently(self, key) -> bool:
+        """True if mark_written(key) was called less than `replica_lag` seconds ago."""
+        written = self._recent_writes.get(key)
+        return written is not None and time.monotonic() - written < self.replica_lag
+
+    @contextmanager
+    def primary_reads(self) -> Iterator[None]:
+        """Serve the replica scopes opened inside from the primary, e.g. to read data written just before."""
+        token = _primary_reads.set(True)
+        try:
+            yield
+        finally:
+            _primary_reads.reset(token)
+
+    @staticmethod
+    def _nested(state: _ScopeState, readonly: bool) -> None:
+        if not readonly:
+            if state.replica:
+                raise RuntimeError("Cannot write inside a session scope opened on a read replica.")
+            state.readonly = False
+
+    def _connect(self, session) -> None:
+        self.metrics.watch(session.get_bind())
+        started = time.perf_counter()
+        session.connection()
+        self.metrics.record_wait(time.perf_counter() - started)
+
+    def _open_replica(self) -> Tuple[Optional[Session], Optional[int]]:
+        for index in self.readers.candidates():
+            session = self.readers.factories[index]()
+            try:
+                self._connect(session)
+            except DBAPIError:
+                session.close()
+                self.readers.mark_down(index)
+                continue
+            self.readers.acquire(index)
+            return session, index
+        self.readers.record_fallback()
+        return None, None
+
+    @contextmanager
+    def session_scope(self, readonly: bool = False, replica: bool = False) -> Iterator[Session]:
+        """
+        Provide a session for one unit of work and always return it to the pool.
+
+        The outermost scope opens the session, commits on success, rolls back on
+        error and closes it. Scopes opened inside it, e.g. by nested service calls
+        or by wrapping a whole request in `session_scope()`, reuse the same session
+        and leave the commit to the outermost scope.
+
+        Args:
+            readonly (bool, optional): The work only reads. Read-only scopes skip the
+                commit; closing the session ends their transaction. Defaults to False.
+            replica (bool, optional): The work only reads and tolerates replication lag, so
+                it may run on a read replica (see `configure(readers=...)`). A nested scope
+                still shares the outer session, so reads after a write see that write.
+                Defaults to False.
+        """
+        state = _current_scope.get()
+        if state is not None:
+            self._nested(state, readonly or replica)
+            yield state.session
+            return
+
+        index = None
+        if replica and self.readers is not None and not _primary_reads.get():
+            session, index = self._open_replica()
+        if index is None:
+            session = self.get_session()()
+        # Objects returned by the services are used after the session is closed.
+        session.expire_on_commit = False
+        self.metrics.record_session(opened=True)
+        state = _ScopeState(session, readonly or replica, index is not None)
+        token = _current_scope.set(state)
+        try:
+            if index is None:
+                self._connect(session)
+            yield session
+            if not state.readonly:
+                with stage("db.commit"):
+                    session.commit()
+            for callback in state.on_commit:
+                callback()
+        except BaseException as error:
+            session.rollback()
+            if index is not None and isinstance(error, DBAPIError) and error.connection_invalidated:
+                self.readers.mark_down(index)
+            raise
+        finally:
+            _current_scope.reset(token)
+            session.close()
+            self.metrics.record_session(opened=False)
+            if index is not None:
+                self.readers.release(index)
+
+    def get_async_session(self):
+        """Get the configured async_sessionmaker"""
+        if self.AsyncSessionLocal is None:
+            raise RuntimeError("Async database session not configured. Pass async_session to configure() first")
+        return self.AsyncSessionLocal
+
+    async def _aconnect(self, session) -> None:
+        self.metrics.watch(session.sync_session.get_bind())
+        started = time.perf_counter()
+        await session.connection()
+        self.metrics.record_wait(time.perf_counter() - started)
+
+    async def _aopen_replica(self) -> Tuple[Any, Optional[int]]:
+        for index in self.async_readers.candidates():
+            session = self.async_readers.factories[index]()
+            try:
+                await self._aconnect(session)
+            except DBAPIError:
+                await session.close()
+                self.async_readers.mark_down(index)
+                continue
+            self.async_readers.acquire(index)
+            return session, index
+        self.async_readers.record_fallback()
+        return None, None
+
+    @asynccontextmanager
+    async def async_session_scope(self, readonly: bool = False, replica: bool = False) -> AsyncIterator[Any]:
+        """
+        Async counterpart of session_scope() built on the configured async_sessionmaker.
+
+        Nested scopes within the same task reuse the outer AsyncSession. Replica
+        scopes use `configure(async_readers=...)`.
+        """
+        state = _current_async_scope.get()
+        if state is not None:
+            self._nested(state, readonly or replica)
+            yield state.session
+            return
+
+        index = None
+        if replica and self.async_readers is not None and not _primary_reads.get():
+            session, index = await self._aopen_replica()
+        if index is None:
+            session = self.get_async_session()()
+        session.sync_session.expire_on_commit = False
+        self.metrics.record_session(opened=True)
+        state = _ScopeState(session, readonly or replica, index is not None)
+        token = _current_async_scope.set(state)
+        try:
+            if index is None:
+                await self._aconnect(session)
+            yield session
+            if not state.readonly:
+                with stage("db.commit"):
+                    await session.commit()
+            for callback in state.on_commit:
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+        except BaseException as error:
+            await session.rollback()
+            if index is not None and isinstance(error, DBAPIError) and error.connection_invalidated:
+                self.async_readers.mark_down(index)
+            raise
+        finally:
+            _current_async_scope.reset(token)
+            await session.close()
+            self.metrics.record_session(opened=False)
+            if index is not None:
+                self.async_readers.release(index)
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Return session and connection pool counters, including time spent waiting for a connection."""
+        return self.metrics.snapshot()
+
 
 # Create a global instance
-db_config = DatabaseConfig()
\ No newline at end of file
+db_config = DatabaseConfig()
@@ -0,0 +1,176 @@
+from typing import Dict
+import jwt
+from sqlalchemy import JSON, MetaData, String, Table, bindparam, func, inspect, or_, select, text
+from sqlalchemy.engine import Engine
+from fastapi_jwtauth.jwtauth.core import token_digest
+
+# Claims written by generate_access_token itself; everything else is custom data.
+REGISTERED_CLAIMS = ("exp", "iat", "sub", "iss", "jti")
+
+
+def _custom_claims(access_token: str) -> dict:
+    # The token comes from our own table, so only the payload is needed here.
+    try:
+        payload = jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return {}
+    return {key: value for key, value in payload.items() if key not in REGISTERED_CLAIMS}
+
+
+def _remove_duplicate_digests(engine: Engine, table: Table) -> int:
+    """
+    Delete all but the newest row of each digest shared by several rows.
+
+    Tokens issued before they carried a `jti` are identical for two logins in the
+    same second, so legacy tables can hold the same token more than once.
+    """
+    removed = 0
+    for column in (table.c.access_token_digest, table.c.refresh_token_digest):
+        with engine.begin() as conn:
+            shared = conn.scalars(select(column).group_by(column).having(func.count() > 1)).all()
+            for digest in shared:
+                ids = conn.scalars(select(table.c.id).where(column == digest).order_by(table.c.id)).all()
+                conn.execute(table.delete().where(table.c.id.in_(ids[:-1])))
+                removed += len(ids) - 1
+    return removed
+
+
+def _require_digests(engine: Engine, table: Table) -> None:
+    with engine.connect() as conn:
+        missing = conn.scalar(select(func.count()).select_from(table).where(
+            or_(table.c.access_token_digest.is_(None), table.c.refresh_token_digest.is_(None))))
+    if missing:
+        raise RuntimeError(f"{missing} token rows have no digest; run upgrade_token_storage() again.")
+
+
+def _set_not_null(engine: Engine, table_name: str, names) -> None:
+    quote = engine.dialect.identifier_preparer.quote
+    column_type = String(64).compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        for name in names:
+            if engine.dialect.name in ("mysql", "mariadb"):
+                clause = f"MODIFY {quote(name)} {column_type} NOT NULL"
+            elif engine.dialect.name == "mssql":
+                clause = f"ALTER COLUMN {quote(name)} {column_type} NOT NULL"
+            else:
+                clause = f"ALTER COLUMN {quote(name)} SET NOT NULL"
+            conn.execute(text(f"ALTER TABLE {quote(table_name)} {clause}"))
+
+
+def _rebuild_sqlite_table(engine: Engine, table: Table) -> int:
+    """
+    Recreate `table` from its model definition and copy the rows over, in one transaction.
+
+    SQLite cannot add NOT NULL to an existing column. Columns the model does not
+    declare, i.e. the plaintext tokens, are dropped. Returns the number of indexes created.
+    """
+    quote = engine.dialect.identifier_preparer.quote
+    legacy = f"{table.name}_legacy"
+    with engine.begin() as conn:
+        # pysqlite only opens a transaction before DML, so the DDL below would autocommit.
+        if not conn.connection.dbapi_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN")
+        existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+        for index in inspect(conn).get_indexes(table.name):
+            conn.execute(text(f"DROP INDEX {quote(index['name'])}"))
+        conn.execute(text(f"ALTER TABLE {quote(table.name)} RENAME TO {quote(legacy)}"))
+        table.create(bind=conn)
+        copied = ", ".join(quote(column.name) for column in table.columns if column.name in existing)
+        conn.execute(text(f"INSERT INTO {quote(table.name)} ({copied}) SELECT {copied} FROM {quote(legacy)}"))
+        conn.execute(text(f"DROP TABLE {quote(legacy)}"))
+    return len(table.indexes)
+
+
+def upgrade_token_storage(engine: Engine, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Move an existing database to the digest based token layout.
+
+    Tables created by earlier versions stored `access_token` and `refresh_token`
+    in plaintext and had no indexes. This helper:
+
+    1. adds the `access_token_digest`, `refresh_token_digest` and `claims` columns,
+    2. backfills them from the plaintext tokens in batches of `batch_size` rows,
+    3. deletes all but the newest row of tokens stored more than once,
+    4. makes the digest columns NOT NULL and creates the indexes declared on the
+       models (including the unique username index, which fails if duplicate
+       usernames exist),
+    5. drops the plaintext token columns, only once everything else succeeded.
+
+    It is safe to run more than once, including after a failed run. On SQLite,
+    steps 4 and 5 rebuild the tokens table in a single transaction. The package
+    must be configured with configure_db() before calling it.
+
+    Args:
+        engine (Engine): Engine bound to the database to upgrade.
+        batch_size (int, optional): Rows backfilled per transaction. Defaults to 1000.
+
+    Returns:
+        dict: {"rows_migrated": int, "duplicates_removed": int, "indexes_created": int}
+    """
+    from fastapi_jwtauth.jwtauth.models import Users, JwtTokens
+
+    table_name = JwtTokens.__tablename__
+    quote = engine.dialect.identifier_preparer.quote
+    columns = {column["name"] for column in inspect(engine).get_columns(table_name)}
+    new_columns = (("access_token_digest", String(64)),
+                   ("refresh_token_digest", String(64)),
+                   ("claims", JSON()))
+    with engine.begin() as conn:
+        for name, column_type in new_columns:
+            if name not in columns:
+                conn.execute(text(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} "
+                                  f"{column_type.compile(dialect=engine.dialect)}"))
+
+    rows_migrated = 0
+    duplicates_removed = 0
+    legacy = "access_token" in columns
+    table = Table(table_name, MetaData(), autoload_with=engine)
+    if legacy:
+        pending = (select(table.c.id, table.c.access_token, table.c.refresh_token)
+                   .where(table.c.access_token_digest.is_(None))
+                   .limit(batch_size))
+        update = (table.update()
+                  .where(table.c.id == bindparam("row_id"))
+                  .values(access_token_digest=bindparam("access_digest"),
+                          refresh_token_digest=bindparam("refresh_digest"),
+                          claims=bindparam("row_claims", type_=JSON())))
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(pending).all()
+                if not rows:
+                    break
+                conn.execute(update, [{"row_id": row.id,
+                                       "access_digest": token_digest(row.access_token),
+                                       "refresh_digest": token_digest(row.refresh_token),
+                                       "row_claims": _custom_claims(row.access_token) or None}
+                                      for row in rows])
+                rows_migrated += len(rows)
+        duplicates_removed = _remove_duplicate_digests(engine, table)
+
+    nullable = [column["name"] for column in inspect(engine).get_columns(table_name)
+                if column["name"] in ("access_token_digest", "refresh_token_digest") and column["nullable"]]
+    if nullable:
+        _require_digests(engine, table)
+
+    indexes_created = 0
+    if engine.dialect.name == "sqlite":
+        if legacy or nullable:
+            indexes_created += _rebuild_sqlite_table(engine, JwtTokens.__table__)
+    elif nullable:
+        _set_not_null(engine, table_name, nullable)
+
+    existing = {index["name"] for model in (Users, JwtTokens)
+                for index in inspect(engine).get_indexes(model.__tablename__)}
+    with engine.begin() as conn:
+        for model in (Users, JwtTokens):
+            for index in model.__table__.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    indexes_created += 1
+
+    if legacy and engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            for name in ("access_token", "refresh_token"):
+                conn.execute(text(f"ALTER TABLE {quote(table_name)} DROP COLUMN {quote(name)}"))
+    return {"rows_migrated": rows_migrated, "duplicates_removed": duplicates_removed,
+            "indexes_created": indexes_created}
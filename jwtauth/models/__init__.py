@@ -1,3 +1,18 @@
-from .base import Users, JwtTokens
+from fastapi_jwtauth.jwtauth.core.tokens import token_digest
 
-__all__ = ["Users", "JwtTokens"]
\ No newline at end of file
+# The model classes are created on the Base given to configure_db(), which
+# imports them. Accessing one before that raises RuntimeError.
+_models = ("Users", "JwtTokens", "TokenStatus", "EnvVarsModel", "JwtAccessTokenPayload")
+
+__all__ = [*_models, "token_digest"]
+
+
+def __getattr__(name):
+    if name not in _models:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import base
+    return getattr(base, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_models))
@@ -1,18 +1,19 @@
 # auth_package/models/base.py
 import datetime
-import bcrypt
 from enum import Enum
-from typing import List
+from typing import Any, List, Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship, declared_attr
 from sqlalchemy.sql import func
-from sqlalchemy import String, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, ForeignKey, Index, JSON, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declared_attr
 from fastapi_jwtauth.jwtauth.db.database import db_config
+from fastapi_jwtauth.jwtauth.core import hash_password, verify_password, token_digest
 
-Base = db_config.get_base()
+if db_config.Base is None:
+    raise RuntimeError("You must configure the jwtauth package with configure_db() before using its models.")
+
+Base = db_config.Base
 
-if Base is None:
-    raise RuntimeError("You must configure the jwtauth package before using it.")
 
 class BaseModel(Base):
     __abstract__ = True
@@ -29,7 +30,7 @@ class UsersModel(BaseModel):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     firstname: Mapped[str] = mapped_column(String(100),nullable=False)
     lastname: Mapped[str] = mapped_column(String(100),nullable=False)
-    username: Mapped[str] = mapped_column(String(100),nullable=False)
+    username: Mapped[str] = mapped_column(String(100),nullable=False, unique=True, index=True)
     password: Mapped[str] = mapped_column(String(100),nullable=False)
     scopes: Mapped[str] = mapped_column(String(100),nullable=True)   # comma-separated scopes
     email: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -37,11 +38,11 @@ class UsersModel(BaseModel):
 
     def set_password(self, password: str):
         """Hash and set the password."""
-        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password = hash_password(password)
 
     def check_password(self, password: str) -> bool:
         """Check if the provided password matches the stored hash."""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+        return verify_password(password, self.password)
 
 class Users(UsersModel):
     __tablename__ = "users"
@@ -57,8 +58,11 @@ class JWTModel(BaseModel):
     __abstract__ = True
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    access_token: Mapped[str] = mapped_column(String(1000),nullable=False)
-    refresh_token: Mapped[str] = mapped_column(String(1000),nullable=False)
+    access_token_digest: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True,
+                                                     comment="SHA-256 hex digest of the access token")
+    refresh_token_digest: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True,
+                                                      comment="SHA-256 hex digest of the refresh token")
+    claims: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, comment="Custom claims carried over on refresh")
     access_expiry_time: Mapped[datetime.datetime] = mapped_column(nullable=False,comment="The time when the access token expires")
     refresh_expiry_time: Mapped[datetime.datetime] = mapped_column(nullable=False, comment="The time when the refresh token expires")
     is_revoked: Mapped[bool] = mapped_column(nullable=False, default=False, comment="The refresh token is revoked or not")
@@ -66,6 +70,31 @@ class JWTModel(BaseModel):
     status: Mapped[TokenStatus] = mapped_column(SQLEnum(TokenStatus), nullable=False)
     is_active: Mapped[bool] = mapped_column(nullable=False, default=True)
 
+    @declared_attr.directive
+    def __table_args__(cls):
+        return (Index(f"ix_{cls.__tablename__}_user_id_is_active", "user_id", "is_active"),
+                # Used by the token reaper to find purgeable rows in batches.
+                Index(f"ix_{cls.__tablename__}_refresh_expiry_time", "refresh_expiry_time"),
+                Index(f"ix_{cls.__tablename__}_is_active_access_expiry_time", "is_active", "access_expiry_time"))
+
 class JwtTokens(JWTModel):
     __tablename__ = "jwttokens"
+
+
+class EnvVarsModel(BaseModel):
+    """Runtime settings such as JWT_SECRET_KEY or JWT_ACCESS_TOKEN_EXPIRY, see config.runtime."""
+    __tablename__ = "jwt_env_vars"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    env_name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    env_value: Mapped[str] = mapped_column(String(500), nullable=False)
+    is_active: Mapped[bool] = mapped_column(nullable=False, default=True)
+
+
+class JwtAccessTokenPayload(BaseModel):
+    """Static claims added to every access token."""
+    __tablename__ = "jwt_access_token_payload"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    payload_key: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    payload_value: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    is_active: Mapped[bool] = mapped_column(nullable=False, default=True)
    # create all models
\ No newline at end of file
@@ -1,3 +1,44 @@
-from .jwt_services import (create_user, update_user, delete_user)
-from .jwt_services import check_login, get_env_vars, get_jwt_access_payload
-from .jwt_services import save_tokens_db, get_user,get_refresh_details,logout_jwt_service,check_login
\ No newline at end of file
+# The services use the models, which bind to the Base given to configure_db().
+# They are imported on first use so that importing this package does not
+# require the database to be configured yet.
+_exports = {"create_user": "jwt_services",
+            "update_user": "jwt_services",
+            "delete_user": "jwt_services",
+            "check_login": "jwt_services",
+            "get_env_vars": "jwt_services",
+            "get_jwt_access_payload": "jwt_services",
+            "save_tokens_db": "jwt_services",
+            "get_user": "jwt_services",
+            "get_refresh_details": "jwt_services",
+            "logout_jwt_service": "jwt_services",
+            "upgrade_password_hash": "jwt_services",
+            "acreate_user": "async_jwt_services",
+            "aget_user": "async_jwt_services",
+            "acheck_login": "async_jwt_services",
+            "asave_tokens_db": "async_jwt_services",
+            "aget_refresh_details": "async_jwt_services",
+            "alogout_jwt_service": "async_jwt_services",
+            "SQLRevocationStore": "revocation",
+            "TokenReaper": "reaper",
+            "purge_tokens": "reaper",
+            "bulk_create_users": "bulk",
+            "read_users": "bulk",
+            "UserSnapshot": "user_cache",
+            "UserCache": "user_cache",
+            "configure_user_cache": "user_cache",
+            "get_user_cache": "user_cache"}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{_exports[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime, UTC
+from typing import Dict
+from sqlalchemy import select, update
+from fastapi_jwtauth.jwtauth.core import get_hash_pool, needs_rehash
+from fastapi_jwtauth.jwtauth.core.metrics import instrumented
+from fastapi_jwtauth.jwtauth.models import Users, JwtTokens, TokenStatus, token_digest
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from .jwt_services import _mirror_revocation, _revoked_entries
+from .user_cache import UserSnapshot, get_user_cache, invalidate_users
+
+
+async def _arevoke_after_commit(revocation_store, rows):
+    """Async variant of _revoke_after_commit; blocking stores are called in a worker thread."""
+    entries = _revoked_entries(rows)
+    if not entries:
+        return
+
+    async def revoke():
+        if revocation_store.blocking:
+            await asyncio.to_thread(revocation_store.revoke_many, entries)
+        else:
+            revocation_store.revoke_many(entries)
+    await db_config.async_after_commit(revoke)
+
+
+@instrumented("service.create_user")
+async def acreate_user(user_details:Dict, hash_pool=None) -> Users:
+    """
+    Async variant of create_user.
+
+    The password is hashed on the hash pool so bcrypt never runs on the event loop.
+    """
+    hash_pool = hash_pool or get_hash_pool()
+    async with db_config.async_session_scope() as session:
+        existing_user = await session.scalar(select(Users.id).where(Users.username == user_details["username"]))
+        if existing_user:
+            raise ValueError(f"A user with username '{user_details['username']}' already exists.")
+        existing_email = await session.scalar(select(Users.id).where(Users.email == user_details["email"],
+                                                                     Users.is_active == True))
+        if existing_email:
+            raise ValueError(f"An account with email '{user_details['email']}' already exists.")
+        user = Users(**user_details)
+        user.password = await hash_pool.ahash(user_details["password"])
+        session.add(user)
+        await session.flush()
+        await session.refresh(user)
+    invalidate_users(user.username)
+    return user
+
+
+@instrumented("service.get_user")
+async def aget_user(username):
+    """Async variant of get_user, sharing its user cache."""
+    cache = get_user_cache()
+    if cache is not None:
+        hit, snapshot = cache.lookup(username)
+        if hit:
+            return snapshot
+        generation = cache.generation
+    replica = not db_config.written_recently(("users", username))
+    async with db_config.async_session_scope(readonly=True, replica=replica) as session:
+        user = await session.scalar(select(Users).where(Users.username == username))
+        snapshot = UserSnapshot.from_row(user) if user else None
+    if cache is not None:
+        cache.store(username, snapshot, generation)
+    return snapshot
+
+
+@instrumented("service.check_login")
+async def acheck_login(username, password, hash_pool=None):
+    """
+    Async variant of check_login.
+
+    Returns:
+        UserSnapshot | bool: The authenticated user, or False if the credentials are invalid.
+    """
+    # Credentials are always checked against the primary.
+    with db_config.primary_reads():
+        user = await aget_user(username)
+    if not user:
+        return False
+    hash_pool = hash_pool or get_hash_pool()
+    if not await hash_pool.averify(password, user.password):
+        return False
+    if needs_rehash(user.password):
+        new_hash = await hash_pool.ahash(password)
+        async with db_config.async_session_scope() as session:
+            await session.execute(update(Users)
+                                  .where(Users.id == user.id, Users.password == user.password)
+                                  .values(password=new_hash)
+                                  .execution_options(synchronize_session=False))
+        invalidate_users(user.username)
+        user = user._replace(password=new_hash)
+    return user
+
+
+@instrumented("service.save_tokens_db")
+async def asave_tokens_db(username, access_token, access_expiry, refresh_token, refresh_expiry, user_id=None,
+                          claims=None, max_sessions=1, revocation_store=None):
+    """Async variant of save_tokens_db."""
+    if max_sessions < 1:
+        raise ValueError("max_sessions must be at least 1.")
+    async with db_config.async_session_scope() as session:
+        if user_id is None:
+            user_id = await session.scalar(select(Users.id).where(Users.username == username))
+            if not user_id:
+                return False
+        stale_filter = [JwtTokens.user_id == user_id, JwtTokens.is_active == True]
+        if max_sessions > 1:
+            oldest_kept = await session.scalar(select(JwtTokens.id)
+                                               .where(*stale_filter)
+                                               .order_by(JwtTokens.id.desc())
+                                               .offset(max_sessions - 2)
+                                               .limit(1))
+            stale_filter = stale_filter + [JwtTokens.id < oldest_kept] if oldest_kept else None
+        if stale_filter is not None:
+            if _mirror_revocation(revocation_store):
+                stale_rows = await session.scalars(select(JwtTokens).where(*stale_filter))
+                await _arevoke_after_commit(revocation_store, stale_rows)
+            await session.execute(update(JwtTokens)
+                                  .where(*stale_filter)
+                                  .values(status=TokenStatus.EXPIRED, is_active=False)
+                                  .execution_options(synchronize_session=False))
+        session.add(JwtTokens(user_id=user_id,
+                              access_token_digest=token_digest(access_token),
+                              refresh_token_digest=token_digest(refresh_token),
+                              claims=claims or None,
+                              access_expiry_time=access_expiry,
+                              refresh_expiry_time=refresh_expiry,
+                              is_revoked=0,
+                              status=TokenStatus.ACTIVE,
+                              is_active=1))
+        return True
+
+
+@instrumented("service.get_refresh_details")
+async def aget_refresh_details(user_id, refresh_token, revocation_store=None):
+    """Async variant of get_refresh_details."""
+    async with db_config.async_session_scope() as session:
+        refresh_token_details = await session.scalar(
+            select(JwtTokens).where(JwtTokens.refresh_token_digest == token_digest(refresh_token),
+                                    JwtTokens.user_id == user_id,
+                                    JwtTokens.status == TokenStatus.ACTIVE,
+                                    JwtTokens.is_revoked == False,
+                                    JwtTokens.is_active == True))
+        if not refresh_token_details:
+            return False
+        claims = dict(refresh_token_details.claims or {})
+        exp_time = refresh_token_details.refresh_expiry_time
+        expired = bool(exp_time and datetime.now(UTC) > exp_time.replace(tzinfo=UTC))
+        refresh_token_details.is_revoked = 1
+        refresh_token_details.revoked_at = datetime.now(UTC)
+        refresh_token_details.status = TokenStatus.EXPIRED
+        refresh_token_details.is_active = 0
+        if _mirror_revocation(revocation_store):
+            await _arevoke_after_commit(revocation_store, [refresh_token_details])
+        if expired:
+            return False
+        return claims
+
+
+@instrumented("service.logout_jwt_service")
+async def alogout_jwt_service(user_id, revocation_store=None):
+    """Async variant of logout_jwt_service."""
+    async with db_config.async_session_scope() as session:
+        if _mirror_revocation(revocation_store):
+            active_rows = await session.scalars(select(JwtTokens).where(JwtTokens.user_id == user_id,
+                                                                        JwtTokens.is_active == True))
+            await _arevoke_after_commit(revocation_store, active_rows)
+        result = await session.execute(update(JwtTokens)
+                                       .where(JwtTokens.user_id == user_id, JwtTokens.is_active == True)
+                                       .values(status=TokenStatus.EXPIRED, is_active=False)
+                                       .execution_options(synchronize_session=False))
+        if not result.rowcount:
+            raise ValueError("User not found.")
+        return True
@@ -0,0 +1,149 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import insert, select
+from fastapi_jwtauth.jwtauth.core import get_password_hasher, identify_hasher
+from fastapi_jwtauth.jwtauth.models import Users
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from .user_cache import invalidate_users
+
+REQUIRED_FIELDS = ("username", "email", "firstname", "lastname")
+# Errors kept in the report; the counters keep counting past this.
+MAX_REPORTED_ERRORS = 100
+
+
+def read_users(source, format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream user rows from a CSV (with a header row) or JSON Lines file.
+
+    Args:
+        source (str | file): Path or open text file.
+        format (str, optional): "csv" or "jsonl". Taken from the file extension when omitted.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        format = format or os.path.splitext(str(source))[1].lstrip(".").lower()
+        with open(source, newline="", encoding="utf-8") as file:
+            yield from read_users(file, format)
+        return
+    if format == "csv":
+        yield from csv.DictReader(source)
+    elif format in ("jsonl", "ndjson"):
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported user file format '{format}', expected csv or jsonl.")
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(row: Dict[str, Any]) -> Dict[str, Any]:
+    user = {field: str(row.get(field) or "").strip() for field in REQUIRED_FIELDS}
+    missing = [field for field in REQUIRED_FIELDS if not user[field]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    password_hash = row.get("password_hash")
+    if password_hash:
+        # Hashes exported from another system are kept if a registered hasher can verify
+        # them, and upgraded on the user's next login.
+        identify_hasher(password_hash)
+        user["password_hash"] = password_hash
+    elif row.get("password"):
+        user["password"] = str(row["password"])
+    else:
+        raise ValueError("missing password or password_hash")
+    return user
+
+
+def bulk_create_users(rows: Iterable[Dict[str, Any]], chunk_size: int = 1000, workers: Optional[int] = None,
+                      use_processes: bool = True,
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Create users from a stream of rows in batched transactions.
+
+    Each chunk of `chunk_size` rows is checked against the database with one
+    `IN` query for usernames and one for emails (same rules as create_user:
+    usernames are unique among all users, emails among active users), the
+    passwords are hashed in parallel and the new users are inserted with a
+    single executemany INSERT in one transaction. Rows that clash with an
+    existing user or an earlier row are skipped, not failed.
+
+    Args:
+        rows (iterable): Dicts with username, email, firstname, lastname and either
+            password or an existing password_hash.
+        chunk_size (int, optional): Rows per transaction. Defaults to 1000.
+        workers (int, optional): Hashing workers. Defaults to the CPU count.
+        use_processes (bool, optional): Hash in worker processes instead of threads. Defaults to True.
+        progress (callable, optional): Called with the running report after every chunk.
+
+    Returns:
+        dict: {"read", "created", "skipped", "invalid", "errors", "elapsed", "rows_per_second"}
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    workers = workers or os.cpu_count() or 1
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    report = {"read": 0, "created": 0, "skipped": 0, "invalid": 0, "errors": [],
+              "elapsed": 0.0, "rows_per_second": 0.0}
+    started = time.perf_counter()
+    hasher = get_password_hasher()
+    with executor_class(max_workers=workers) as executor:
+        for chunk in _chunks(rows, chunk_size):
+            users = []
+            for row in chunk:
+                report["read"] += 1
+                try:
+                    users.append(_clean(row))
+                except (ValueError, TypeError, AttributeError) as error:
+                    report["invalid"] += 1
+                    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                        report["errors"].append((report["read"], str(error)))
+            users = _drop_existing(users, report)
+            passwords = [user.pop("password") for user in users if "password" in user]
+            hashes = iter(executor.map(hasher.hash, passwords,
+                                       chunksize=max(1, len(passwords) // (workers * 4))))
+            for user in users:
+                user["password"] = user.pop("password_hash", None) or next(hashes)
+            if users:
+                with db_config.session_scope() as session:
+                    session.execute(insert(Users), users)
+                invalidate_users(*(user["username"] for user in users))
+            report["created"] += len(users)
+            elapsed = time.perf_counter() - started
+            report["elapsed"] = elapsed
+            report["rows_per_second"] = report["read"] / elapsed if elapsed else 0.0
+            if progress is not None:
+                progress(report)
+    return report
+
+
+def _drop_existing(users: List[Dict[str, Any]], report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Remove rows whose username or email is taken in the database or earlier in the chunk."""
+    if not users:
+        return users
+    with db_config.session_scope(readonly=True) as session:
+        taken_usernames = set(session.scalars(
+            select(Users.username).where(Users.username.in_({user["username"] for user in users}))))
+        taken_emails = set(session.scalars(
+            select(Users.email).where(Users.email.in_({user["email"] for user in users}),
+                                      Users.is_active == True)))
+    kept = []
+    for user in users:
+        if user["username"] in taken_usernames or user["email"] in taken_emails:
+            report["skipped"] += 1
+            continue
+        taken_usernames.add(user["username"])
+        taken_emails.add(user["email"])
+        kept.append(user)
+    return kept
@@ -1,12 +1,35 @@
 from datetime import datetime,UTC
 from typing import Dict, List, Any
-from fastapi_jwtauth.jwtauth.models import Users, JwtTokens
+from fastapi_jwtauth.jwtauth.core import hash_password, needs_rehash
+from fastapi_jwtauth.jwtauth.core.metrics import instrumented
+from fastapi_jwtauth.jwtauth.models import (Users, JwtTokens, TokenStatus, EnvVarsModel, JwtAccessTokenPayload,
+                                            token_digest)
 from fastapi_jwtauth.jwtauth.db.database import db_config
+from .user_cache import UserSnapshot, get_user_cache, invalidate_users
 
-SessionLocal = db_config.get_session()
 
+def _revoked_entries(rows):
+    """(digest, expiry) pairs of both tokens of each expired jwttokens row."""
+    entries = []
+    for row in rows:
+        entries.append((row.access_token_digest, row.access_expiry_time))
+        entries.append((row.refresh_token_digest, row.refresh_expiry_time))
+    return entries
 
 
+def _mirror_revocation(revocation_store):
+    """True if rows expired by the services have to be copied into `revocation_store`."""
+    return revocation_store is not None and not revocation_store.uses_token_rows
+
+
+def _revoke_after_commit(revocation_store, rows):
+    """Revoke the tokens of `rows` in `revocation_store` once the expiry is committed to the database."""
+    entries = _revoked_entries(rows)
+    if entries:
+        db_config.after_commit(lambda: revocation_store.revoke_many(entries))
+
+
+@instrumented("service.create_user")
 def create_user(user_details:Dict) -> Dict[str, Any]:
     """
     Create a new user with the given details.
@@ -16,17 +39,14 @@ def create_user(user_details:Dict) -> Dict[str, Any]:
     Returns:
         User: The updated user object, or None if the user was not found
     """
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwtauth package before using it.")
-    session = SessionLocal()  # Use the globally configured session
-    try:
-        active_user = session.query(Users).filter(
-            Users.username == user_details["username"],
-            Users.is_active == True
+    with db_config.session_scope() as session:
+        # Usernames are unique, including those of deactivated users.
+        existing_user = session.query(Users).filter(
+            Users.username == user_details["username"]
         ).first()
 
-        if active_user:
-            raise ValueError(f"An active user with username '{user_details['username']}' already exists.")
+        if existing_user:
+            raise ValueError(f"A user with username '{user_details['username']}' already exists.")
 
         # Check if the email is already in use (even if the previous user is inactive)
         existing_email = session.query(Users).filter(
@@ -39,16 +59,14 @@ def create_user(user_details:Dict) -> Dict[str, Any]:
         user = Users(**user_details)
         user.set_password(user_details["password"])
         session.add(user)
-        session.commit()
+        session.flush()
         session.refresh(user)
-        return user
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
+    # A miss for this username may be cached.
+    invalidate_users(user.username)
+    return user
 
 
+@instrumented("service.update_user")
 def update_user(username, user_details:Dict) -> Dict[str, Any]:
     """
     Update a user's information.
@@ -60,27 +78,22 @@ def update_user(username, user_details:Dict) -> Dict[str, Any]:
     Returns:
         User: The updated user object, or None if the user was not found.
     """
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwtauth package before using it.")
-
-    session = SessionLocal()
-    try:
+    with db_config.session_scope() as session:
         user = session.query(Users).filter_by(username=username).first()
         if not user:
             return None
         for key, value in user_details.items():
-            if hasattr(user, key) and key not in ('username'):  # Ensure the attribute exists
+            if key == 'password':
+                user.set_password(value)
+            elif hasattr(user, key) and key not in ('username'):  # Ensure the attribute exists
                 setattr(user, key, value)
-        session.commit()
+        session.flush()
         session.refresh(user)
-        return user
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
+    invalidate_users(username)
+    return user
 
 
+@instrumented("service.delete_user")
 def delete_user(username:str) -> Dict[str, Any]:
     """
     Soft delete a user by setting is_active to False.
@@ -91,154 +104,208 @@ def delete_user(username:str) -> Dict[str, Any]:
     Returns:
         User: The updated user object with `is_active = False`, or None if the user was not found.
     """
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-
-    session = SessionLocal()
-    try:
+    with db_config.session_scope() as session:
         # Fetch the user
         user = session.query(Users).filter_by(username=username).first()
         if not user:
             return None
         user.is_active = False
-        session.commit()
+        session.flush()
         session.refresh(user)
-        return user
-    except Exception as e:
-        session.rollback()
-        raise e
-    finally:
-        session.close()
-
-
-def check_login(username, password):
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
+    invalidate_users(username)
+    return user
+
+
+@instrumented("service.check_login")
+def check_login(username, password, hash_pool=None):
+    """
+    Verify a username/password pair.
+
+    Args:
+        username (str): The username of the user.
+        password (str): The plain text password to check.
+        hash_pool (PasswordHashPool, optional): Run the password check on this bounded
+            pool instead of the calling thread. Raises HashPoolBusyError when it is full.
+
+    Returns:
+        Users | bool: The authenticated user, or False if the credentials are invalid.
+
+    A stored hash made with another scheme or older cost parameters than the
+    configured hasher is replaced by a fresh hash after a successful check.
+    """
+    # The session is released before hashing so a slow bcrypt check does not hold a
+    # pooled connection. Credentials are always checked against the primary, so a
+    # changed password applies at once.
+    with db_config.session_scope(readonly=True) as session:
         user = session.query(Users).filter_by(username=username).first()
-        if not user:
-            return False
-        if not user.check_password(password):
+    if not user:
+        return False
+    if hash_pool is not None:
+        if not hash_pool.verify(password, user.password):
             return False
-        return True
-    except Exception as e:
-        raise e
-
-def save_tokens_db(username, access_token, access_expiry, refresh_token, refresh_expiry):
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
-        user_id = session.query(Users).filter_by(username=username).first()
-        if not user_id:
-            return False
-        #expire the previous token if available
-        prev_token = session.query(JwtTokens).filter_by(user_id=user_id.id, status="Active", is_active=1).all()
-        if prev_token:
-            for token in prev_token:
-                token.status = "Expired"
-                token.is_active = 0  
-            session.commit()
-        #expired all user tokens
-        previous_tokens = session.query(JwtTokens).filter_by(user_id=user_id.id).all()
-        if previous_tokens:
-            for token in previous_tokens:
-                token.status = "Expired"
-                token.is_active = 0 
-            session.commit()
+    elif not user.check_password(password):
+        return False
+    if needs_rehash(user.password):
+        new_hash = hash_pool.hash(password) if hash_pool is not None else hash_password(password)
+        upgrade_password_hash(user, new_hash)
+        user.password = new_hash
+    return user
+
+
+@instrumented("service.upgrade_password_hash")
+def upgrade_password_hash(user, new_hash):
+    """Store `new_hash` for a user (ORM row or UserSnapshot) whose current hash was just verified."""
+    with db_config.session_scope() as session:
+        # Only replace the hash that was verified, never a password changed meanwhile.
+        (session.query(Users)
+         .filter(Users.id == user.id, Users.password == user.password)
+         .update({Users.password: new_hash}, synchronize_session=False))
+    invalidate_users(user.username)
+
+@instrumented("service.save_tokens_db")
+def save_tokens_db(username, access_token, access_expiry, refresh_token, refresh_expiry, user_id=None, claims=None,
+                   max_sessions=1, revocation_store=None):
+    """
+    Expire the user's surplus sessions and store the new token pair in one transaction.
+
+    Previous sessions are expired with a single set-based UPDATE, so the cost of a
+    login does not grow with the number of historical token rows.
+
+    Args:
+        username (str): The username of the token owner.
+        access_token (str): The new access token.
+        access_expiry (datetime): The access token expiry time.
+        refresh_token (str): The new refresh token.
+        refresh_expiry (datetime): The refresh token expiry time.
+        user_id (int, optional): The id of the token owner. When the caller has already
+            loaded the user (e.g. from check_login) this skips the username lookup.
+        claims (dict, optional): Custom claims of the access token, carried over on refresh.
+        max_sessions (int, optional): Number of concurrently active token pairs allowed per
+            user, including the new one. The oldest sessions beyond the limit are expired.
+            Defaults to 1.
+        revocation_store (RevocationStore, optional): Store that the expired sessions are revoked in.
+
+    Returns:
+        bool: True if the tokens were saved, False if the user was not found.
+    """
+    if max_sessions < 1:
+        raise ValueError("max_sessions must be at least 1.")
+    with db_config.session_scope() as session:
+        if user_id is None:
+            user = session.query(Users).filter_by(username=username).first()
+            if not user:
+                return False
+            user_id = user.id
+        #expire the previous sessions beyond the limit
+        stale_tokens = session.query(JwtTokens).filter(JwtTokens.user_id == user_id, JwtTokens.is_active == True)
+        if max_sessions > 1:
+            oldest_kept = (session.query(JwtTokens.id)
+                           .filter(JwtTokens.user_id == user_id, JwtTokens.is_active == True)
+                           .order_by(JwtTokens.id.desc())
+                           .offset(max_sessions - 2)
+                           .limit(1)
+                           .scalar())
+            stale_tokens = stale_tokens.filter(JwtTokens.id < oldest_kept) if oldest_kept else None
+        if stale_tokens is not None:
+            if _mirror_revocation(revocation_store):
+                _revoke_after_commit(revocation_store, stale_tokens.all())
+            stale_tokens.update({JwtTokens.status: TokenStatus.EXPIRED, JwtTokens.is_active: False},
+                                synchronize_session=False)
         #save the new token
-        token = JwtTokens(user_id=user_id.id,
-                          access_token=access_token,
-                          refresh_token=refresh_token,
+        token = JwtTokens(user_id=user_id,
+                          access_token_digest=token_digest(access_token),
+                          refresh_token_digest=token_digest(refresh_token),
+                          claims=claims or None,
                           access_expiry_time=access_expiry,
                           refresh_expiry_time=refresh_expiry,
                           is_revoked=0,
-                          status="Active",
+                          status=TokenStatus.ACTIVE,
                           is_active=1)
         session.add(token)
-        session.commit()
-        session.refresh(token)
         return True
-    except Exception as e:
-        session.rollback()
-        raise e
 
 def get_env_vars():
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
-        env_var = session.query(EnvVarsModel).filter_by(is_active=1).all()
-        return {row.env_name: row.env_value for row in env_var}
-    except Exception as e:
-        raise e
+    """Return the active runtime settings as {env_name: env_value}."""
+    with db_config.session_scope(replica=True) as session:
+        rows = session.query(EnvVarsModel.env_name, EnvVarsModel.env_value).filter_by(is_active=True).all()
+        return {row.env_name: row.env_value for row in rows}
     
 def get_jwt_access_payload():
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
-        payloads = session.query(JwtAccessTokenPayload).filter_by(is_active=1).all()
-        return (row.payload_key for row in payloads)
-    except Exception as e:
-        raise e
+    """Return the active static access token claims as {payload_key: payload_value}."""
+    with db_config.session_scope(replica=True) as session:
+        rows = (session.query(JwtAccessTokenPayload.payload_key, JwtAccessTokenPayload.payload_value)
+                .filter_by(is_active=True).all())
+        return {row.payload_key: row.payload_value for row in rows}
     
 
+@instrumented("service.get_user")
 def get_user(username):
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
+    """
+    Look up a user by username.
+
+    Returns:
+        UserSnapshot | None: A read-only copy of the user row, served from the user
+        cache when it is enabled (see configure_user_cache).
+    """
+    cache = get_user_cache()
+    if cache is not None:
+        hit, snapshot = cache.lookup(username)
+        if hit:
+            return snapshot
+        generation = cache.generation
+    # A user written moments ago is read from the primary, not a lagging replica.
+    replica = not db_config.written_recently(("users", username))
+    with db_config.session_scope(readonly=True, replica=replica) as session:
         user = session.query(Users).filter_by(username=username).first()
-        return user
-    except Exception as e:
-        raise e
+        snapshot = UserSnapshot.from_row(user) if user else None
+    if cache is not None:
+        cache.store(username, snapshot, generation)
+    return snapshot
     
-def get_refresh_details(user_id, refresh_token):
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
-        refresh_token_details = session.query(JwtTokens).filter_by(user_id=user_id,
-                                                                   refresh_token=refresh_token,
-                                                                   status="Active",
+@instrumented("service.get_refresh_details")
+def get_refresh_details(user_id, refresh_token, revocation_store=None):
+    """
+    Consume a refresh token.
+
+    The token is looked up by its digest and revoked whether or not it has expired,
+    so every refresh token can be used at most once. When a revocation_store is
+    given, the consumed token pair is revoked there as well.
+
+    Returns:
+        dict | bool: The custom claims stored with the token pair, or False if the
+        refresh token is unknown, already used or expired.
+    """
+    with db_config.session_scope() as session:
+        refresh_token_details = session.query(JwtTokens).filter_by(refresh_token_digest=token_digest(refresh_token),
+                                                                   user_id=user_id,
+                                                                   status=TokenStatus.ACTIVE,
                                                                    is_revoked=0,
                                                                    is_active=1).first()
         if not refresh_token_details:
             return False
+        claims = dict(refresh_token_details.claims or {})
         #check the refresh token expiry.
         exp_time = refresh_token_details.refresh_expiry_time
-        if exp_time and datetime.now(UTC) > exp_time.replace(tzinfo=UTC):
-            refresh_token_details.is_revoked = 1
-            refresh_token_details.revoked_at = datetime.now(UTC)
-            refresh_token_details.status = "Expired"
-            refresh_token_details.is_active = 0
-            session.commit()
-            session.refresh(refresh_token_details)
-            return False
+        expired = bool(exp_time and datetime.now(UTC) > exp_time.replace(tzinfo=UTC))
         refresh_token_details.is_revoked = 1
         refresh_token_details.revoked_at = datetime.now(UTC)
-        refresh_token_details.status = "Expired"
+        refresh_token_details.status = TokenStatus.EXPIRED
         refresh_token_details.is_active = 0
-        session.commit()
-        session.refresh(refresh_token_details)
-        return refresh_token_details.access_token
-    except Exception as e:
-        raise e
-
-def logout_jwt_service(user_id):
-    if SessionLocal is None:
-        raise RuntimeError("You must configure the jwt_auth package before using it.")
-    session = SessionLocal()
-    try:
-        user_token = session.query(JwtTokens).filter_by(user_id=user_id, is_active=1).first()
-        if not user_token:
+        if _mirror_revocation(revocation_store):
+            _revoke_after_commit(revocation_store, [refresh_token_details])
+        if expired:
+            return False
+        return claims
+
+@instrumented("service.logout_jwt_service")
+def logout_jwt_service(user_id, revocation_store=None):
+    """Expire every active session of the user with a single UPDATE, and revoke them in revocation_store."""
+    with db_config.session_scope() as session:
+        active_tokens = session.query(JwtTokens).filter(JwtTokens.user_id == user_id, JwtTokens.is_active == True)
+        if _mirror_revocation(revocation_store):
+            _revoke_after_commit(revocation_store, active_tokens.all())
+        expired = active_tokens.update({JwtTokens.status: TokenStatus.EXPIRED, JwtTokens.is_active: False},
+                                       synchronize_session=False)
+        if not expired:
             raise ValueError("User not found.")
-        user_token.status = "Expired"
-        user_token.is_active = 0
-        session.commit()
-        session.refresh(user_token)
         return True
-    except Exception as e:
-        raise e
\ No newline at end of file
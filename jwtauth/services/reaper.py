@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import delete, func, select
+from fastapi_jwtauth.jwtauth.models import JwtTokens
+from fastapi_jwtauth.jwtauth.db.database import db_config
+
+
+class TokenReaper:
+    """
+    Delete (or archive, then delete) jwttokens rows that can no longer be used.
+
+    Two kinds of rows are purged, each with its own retention window:
+
+    * expired: the refresh token expired more than `expired_retention` ago.
+    * revoked: the row was expired by logout, refresh or a newer login and its
+      access token expired more than `revoked_retention` ago. Rows whose access
+      token is still valid are kept, because SQLRevocationStore needs them to
+      reject that token.
+
+    Rows are removed in batches of `batch_size`, each in its own short
+    transaction: the ids are selected through an index, then deleted by id, so
+    locks are held only for one batch at a time. `pause` seconds between
+    batches leave room for concurrent logins.
+
+    Args:
+        expired_retention (timedelta, optional): Keep expired rows this long. Defaults to 0.
+        revoked_retention (timedelta, optional): Keep revoked rows this long after their
+            access token expired. Defaults to 0.
+        batch_size (int, optional): Rows deleted per transaction. Defaults to 1000.
+        pause (float, optional): Seconds to sleep between batches. Defaults to 0.
+        archive (callable, optional): Called with the rows of each batch (as dicts) inside the
+            batch transaction, before they are deleted. If it raises, the batch is rolled back.
+    """
+
+    def __init__(self, expired_retention: timedelta = timedelta(0), revoked_retention: timedelta = timedelta(0),
+                 batch_size: int = 1000, pause: float = 0.0,
+                 archive: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.expired_retention = expired_retention
+        self.revoked_retention = revoked_retention
+        self.batch_size = batch_size
+        self.pause = pause
+        self.archive = archive
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _conditions(self, now: datetime):
+        return {"expired": (JwtTokens.refresh_expiry_time < now - self.expired_retention,),
+                "revoked": (JwtTokens.is_active == False,
+                            JwtTokens.access_expiry_time < now - self.revoked_retention)}
+
+    def _purge_batch(self, conditions) -> int:
+        with db_config.session_scope() as session:
+            if self.archive is not None:
+                rows = session.execute(select(JwtTokens.__table__).where(*conditions)
+                                       .order_by(JwtTokens.id).limit(self.batch_size)).mappings().all()
+                if rows:
+                    self.archive([dict(row) for row in rows])
+                batch = [row["id"] for row in rows]
+            else:
+                batch = session.scalars(select(JwtTokens.id).where(*conditions)
+                                        .order_by(JwtTokens.id).limit(self.batch_size)).all()
+            if batch:
+                session.execute(delete(JwtTokens).where(JwtTokens.id.in_(batch)))
+            return len(batch)
+
+    def table_size(self) -> int:
+        """Number of rows left in the jwttokens table."""
+        with db_config.session_scope(readonly=True) as session:
+            return session.scalar(select(func.count()).select_from(JwtTokens))
+
+    def run_once(self, now: Optional[datetime] = None, max_batches: Optional[int] = None,
+                 count_rows: bool = True) -> Dict[str, Any]:
+        """
+        Purge every row that is past its retention window.
+
+        Args:
+            now (datetime, optional): Reference time. Defaults to the current UTC time.
+            max_batches (int, optional): Stop after this many batches, e.g. to bound one run.
+            count_rows (bool, optional): Report the remaining table size. Defaults to True.
+
+        Returns:
+            dict: {"purged", "purged_expired", "purged_revoked", "batches", "batch_seconds_avg",
+            "batch_seconds_max", "elapsed", "table_rows"}
+        """
+        now = now or datetime.now(UTC)
+        report = {"purged": 0, "purged_expired": 0, "purged_revoked": 0, "batches": 0,
+                  "batch_seconds_avg": 0.0, "batch_seconds_max": 0.0, "elapsed": 0.0, "table_rows": None}
+        started = time.perf_counter()
+        batch_seconds = 0.0
+        for kind, conditions in self._conditions(now).items():
+            while max_batches is None or report["batches"] < max_batches:
+                batch_started = time.perf_counter()
+                purged = self._purge_batch(conditions)
+                if not purged:
+                    break
+                seconds = time.perf_counter() - batch_started
+                batch_seconds += seconds
+                report["batches"] += 1
+                report["batch_seconds_max"] = max(report["batch_seconds_max"], seconds)
+                report[f"purged_{kind}"] += purged
+                report["purged"] += purged
+                if purged < self.batch_size:
+                    break
+                if self.pause:
+                    time.sleep(self.pause)
+        if report["batches"]:
+            report["batch_seconds_avg"] = batch_seconds / report["batches"]
+        report["elapsed"] = time.perf_counter() - started
+        if count_rows:
+            report["table_rows"] = self.table_size()
+        self.last_report = report
+        return report
+
+    def start(self, interval: float = 3600.0) -> "TokenReaper":
+        """Run `run_once` every `interval` seconds in a daemon thread until stop() is called."""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("The token reaper is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="jwtauth-token-reaper", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as error:
+                # Keep the schedule alive across transient database errors.
+                self.last_error = error
+            self._stop.wait(interval)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background thread started by start()."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def purge_tokens(expired_retention: timedelta = timedelta(0), revoked_retention: timedelta = timedelta(0),
+                 batch_size: int = 1000, **kwargs) -> Dict[str, Any]:
+    """Run a TokenReaper once; keyword arguments are passed to run_once()."""
+    return TokenReaper(expired_retention, revoked_retention, batch_size).run_once(**kwargs)
@@ -0,0 +1,55 @@
+from sqlalchemy import or_
+from fastapi_jwtauth.jwtauth.core import RevocationStore
+from fastapi_jwtauth.jwtauth.models import JwtTokens, TokenStatus
+from fastapi_jwtauth.jwtauth.db.database import db_config
+
+
+class SQLRevocationStore(RevocationStore):
+    """
+    Revocation store backed by the jwttokens table.
+
+    A token counts as revoked once its row is no longer active, which is what
+    logout, refresh rotation and new logins already record. Every check is an
+    indexed lookup on the digest columns, i.e. one SQL round trip.
+
+    Args:
+        use_replicas (bool, optional): Run the checks on the read replicas configured
+            with configure_db(readers=...). A logout then takes effect once it has
+            replicated. Defaults to False.
+    """
+
+    # The services already expire the rows, so they do not need to mirror them here.
+    uses_token_rows = True
+    blocking = False
+
+    def __init__(self, use_replicas: bool = False) -> None:
+        self.use_replicas = use_replicas
+
+    @staticmethod
+    def _matches(digest):
+        return or_(JwtTokens.access_token_digest == digest, JwtTokens.refresh_token_digest == digest)
+
+    def revoke(self, digest, expires_at):
+        with db_config.session_scope() as session:
+            (session.query(JwtTokens)
+             .filter(self._matches(digest), JwtTokens.is_active == True)
+             .update({JwtTokens.status: TokenStatus.EXPIRED, JwtTokens.is_active: False},
+                     synchronize_session=False))
+
+    def is_revoked(self, digest):
+        with db_config.session_scope(readonly=True, replica=self.use_replicas) as session:
+            is_active = session.query(JwtTokens.is_active).filter(self._matches(digest)).scalar()
+        return is_active is not None and not is_active
+
+    def revoked_digests(self, digests):
+        digests = list(digests)
+        if not digests:
+            return set()
+        with db_config.session_scope(readonly=True, replica=self.use_replicas) as session:
+            rows = (session.query(JwtTokens.access_token_digest, JwtTokens.refresh_token_digest)
+                    .filter(or_(JwtTokens.access_token_digest.in_(digests),
+                                JwtTokens.refresh_token_digest.in_(digests)),
+                            JwtTokens.is_active == False)
+                    .all())
+        wanted = set(digests)
+        return {digest for row in rows for digest in row if digest in wanted}
@@ -0,0 +1,102 @@
+import threading
+from typing import NamedTuple, Optional
+from fastapi_jwtauth.jwtauth.core import TTLCache
+from fastapi_jwtauth.jwtauth.db.database import db_config
+
+
+class UserSnapshot(NamedTuple):
+    """Read-only copy of a users row, safe to share between requests and threads."""
+
+    id: int
+    username: str
+    email: str
+    firstname: str
+    lastname: str
+    password: str
+    scopes: Optional[str]
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, user) -> "UserSnapshot":
+        return cls(user.id, user.username, user.email, user.firstname, user.lastname,
+                   user.password, user.scopes, user.is_active)
+
+
+# Cached in place of a snapshot for usernames that do not exist.
+_NOT_FOUND = object()
+
+
+class UserCache(TTLCache):
+    """
+    Bounded TTL cache of UserSnapshot objects keyed by username.
+
+    Unknown usernames are cached too, so repeated lookups of a missing user do
+    not reach the database either. Entries are invalidated by the services that
+    change users; the TTL bounds staleness from writes made by other processes.
+
+    Args:
+        maxsize (int, optional): Maximum number of users kept. Defaults to 10000.
+        ttl (float, optional): Lifetime of an entry in seconds. Defaults to 5.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 5.0) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+
+    def lookup(self, username):
+        """Return (hit, snapshot). The snapshot is None for a cached unknown username."""
+        value = self.get(username)
+        if value is None:
+            return False, None
+        return True, None if value is _NOT_FOUND else value
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def store(self, username, snapshot: Optional[UserSnapshot], generation: int) -> None:
+        """
+        Cache the result of a lookup that started at `generation`.
+
+        The result is dropped if any user was invalidated meanwhile, since the row
+        may have been read before that write committed.
+        """
+        with self._lock:
+            if generation == self._generation:
+                self.set(username, _NOT_FOUND if snapshot is None else snapshot)
+
+    def invalidate(self, *usernames) -> None:
+        with self._lock:
+            self._generation += 1
+        for username in usernames:
+            self.pop(username)
+
+
+_user_cache: Optional[UserCache] = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache() -> Optional[UserCache]:
+    """Return the process-wide user cache, or None while it is disabled (the default)."""
+    return _user_cache
+
+
+def configure_user_cache(maxsize: int = 10000, ttl: float = 5.0) -> Optional[UserCache]:
+    """Enable the user cache used by get_user/aget_user, or disable it with maxsize=0."""
+    global _user_cache
+    with _user_cache_lock:
+        _user_cache = UserCache(maxsize=maxsize, ttl=ttl) if maxsize else None
+    return _user_cache
+
+
+def invalidate_users(*usernames) -> None:
+    """
+    Drop cached users after they were created, changed or deleted.
+
+    The users are also read from the primary for the next `replica_lag` seconds,
+    so neither get_user nor the cache sees a replica that has not caught up yet.
+    """
+    db_config.mark_written(*(("users", username) for username in usernames))
+    cache = _user_cache
+    if cache is not None:
+        cache.invalidate(*usernames)
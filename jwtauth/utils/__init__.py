@@ -1,5 +1,27 @@
-from .utils import (UserRegistration,
-                   jwt_login,
-                   jwt_token_validate,
-                   jwt_refresh_tokens,
-                   jwt_logout)
\ No newline at end of file
+# Imported on first use: the module-level helpers pull in the database layer,
+# the dependencies pull in Starlette.
+_exports = {"UserRegistration": "utils",
+            "jwt_login": "utils",
+            "jwt_token_validate": "utils",
+            "jwt_refresh_tokens": "utils",
+            "jwt_logout": "utils",
+            "JWTAuthMiddleware": "dependencies",
+            "jwt_claims_dependency": "dependencies",
+            "jwt_scopes_dependency": "dependencies",
+            "jwks_endpoint": "dependencies",
+            "request_claims": "dependencies"}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{_exports[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
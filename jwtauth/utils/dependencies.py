@@ -0,0 +1,154 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection, Request
+from starlette.responses import Response
+
+# Keys under which the claims and token are kept in `request.state`.
+CLAIMS_STATE_KEY = "jwt_claims"
+TOKEN_STATE_KEY = "jwt_token"
+
+
+def _bearer_token(headers) -> Optional[str]:
+    authorization = headers.get("authorization")
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+async def _verify(handler, token: str) -> Optional[Dict[str, Any]]:
+    # Signature checks are CPU only; a revocation store may do network or DB I/O.
+    if handler.revocation_store is None:
+        return handler.get_token_claims(token)
+    return await run_in_threadpool(handler.get_token_claims, token)
+
+
+class JWTAuthMiddleware:
+    """
+    ASGI middleware that verifies the bearer token of every HTTP and websocket request once.
+
+    The claims (or None for a missing or invalid token) are stored in
+    `request.state.jwt_claims`. The middleware never rejects a request; routes
+    opt in to authentication with `jwt_claims_dependency`, which reuses the
+    stored claims instead of verifying the token again.
+
+    Args:
+        app: The ASGI application.
+        handler (JWTAuthHandler): Handler used to verify tokens.
+    """
+
+    def __init__(self, app, handler) -> None:
+        self.app = app
+        self.handler = handler
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            connection = HTTPConnection(scope)
+            token = _bearer_token(connection.headers)
+            state = scope.setdefault("state", {})
+            state[TOKEN_STATE_KEY] = token
+            state[CLAIMS_STATE_KEY] = await _verify(self.handler, token) if token else None
+        await self.app(scope, receive, send)
+
+
+async def request_claims(connection: HTTPConnection, handler) -> Optional[Dict[str, Any]]:
+    """
+    Return the verified claims of the request's bearer token, or None.
+
+    The token is verified at most once per request: the result is cached in
+    `request.state`, where JWTAuthMiddleware may already have put it.
+    """
+    state = connection.scope.setdefault("state", {})
+    if CLAIMS_STATE_KEY not in state:
+        token = _bearer_token(connection.headers)
+        state[TOKEN_STATE_KEY] = token
+        state[CLAIMS_STATE_KEY] = await _verify(handler, token) if token else None
+    return state[CLAIMS_STATE_KEY]
+
+
+def jwt_claims_dependency(handler, auto_error: bool = True):
+    """
+    Build a FastAPI dependency returning the claims of the request's bearer token.
+
+    Args:
+        handler (JWTAuthHandler): Handler used to verify tokens.
+        auto_error (bool, optional): Respond with 401 when the token is missing or invalid.
+            When False the dependency returns None instead. Defaults to True.
+
+    Returns:
+        Callable: Dependency for use with `Depends(...)`.
+    """
+    async def dependency(connection: HTTPConnection) -> Optional[Dict[str, Any]]:
+        claims = await request_claims(connection, handler)
+        if claims is None and auto_error:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                detail="Invalid or missing bearer token.",
+                                headers={"WWW-Authenticate": "Bearer"})
+        return claims
+
+    return dependency
+
+
+def jwt_scopes_dependency(handler, *scopes: str):
+    """
+    Build a FastAPI dependency that requires a bearer token granting all of `scopes`.
+
+    The scopes are compiled to a bitmask once, here; each request costs one
+    bitwise AND on the claims verified by request_claims.
+
+    Args:
+        handler (JWTAuthHandler): Handler with a scope_registry, used to verify tokens.
+        *scopes (str): Registered scope names the token must grant.
+
+    Returns:
+        Callable: Dependency for use with `Depends(...)` that returns the claims. It
+        responds with 401 for a missing or invalid token and 403 for missing scopes.
+    """
+    requirement = handler.require_scopes(*scopes)
+
+    async def dependency(connection: HTTPConnection) -> Dict[str, Any]:
+        claims = await request_claims(connection, handler)
+        if claims is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                detail="Invalid or missing bearer token.",
+                                headers={"WWW-Authenticate": "Bearer"})
+        if not requirement(claims):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail="Insufficient scope.",
+                                headers={"WWW-Authenticate": f'Bearer error="insufficient_scope", '
+                                                             f'scope="{" ".join(scopes)}"'})
+        return claims
+
+    return dependency
+
+
+def jwks_endpoint(handler, max_age: int = 300):
+    """
+    Build a FastAPI endpoint serving the handler's public keys as a JWKS document.
+
+    Responses carry an ETag and `Cache-Control: max-age`, and a matching
+    `If-None-Match` gets a 304, so JWKSVerifier clients revalidate cheaply.
+    HMAC secrets are never published.
+
+        app.add_api_route("/.well-known/jwks.json", jwks_endpoint(auth_handler))
+
+    Args:
+        handler (JWTAuthHandler): Handler whose keyring is published.
+        max_age (int, optional): Seconds clients may cache the document. Defaults to 300.
+    """
+    cache_control = f"public, max-age={max_age}"
+
+    async def endpoint(request: Request) -> Response:
+        body = json.dumps(handler.jwks(), sort_keys=True, separators=(",", ":")).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    return endpoint
@@ -1,17 +1,27 @@
 import secrets
 import jwt
 import datetime
-from fastapi_jwtauth.jwtauth.services import (get_refresh_details,
-                                              get_user,
-                                              logout_jwt_service)
+from fastapi_jwtauth.jwtauth import services
+from fastapi_jwtauth.jwtauth.core.metrics import stage
+# Re-exported: token verification lives in core so it can be used without the database layer.
+from fastapi_jwtauth.jwtauth.core.validation import verify_token, validate_token, validate_many
 
 
-def generate_access_token(secret_key, username, access_token_expiry, data:dict, algorithm):
-    """Generate an access token that expires in 'expires_in' minutes."""
+def generate_access_token(secret_key, username, access_token_expiry, data:dict, algorithm, keyring=None,
+                          claims_template=None, scopes=None, scope_registry=None):
+    """
+    Generate an access token that expires in 'expires_in' minutes.
+
+    When a KeyRing is given the token is signed with its current key and
+    `secret_key`/`algorithm` are ignored. `claims_template` holds static claims
+    (e.g. the runtime config's) added to every token; `data` overrides them.
+    With a ScopeRegistry, `scopes` (e.g. the user's scopes column) is added as
+    its bitmask claim; scopes the registry does not know are left out.
+    """
     now = datetime.datetime.now(datetime.UTC)
     if not algorithm:
         algorithm = "HS256"
-    if not secret_key:
+    if not secret_key and keyring is None:
         raise ValueError("Secret key is required.")
     if not access_token_expiry:
         access_token_expiry = 7
@@ -21,10 +31,16 @@ def generate_access_token(secret_key, username, access_token_expiry, data:dict,
         "exp": exp_time,
         "iat": now,
         "sub": username,
-        "iss": username
+        "iss": username,
+        "jti": secrets.token_hex(16)  # keeps tokens issued within the same second distinct
     }
-    payload = {**data,**payload}
-    return jwt.encode(payload, secret_key, algorithm=algorithm), exp_time
+    if scope_registry is not None:
+        payload.update(scope_registry.claims(scopes))
+    payload = {**(claims_template or {}), **data, **payload}
+    with stage("token.encode"):
+        if keyring is not None:
+            return keyring.encode(payload), exp_time
+        return jwt.encode(payload, secret_key, algorithm=algorithm), exp_time
 
 def generate_refresh_token(refersh_token_expiry=None):
     """Generate a secure 32-character refresh token and store it in DB."""
@@ -36,39 +52,46 @@ def generate_refresh_token(refersh_token_expiry=None):
     refresh_token = secrets.token_hex(32)  # 32-character token
     return refresh_token, expires_at
 
-def validate_token(token, secret_key, algorithm):
-    try:
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
-        exp_time = payload.get("exp")
-        if exp_time and datetime.datetime.now(datetime.UTC) > datetime.datetime.fromtimestamp(exp_time,datetime.UTc):
-            subject = payload.get("sub")
-            user = get_user(subject)
-            return True if user else False
-        return True
-    except jwt.ExpiredSignatureError:
-        return False
-    except jwt.InvalidTokenError:
-        return False
-
-
-def validate_refresh_token(username, refresh_token):
+def validate_refresh_token(username, refresh_token, revocation_store=None):
+    from fastapi_jwtauth.jwtauth.db.database import db_config
     try:
-        user = get_user(username)
-        if not user:
-            return False
-        refresh_token_details = get_refresh_details(user.id,refresh_token)
-        if not refresh_token_details:
+        # Refresh rotation reads what the previous rotation wrote, so it stays on the primary.
+        with db_config.primary_reads():
+            user = services.get_user(username)
+            if not user:
+                return False, None
+            claims = services.get_refresh_details(user.id,refresh_token, revocation_store=revocation_store)
+        if claims is False:
             return False, None
-        return True, refresh_token_details
+        return True, claims
     except Exception as e:
         raise e
     
 
-def jwt_logout_user(username):
+def jwt_logout_user(username, revocation_store=None):
     try:
-        user = get_user(username)
+        user = services.get_user(username)
         if not user:
             raise ValueError("User not found")
-        return logout_jwt_service(user.id)
+        return services.logout_jwt_service(user.id, revocation_store=revocation_store)
     except Exception as e:
-        raise e
\ No newline at end of file
+        raise e
+
+
+async def avalidate_refresh_token(username, refresh_token, revocation_store=None):
+    from fastapi_jwtauth.jwtauth.db.database import db_config
+    with db_config.primary_reads():
+        user = await services.aget_user(username)
+        if not user:
+            return False, None
+        claims = await services.aget_refresh_details(user.id, refresh_token, revocation_store=revocation_store)
+    if claims is False:
+        return False, None
+    return True, claims
+
+
+async def ajwt_logout_user(username, revocation_store=None):
+    user = await services.aget_user(username)
+    if not user:
+        raise ValueError("User not found")
+    return await services.alogout_jwt_service(user.id, revocation_store=revocation_store)
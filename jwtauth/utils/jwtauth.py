@@ -1,13 +1,21 @@
-from typing import Dict, Any
-from pydantic import  validate_arguments
-from fastapi_jwtauth.jwtauth.services import (save_tokens_db,
-                                              check_login)
+import asyncio
+import types
+from typing import Dict, Any, Optional
+from pydantic import validate_call
+from fastapi_jwtauth.jwtauth.core import KeyRing, get_hash_pool, needs_rehash
+from fastapi_jwtauth.jwtauth.core.metrics import instrumented
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from fastapi_jwtauth.jwtauth import services
 from fastapi_jwtauth.jwtauth.schemas import loginResponse
 from .helpers import (generate_access_token,
                      generate_refresh_token,
                      validate_token,
+                     verify_token,
+                     validate_many,
                      validate_refresh_token,
-                     jwt_logout_user)
+                     jwt_logout_user,
+                     avalidate_refresh_token,
+                     ajwt_logout_user)
 import jwt
 
 class JWTAuthHandler:
@@ -15,76 +23,316 @@ class JWTAuthHandler:
                 jwt_secret_key,
                 jwt_algorithm,
                 jwt_access_token_expiry=None,
-                jwt_refresh_token_expiry=None) -> None:
+                jwt_refresh_token_expiry=None,
+                hash_pool=None,
+                token_cache=None,
+                max_sessions_per_user=1,
+                revocation_store=None,
+                keyring=None,
+                trusted_validate=False,
+                runtime_config=None,
+                scope_registry=None,
+                login_throttle=None) -> None:
         self.secret_key = jwt_secret_key
         self.algorithms = jwt_algorithm
         if not self.algorithms:
             self.algorithms = "HS256"
+        if keyring is None:
+            if not jwt_secret_key:
+                raise ValueError("Secret key is required.")
+            # Parse the key once instead of on every encode/decode.
+            keyring = KeyRing.from_secret(jwt_secret_key, self.algorithms)
+        self.keyring = keyring
         self.access_token_expiry = jwt_access_token_expiry
         self.refresh_token_expiry = jwt_refresh_token_expiry
+        self.hash_pool = hash_pool
+        self.token_cache = token_cache
+        self.max_sessions_per_user = max_sessions_per_user
+        self.revocation_store = revocation_store
+        # RuntimeConfigStore whose claim template is added to every access token.
+        self.runtime_config = runtime_config
+        # ScopeRegistry used to embed the user's scopes as a bitmask claim.
+        self.scope_registry = scope_registry
+        # LoginThrottle checked before a login touches the database or hashes.
+        self.login_throttle = login_throttle
+        self._logout_hooks = []
+        if token_cache is not None:
+            self.add_logout_hook(token_cache.invalidate_subject)
+        if trusted_validate:
+            # Callers guarantee `token` is a str (e.g. read from the Authorization header),
+            # so the hot validate path skips argument validation entirely.
+            validate = type(self).jwt_token_validate
+            self.jwt_token_validate = types.MethodType(getattr(validate, "raw_function", validate), self)
+
+    def add_logout_hook(self, hook):
+        """Register a callable that is called with the username whenever jwt_logout runs."""
+        self._logout_hooks.append(hook)
         
     
+    @instrumented("login")
     def create_jwt_token(self, username, password, data:dict=None):
-        response = check_login(username=username, password=password)
-        if not response:
+        """
+        Authenticate the user and issue a new token pair.
+
+        The user is looked up once, the password is verified once and the tokens are
+        written in a single transaction.
+        """
+        user = services.check_login(username=username, password=password, hash_pool=self.hash_pool)
+        if not user:
             raise ValueError("Invalid username or password.")
-        if data is None:
-            data = {}
+        return self._issue_tokens(username, data, user_id=user.id, scopes=user.scopes)
+
+    def _generate_token_pair(self, username, data:dict, scopes=None):
         access_token, a_expiry = generate_access_token(secret_key=self.secret_key,
                                                                     username=username,
                                                                     access_token_expiry=self.access_token_expiry,
                                                                     data=data,
-                                                                    algorithm=self.algorithms)
+                                                                    algorithm=self.algorithms,
+                                                                    keyring=self.keyring,
+                                                                    claims_template=self._claims_template(),
+                                                                    scopes=scopes,
+                                                                    scope_registry=self.scope_registry)
         refresh_token, r_expiry = generate_refresh_token(refersh_token_expiry=self.refresh_token_expiry)
-        save_response = save_tokens_db(username, access_token,a_expiry,refresh_token,r_expiry)
+        return access_token, a_expiry, refresh_token, r_expiry
+
+    def _claims_template(self):
+        if self.runtime_config is None:
+            return None
+        return self.runtime_config.get().claims_template
+
+    def jwks(self):
+        """Return the public keys of the handler's keyring as a JWKS document, see jwks_endpoint."""
+        return self.keyring.jwks()
+
+    def require_scopes(self, *scopes):
+        """Precompile a check that verified claims grant all of `scopes`, see ScopeRegistry.require."""
+        if self.scope_registry is None:
+            raise RuntimeError("The handler has no scope_registry.")
+        return self.scope_registry.require(*scopes)
+
+    def _login_response(self, access_token, refresh_token):
+        return loginResponse(**{"access_token": access_token,
+                             "refresh_token": refresh_token,
+                             "token_type":"jwt",
+                             "expires_in":self.access_token_expiry*60}).model_dump()
+
+    def _issue_tokens(self, username, data:dict=None, user_id=None, scopes=None):
+        """Generate and store a new access/refresh token pair for an authenticated user."""
+        if data is None:
+            data = {}
+        access_token, a_expiry, refresh_token, r_expiry = self._generate_token_pair(username, data, scopes)
+        save_response = services.save_tokens_db(username, access_token,a_expiry,refresh_token,r_expiry,
+                                       user_id=user_id, claims=data,
+                                       max_sessions=self.max_sessions_per_user,
+                                       revocation_store=self.revocation_store)
+        if save_response:
+            return self._login_response(access_token, refresh_token)
+        raise ValueError("Something wrong in the token saving, please try again.")
+
+    async def _aissue_tokens(self, username, data:dict=None, user_id=None, scopes=None):
+        if data is None:
+            data = {}
+        access_token, a_expiry, refresh_token, r_expiry = self._generate_token_pair(username, data, scopes)
+        save_response = await services.asave_tokens_db(username, access_token,a_expiry,refresh_token,r_expiry,
+                                              user_id=user_id, claims=data,
+                                              max_sessions=self.max_sessions_per_user,
+                                              revocation_store=self.revocation_store)
         if save_response:
-            return loginResponse(**{"access_token": access_token,
-                                 "refresh_token": refresh_token,
-                                 "token_type":"jwt",
-                                 "expires_in":self.access_token_expiry*60}).model_dump()
+            return self._login_response(access_token, refresh_token)
         raise ValueError("Something wrong in the token saving, please try again.")
         
-    @validate_arguments
-    def jwt_generate_token(self, username, password, data:dict=None):
-        check_login_res = check_login(username=username, password=password)
-        if not check_login_res:
-            raise ValueError("Invalid username or password.")
+    @validate_call
+    @instrumented("login")
+    def jwt_generate_token(self, username:str, password:str, data:Optional[dict]=None,
+                           client_key:Optional[str]=None):
+        """
+        Authenticate the user and issue a new token pair.
+
+        With a login_throttle the attempt is counted first, against `client_key`
+        (e.g. the caller's IP address) and the username.
+
+        Raises:
+            ValueError: If the username or password is invalid.
+            LoginThrottledError: If the attempt exceeds a login rate limit.
+        """
+        if self.login_throttle is not None:
+            self.login_throttle.check(username, client_key)
         return self.create_jwt_token(username=username, password=password, data=data)
+
+    @instrumented("login")
+    async def ajwt_generate_token(self, username, password, data:dict=None, client_key=None):
+        """
+        Async variant of jwt_generate_token.
+
+        The password check runs on the handler's PasswordHashPool (or the process-wide
+        default pool). Database work runs on the configured async_sessionmaker, or in a
+        worker thread when only a sync sessionmaker is configured, so the event loop
+        stays free for token validation while logins are being hashed.
+
+        Raises:
+            ValueError: If the username or password is invalid.
+            HashPoolBusyError: If the hash pool queue is full.
+            LoginThrottledError: If the attempt exceeds a login rate limit.
+        """
+        throttle = self.login_throttle
+        if throttle is not None:
+            if throttle.store.blocking:
+                await asyncio.to_thread(throttle.check, username, client_key)
+            else:
+                throttle.check(username, client_key)
+        if db_config.AsyncSessionLocal is not None:
+            user = await services.acheck_login(username, password, hash_pool=self.hash_pool)
+            if not user:
+                raise ValueError("Invalid username or password.")
+            return await self._aissue_tokens(username, data, user.id, user.scopes)
+        hash_pool = self.hash_pool or get_hash_pool()
+        with db_config.primary_reads():
+            user = await asyncio.to_thread(services.get_user, username)
+        if not user or not await hash_pool.averify(password, user.password):
+            raise ValueError("Invalid username or password.")
+        if needs_rehash(user.password):
+            await asyncio.to_thread(services.upgrade_password_hash, user, await hash_pool.ahash(password))
+        return await asyncio.to_thread(self._issue_tokens, username, data, user.id, user.scopes)
     
-    @validate_arguments
-    def jwt_token_validate(self, token):
-        validation_response = validate_token(token, secret_key=self.secret_key, algorithm=self.algorithms)
+    @validate_call
+    @instrumented("validate")
+    def jwt_token_validate(self, token:str):
+        validation_response = validate_token(token, secret_key=self.secret_key, algorithm=self.algorithms,
+                                             cache=self.token_cache,
+                                             revocation_store=self.revocation_store,
+                                             keyring=self.keyring)
         return validation_response
 
-    @validate_arguments
-    def jwt_refresh_token(self, username, refresh_token, grant_type):
+    @instrumented("validate")
+    def get_token_claims(self, token):
+        """
+        Verify an access token and return its claims, or None if it is invalid.
+
+        Used by the FastAPI middleware and dependencies, which verify each request's
+        token once and share the claims through `request.state`.
+        """
+        return verify_token(token, secret_key=self.secret_key, algorithm=self.algorithms,
+                            cache=self.token_cache,
+                            revocation_store=self.revocation_store,
+                            keyring=self.keyring)
+
+    @instrumented("validate_many")
+    def validate_many(self, tokens, executor=None):
+        """
+        Validate a batch of access tokens, e.g. the messages of a websocket frame or a job queue.
+
+        Args:
+            tokens (list): Access tokens; duplicates are verified once.
+            executor (Executor, optional): Pool used for RSA/EC/EdDSA signature checks.
+
+        Returns:
+            list: One bool per token, in input order.
+        """
+        return validate_many(tokens, secret_key=self.secret_key, algorithm=self.algorithms,
+                             cache=self.token_cache,
+                             revocation_store=self.revocation_store,
+                             keyring=self.keyring,
+                             executor=executor)
+
+    async def ajwt_token_validate(self, token):
+        """Async variant of jwt_token_validate. Validation is CPU only, so it runs inline."""
+        return self.jwt_token_validate(token)
+
+    def _check_refresh_access_token(self, username, access_token):
+        # The access token may have expired, so only its signature and subject are checked.
+        if access_token is None:
+            return
+        if self.inspect_token(access_token).claims.get("sub") != username:
+            raise ValueError("Access token does not belong to this user.")
+
+    @validate_call
+    @instrumented("refresh")
+    def jwt_refresh_token(self, username:str, refresh_token:str, grant_type:str, access_token:Optional[str]=None):
+        """
+        Exchange a refresh token for a new token pair.
+
+        The claims of the new access token are taken from the stored token row, so the
+        previous access token is not decoded. When the client sends it as `access_token`
+        its signature is verified once and its subject must match `username`.
+
+        Raises:
+            ValueError: If the grant type, refresh token or access token is invalid.
+        """
         validation_response:bool = False
         if grant_type == "refresh_token":
-            validation_response, access_token = validate_refresh_token(username,refresh_token)
+            self._check_refresh_access_token(username, access_token)
+            validation_response, claims = validate_refresh_token(username,refresh_token,
+                                                                 revocation_store=self.revocation_store)
         else:
             raise ValueError("Invalid grant type.")
         if not validation_response:
             raise ValueError("Invalid refresh token.")
-        data = self.get_token_payload(access_token, ignore_expiry=True)
-        access_token, access_expiry = generate_access_token(secret_key=self.secret_key,
-                                                                        username=username,
-                                                                        access_token_expiry=self.access_token_expiry,
-                                                                        data=data[0], algorithm=self.algorithms)
-        refresh_token, refresh_expiry = generate_refresh_token(refersh_token_expiry=self.refresh_token_expiry)
-        save_response = save_tokens_db(username, access_token,access_expiry,refresh_token,refresh_expiry)
-        if save_response:
-            return loginResponse(**{"access_token": access_token,
-                                 "refresh_token": refresh_token,
-                                 "token_type":"jwt",
-                                 "expires_in":self.access_token_expiry*60}).model_dump()
-        raise ValueError("Something wrong in the token saving, please try again.")
+        scopes = None
+        if self.scope_registry is not None:
+            # Scopes are read again so that changes apply from the next refresh on.
+            user = services.get_user(username)
+            scopes = user.scopes if user else None
+        return self._issue_tokens(username, claims, scopes=scopes)
+
+    @instrumented("refresh")
+    async def ajwt_refresh_token(self, username, refresh_token, grant_type, access_token=None):
+        """Async variant of jwt_refresh_token."""
+        if db_config.AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.jwt_refresh_token, username, refresh_token, grant_type,
+                                           access_token)
+        if grant_type != "refresh_token":
+            raise ValueError("Invalid grant type.")
+        self._check_refresh_access_token(username, access_token)
+        validation_response, claims = await avalidate_refresh_token(username, refresh_token,
+                                                                    revocation_store=self.revocation_store)
+        if not validation_response:
+            raise ValueError("Invalid refresh token.")
+        scopes = None
+        if self.scope_registry is not None:
+            user = await services.aget_user(username)
+            scopes = user.scopes if user else None
+        return await self._aissue_tokens(username, claims, scopes=scopes)
     
-    @validate_arguments
-    def jwt_logout(self, username):
-        return jwt_logout_user(username)
+    @validate_call
+    @instrumented("logout")
+    def jwt_logout(self, username:str):
+        try:
+            return jwt_logout_user(username, revocation_store=self.revocation_store)
+        finally:
+            for hook in self._logout_hooks:
+                hook(username)
+
+    @instrumented("logout")
+    async def ajwt_logout(self, username):
+        """Async variant of jwt_logout."""
+        if db_config.AsyncSessionLocal is None:
+            return await asyncio.to_thread(self.jwt_logout, username)
+        try:
+            return await ajwt_logout_user(username, revocation_store=self.revocation_store)
+        finally:
+            for hook in self._logout_hooks:
+                hook(username)
         
-    @validate_arguments
-    def get_token_payload(self, token, ignore_expiry=False):
+    def inspect_token(self, token):
+        """
+        Verify the signature of an access token once and return its claims and expiry state.
+
+        Args:
+            token (str): The JWT access token.
+
+        Returns:
+            TokenClaims: (claims, expired, expires_in). An expired token is reported, not rejected.
+
+        Raises:
+            ValueError: If the token is invalid.
+        """
+        try:
+            return self.keyring.inspect(token)
+        except jwt.InvalidTokenError:
+            raise ValueError("Invalid token")
+
+    @validate_call
+    def get_token_payload(self, token:str, ignore_expiry:bool=False):
         """
         Decode the JWT access token and return its payload.
         
@@ -99,23 +347,9 @@ class JWTAuthHandler:
         Raises:
             ValueError: If the token is invalid or expired (when ignore_expiry is False)
         """
-        try:
-            # First try to decode normally
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithms])
-            if ignore_expiry:
-                return payload, False  # Token is valid and not expired
-            return payload
-        except jwt.ExpiredSignatureError:
-            if ignore_expiry:
-                # If token is expired but we want the payload anyway
-                # Decode without verification to get the payload
-                payload = jwt.decode(
-                    token, 
-                    self.secret_key, 
-                    algorithms=[self.algorithms],
-                    options={"verify_exp": False}
-                )
-                return payload, True  # Return payload and indicate it was expired
+        result = self.inspect_token(token)
+        if ignore_expiry:
+            return result.claims, result.expired
+        if result.expired:
             raise ValueError("Token has expired")
-        except jwt.InvalidTokenError:
-            raise ValueError("Invalid token")
\ No newline at end of file
+        return result.claims
@@ -1,8 +1,11 @@
-from typing import Dict, Any
-from pydantic import ValidationError,validate_arguments
+from typing import Dict, Any, Optional
+from pydantic import ValidationError,validate_call
 from fastapi_jwtauth.jwtauth.schemas import UserRegister,loginResponse
 from fastapi_jwtauth.jwtauth.models import Users,JwtTokens
 from fastapi_jwtauth.jwtauth.services import create_user, update_user, delete_user, check_login, save_tokens_db
+from fastapi_jwtauth.jwtauth.config.runtime import get_runtime_config
+from fastapi_jwtauth.jwtauth.core.metrics import instrumented
+from fastapi_jwtauth.jwtauth.core.throttle import get_login_throttle
 from .helpers import (generate_access_token,
                      generate_refresh_token,
                      validate_token,
@@ -60,28 +63,38 @@ class UserRegistration:
 
 
 
-def create_jwt_token(username, password, data:dict=None):
-    # Create a JWT token with the username and password
-    response = check_login(username=username, password=password)
-    if not response:
-        raise ValueError("Invalid username or password.")
-    if data is None:
-        data = {}
-    access_token, a_expiry, res_expiry = generate_access_token(username=username, data=data)
-    refresh_token, r_expiry = generate_refresh_token()
-    save_response = save_tokens_db(username, access_token,a_expiry,refresh_token,r_expiry)
+def _issue_tokens(username, data, user_id=None):
+    # Settings and static claims come from the runtime config snapshot, not the DB.
+    config = get_runtime_config()
+    access_token, a_expiry = generate_access_token(config.secret_key, username, config.access_token_expiry,
+                                                   data, config.algorithm,
+                                                   claims_template=config.claims_template)
+    refresh_token, r_expiry = generate_refresh_token(config.refresh_token_expiry)
+    save_response = save_tokens_db(username, access_token,a_expiry,refresh_token,r_expiry,
+                                   user_id=user_id, claims=data)
     if save_response:
         return loginResponse(**{"access_token": access_token,
                              "refresh_token": refresh_token,
                              "token_type":"jwt",
-                             "expires_in":res_expiry}).model_dump()
+                             "expires_in":config.access_token_expiry*60}).model_dump()
     raise ValueError("Something wrong in the token saving, please try again.")
+
+
+def create_jwt_token(username, password, data:dict=None):
+    # Create a JWT token with the username and password
+    user = check_login(username=username, password=password)
+    if not user:
+        raise ValueError("Invalid username or password.")
+    if data is None:
+        data = {}
+    return _issue_tokens(username, data, user_id=user.id)
     
 
 
 
-@validate_arguments
-def jwt_login(username:str, password:str, data:Dict=None) -> Dict[str,Any]:
+@validate_call
+@instrumented("login")
+def jwt_login(username:str, password:str, data:Dict=None, client_key:Optional[str]=None) -> Dict[str,Any]:
     """
     Authenticate a user and generate JWT tokens.
 
@@ -93,6 +106,8 @@ def jwt_login(username:str, password:str, data:Dict=None) -> Dict[str,Any]:
         username (Str): The username of the user.
         password (Str): The password of the user.
         data (Dict, optional): Additional data to include in the JWT payload.
+        client_key (Str, optional): Identifies the caller (e.g. its IP address) for the
+            login throttle set with configure_login_throttle.
 
     Returns:
         Dict[str, Any]: A dictionary containing the access token, refresh token, token type, 
@@ -100,41 +115,37 @@ def jwt_login(username:str, password:str, data:Dict=None) -> Dict[str,Any]:
 
     Raises:
         ValueError: If the username or password is invalid.
+        LoginThrottledError: If the attempt exceeds a login rate limit.
     """
-
-    check_login_res = check_login(username, password)
-    if not check_login_res:
-        raise ValueError("Invalid username or password.")
+    throttle = get_login_throttle()
+    if throttle is not None:
+        throttle.check(username, client_key)
     return create_jwt_token(username=username, password=password, data=data)
         
 
-@validate_arguments
-def jwt_token_validate(token:str) -> Dict[str, Any]:
-    validation_response = validate_token(token)
+@validate_call
+@instrumented("validate")
+def jwt_token_validate(token:str) -> bool:
+    config = get_runtime_config()
+    validation_response = validate_token(token, config.secret_key, config.algorithm)
     return validation_response
 
 
-@validate_arguments
+@validate_call
+@instrumented("refresh")
 def jwt_refresh_tokens(username:str, refresh_token:str, grant_type:str="refresh_token") -> Dict[str, Any]:
     validation_response:bool = False
     if grant_type == "refresh_token":
-        validation_response = validate_refresh_token(username,refresh_token)
+        validation_response, claims = validate_refresh_token(username,refresh_token)
     else:
         raise ValueError("Invalid grant type.")
     if not validation_response:
         raise ValueError("Invalid refresh token.")
-    access_token, access_expiry, res_expiry = generate_access_token(username, validation_response)
-    refresh_token, refresh_expiry = generate_refresh_token()
-    save_response = save_tokens_db(username, access_token,access_expiry,refresh_token,refresh_expiry)
-    if save_response:
-        return loginResponse(**{"access_token": access_token,
-                             "refresh_token": refresh_token,
-                             "token_type":"jwt",
-                             "expires_in":res_expiry}).model_dump()
-    raise ValueError("Something wrong in the token saving, please try again.")
+    return _issue_tokens(username, claims)
 
 
-@validate_arguments
+@validate_call
+@instrumented("logout")
 def jwt_logout(username:str) -> Dict[str,Any]:
     return jwt_logout_user(username)
 
@@ -1 +1,39 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
 
+
+def pytest_configure(config):
+    # Test modules import service functions at collection time, which binds
+    # the jwtauth models, so the package is configured before collection.
+    from fastapi_jwtauth.jwtauth.db.database import db_config as jwt_db_config
+    if jwt_db_config.Base is None:
+        jwt_db_config.configure(declarative_base(), sessionmaker(autocommit=False, autoflush=False))
+
+
+@pytest.fixture(scope="session")
+def jwt_engine():
+    """A shared in-memory SQLite engine with the jwtauth models created."""
+    from sqlalchemy.pool import StaticPool
+    from fastapi_jwtauth.jwtauth.db.database import db_config as jwt_db_config
+
+    engine = create_engine("sqlite://",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    jwt_db_config.get_session().configure(bind=engine)
+    from fastapi_jwtauth.jwtauth.models import Users, JwtTokens
+    jwt_db_config.Base.metadata.create_all(bind=engine)
+    yield engine
+    jwt_db_config.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def jwt_db(jwt_engine):
+    """Empty all jwtauth tables around each test."""
+    from fastapi_jwtauth.jwtauth.db.database import db_config as jwt_db_config
+
+    yield jwt_engine
+    with jwt_engine.begin() as conn:
+        for table in reversed(jwt_db_config.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from sqlalchemy.pool import StaticPool
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from fastapi_jwtauth.jwtauth.services import acreate_user, aget_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+sqlalchemy_asyncio = pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_db():
+    engine = sqlalchemy_asyncio.create_async_engine("sqlite+aiosqlite://",
+                                                    connect_args={"check_same_thread": False},
+                                                    poolclass=StaticPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(db_config.get_base().metadata.create_all)
+
+    asyncio.run(create_tables())
+    db_config.AsyncSessionLocal = sqlalchemy_asyncio.async_sessionmaker(engine)
+    yield engine
+    db_config.AsyncSessionLocal = None
+    asyncio.run(engine.dispose())
+
+
+def test_async_auth_lifecycle(async_db):
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30)
+
+    async def lifecycle():
+        await acreate_user({"username": "testuser",
+                            "password": "password",
+                            "email": "test@example.com",
+                            "firstname": "Test",
+                            "lastname": "User"})
+        assert (await aget_user("testuser")).email == "test@example.com"
+        with pytest.raises(ValueError):
+            await handler.ajwt_generate_token("testuser", "wrong")
+        tokens = await handler.ajwt_generate_token("testuser", "password", {"role": "admin"})
+        assert await handler.ajwt_token_validate(tokens["access_token"])
+        refreshed = await handler.ajwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token")
+        assert handler.get_token_payload(refreshed["access_token"])["role"] == "admin"
+        with pytest.raises(ValueError):
+            await handler.ajwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token")
+        assert await handler.ajwt_logout("testuser") is True
+
+    asyncio.run(lifecycle())
+
+
+def test_async_services_call_blocking_revocation_stores_in_a_thread(async_db):
+    import threading
+    from fastapi_jwtauth.jwtauth.core import MemoryRevocationStore
+
+    class BlockingStore(MemoryRevocationStore):
+        blocking = True
+        threads = []
+
+        def revoke_many(self, entries):
+            self.threads.append(threading.get_ident())
+            super().revoke_many(entries)
+
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30,
+                             revocation_store=BlockingStore())
+
+    async def lifecycle():
+        await acreate_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                            "firstname": "Test", "lastname": "User"})
+        tokens = await handler.ajwt_generate_token("testuser", "password")
+        await handler.ajwt_logout("testuser")
+        return tokens
+
+    tokens = asyncio.run(lifecycle())
+    assert BlockingStore.threads and threading.get_ident() not in BlockingStore.threads
+    assert handler.jwt_token_validate(tokens["access_token"]) is False
@@ -0,0 +1,55 @@
+import io
+import json
+import subprocess
+import sys
+import pytest
+from fastapi_jwtauth.jwtauth.core import BcryptHasher, configure_password_hasher, hash_password
+from fastapi_jwtauth.jwtauth.services import bulk_create_users, check_login, create_user, read_users
+
+
+@pytest.fixture
+def fast_hasher():
+    configure_password_hasher(BcryptHasher(rounds=4))
+    yield
+    configure_password_hasher(BcryptHasher())
+
+
+def user_row(name, **fields):
+    return {"username": name, "email": f"{name}@example.com", "password": "password",
+            "firstname": "Test", "lastname": "User", **fields}
+
+
+def test_bulk_create_users(jwt_db, fast_hasher):
+    create_user(user_row("existing"))
+    rows = [user_row(f"user{i}") for i in range(5)]
+    rows += [user_row("existing"),                                    # taken in the database
+             user_row("user1"),                                       # repeated in the file
+             user_row("other", email="user2@example.com"),            # email taken in the file
+             user_row("", email="nobody@example.com"),                # invalid
+             user_row("migrated", password=None, password_hash=hash_password("secret"))]
+    progress = []
+    report = bulk_create_users(rows, chunk_size=3, workers=2, use_processes=False, progress=progress.append)
+    assert (report["read"], report["created"], report["skipped"], report["invalid"]) == (10, 6, 3, 1)
+    assert report["errors"] == [(9, "missing username")]
+    assert len(progress) == 4
+    assert check_login("user4", "password")
+    assert check_login("migrated", "secret")
+
+
+def test_read_users_formats():
+    csv_file = io.StringIO("username,email,password,firstname,lastname\na,a@example.com,pw,A,B\n")
+    jsonl_file = io.StringIO(json.dumps(user_row("b")) + "\n\n")
+    assert next(read_users(csv_file, "csv"))["username"] == "a"
+    assert [row["username"] for row in read_users(jsonl_file, "jsonl")] == ["b"]
+    with pytest.raises(ValueError):
+        list(read_users(io.StringIO(""), "xml"))
+
+
+def test_cli_import(tmp_path):
+    source = tmp_path / "users.jsonl"
+    source.write_text("\n".join(json.dumps(user_row(f"cli{i}")) for i in range(3)))
+    result = subprocess.run([sys.executable, "-m", "fastapi_jwtauth.jwtauth.cli", "import-users",
+                             "--database-url", f"sqlite:///{tmp_path / 'users.db'}", "--create-tables",
+                             "--workers", "2", "--quiet", str(source)],
+                            capture_output=True, text=True, check=True)
+    assert "created 3" in result.stdout
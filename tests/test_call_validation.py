@@ -0,0 +1,23 @@
+import pytest
+from pydantic import ValidationError
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+def test_arguments_are_validated_by_default():
+    handler = JWTAuthHandler(SECRET, "HS256", 15, 30)
+    with pytest.raises(ValidationError):
+        handler.jwt_token_validate(123)
+    with pytest.raises(ValidationError):
+        handler.get_token_payload("token", ignore_expiry="not-a-bool")
+
+
+def test_trusted_validate_skips_argument_validation():
+    handler = JWTAuthHandler(SECRET, "HS256", 15, 30, trusted_validate=True)
+    token = handler.keyring.encode({"sub": "testuser"})
+    assert handler.jwt_token_validate(token) is True
+    assert handler.jwt_token_validate(123) is False
+    # Other handlers keep validating.
+    with pytest.raises(ValidationError):
+        JWTAuthHandler(SECRET, "HS256").jwt_token_validate(123)
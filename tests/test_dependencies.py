@@ -0,0 +1,61 @@
+import jwt
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from fastapi_jwtauth.jwtauth.utils import JWTAuthMiddleware, jwt_claims_dependency
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+def make_app(handler, middleware):
+    app = FastAPI()
+    if middleware:
+        app.add_middleware(JWTAuthMiddleware, handler=handler)
+    claims = jwt_claims_dependency(handler)
+    optional_claims = jwt_claims_dependency(handler, auto_error=False)
+
+    def role(claims=Depends(claims)):
+        return claims.get("role")
+
+    @app.get("/me")
+    def me(request: Request, claims=Depends(claims), role=Depends(role), optional=Depends(optional_claims)):
+        return {"sub": claims["sub"], "role": role, "same": optional is request.state.jwt_claims}
+
+    @app.get("/public")
+    def public(claims=Depends(optional_claims)):
+        return {"authenticated": claims is not None}
+
+    return app
+
+
+def count_decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    return calls
+
+
+def test_token_is_verified_once_per_request(monkeypatch):
+    handler = JWTAuthHandler(SECRET, "HS256")
+    token = handler.keyring.encode({"sub": "testuser", "role": "admin"})
+    for middleware in (True, False):
+        client = TestClient(make_app(handler, middleware))
+        calls = count_decodes(monkeypatch)
+        response = client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.json() == {"sub": "testuser", "role": "admin", "same": True}
+        assert len(calls) == 1
+
+
+def test_missing_or_invalid_token():
+    handler = JWTAuthHandler(SECRET, "HS256")
+    client = TestClient(make_app(handler, middleware=True))
+    response = client.get("/me", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+    assert client.get("/me").status_code == 401
+    assert client.get("/public").json() == {"authenticated": False}
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import pytest
+from fastapi_jwtauth.jwtauth.core import (PasswordHashPool,
+                                          HashPoolBusyError,
+                                          hash_password)
+
+
+def test_hash_pool_verifies_passwords():
+    pool = PasswordHashPool(max_workers=1)
+    hashed = hash_password("password")
+    assert pool.verify("password", hashed) is True
+    assert pool.verify("wrong", hashed) is False
+    pool.shutdown()
+
+
+def test_hash_pool_async_verify():
+    pool = PasswordHashPool(max_workers=1)
+    hashed = hash_password("password")
+    assert asyncio.run(pool.averify("password", hashed)) is True
+    pool.shutdown()
+
+
+def test_hash_pool_rejects_when_full():
+    pool = PasswordHashPool(max_workers=1, max_pending=1)
+    gate = threading.Event()
+    future = pool.submit(gate.wait)
+    with pytest.raises(HashPoolBusyError):
+        pool.submit(gate.wait)
+    gate.set()
+    future.result()
+    # The pending count drops in a done-callback that may run after result() returns.
+    pool.shutdown()
+    assert pool.stats()["rejected"] == 1
+    assert pool.pending == 0
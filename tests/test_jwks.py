@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from fastapi_jwtauth.jwtauth.core import JWKSVerifier, KeyRing
+from fastapi_jwtauth.jwtauth.utils import jwks_endpoint
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+@pytest.fixture
+def jwks_server():
+    """A local HTTP stand-in for the auth service's JWKS endpoint."""
+    ring = KeyRing("ES256")
+    ring.add_key("k1", ec.generate_private_key(ec.SECP256R1()))
+    server_state = {"ring": ring, "requests": [], "max_age": 300}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(server_state["ring"].jwks()).encode()
+            etag = f'"{hashlib.sha256(body).hexdigest()}"'
+            server_state["requests"].append(self.headers.get("If-None-Match"))
+            self.send_response(304 if self.headers.get("If-None-Match") == etag else 200)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={server_state['max_age']}")
+            self.send_header("Content-Length", "0" if self.headers.get("If-None-Match") == etag else str(len(body)))
+            self.end_headers()
+            if self.headers.get("If-None-Match") != etag:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server_state["url"] = f"http://127.0.0.1:{server.server_address[1]}/.well-known/jwks.json"
+    yield server_state
+    server.shutdown()
+    server.server_close()
+
+
+def test_jwks_publishes_only_public_keys():
+    ring = KeyRing("RS256")
+    ring.add_key("rsa", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    ring.add_key("hmac", b"secret-key-that-must-never-leave!", algorithm="HS256")
+    (jwk,) = ring.jwks()["keys"]
+    assert (jwk["kid"], jwk["alg"], jwk["kty"], jwk["use"]) == ("rsa", "RS256", "RSA", "sig")
+    assert "d" not in jwk
+
+    client = TestClient(FastAPI())
+    client.app.add_api_route("/.well-known/jwks.json", jwks_endpoint(JWTAuthHandler(None, "RS256", keyring=ring)))
+    response = client.get("/.well-known/jwks.json")
+    assert response.json() == ring.jwks()
+    assert response.headers["cache-control"] == "public, max-age=300"
+    cached = client.get("/.well-known/jwks.json", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_verifier_caches_and_revalidates(jwks_server, monkeypatch):
+    ring = jwks_server["ring"]
+    verifier = JWKSVerifier(jwks_server["url"], min_refresh_interval=0)
+    token = ring.encode({"sub": "user"})
+    assert verifier.verify(token)["sub"] == "user"
+    assert verifier.validate(token)
+    assert jwks_server["requests"] == [None]
+
+    # Once the max-age has passed the keys are revalidated with the ETag.
+    monkeypatch.setattr(verifier, "_expires_at", 0.0)
+    assert verifier.validate(token)
+    assert len(jwks_server["requests"]) == 2 and jwks_server["requests"][1] is not None
+    assert not verifier.validate(token + "x")
+
+
+def test_unknown_kid_refetches_at_most_once_per_interval(jwks_server):
+    ring = jwks_server["ring"]
+    verifier = JWKSVerifier(jwks_server["url"], min_refresh_interval=60)
+    assert verifier.validate(ring.encode({"sub": "user"}))
+
+    ring.rotate("k2", ec.generate_private_key(ec.SECP256R1()))
+    rotated = ring.encode({"sub": "user"})
+    # The first fetch happened just now, so the unknown kid does not refetch yet.
+    assert not verifier.validate(rotated)
+    assert verifier.fetches == 1
+
+    verifier._last_fetch -= 60
+    assert verifier.validate(rotated)
+    forged = KeyRing("ES256")
+    forged.add_key("k3", ec.generate_private_key(ec.SECP256R1()))
+    for _ in range(5):
+        assert not verifier.validate(forged.encode({"sub": "user"}))
+    assert verifier.fetches == 2
+
+
+def test_unreachable_jwks():
+    verifier = JWKSVerifier("http://127.0.0.1:9/jwks.json", timeout=0.5)
+    with pytest.raises(RuntimeError):
+        verifier.validate(KeyRing.from_secret(b"x" * 32).encode({"sub": "user"}))
+
+
+def test_unreachable_jwks_is_fetched_once_per_interval():
+    verifier = JWKSVerifier("http://127.0.0.1:9/jwks.json", timeout=0.5)
+    token = KeyRing.from_secret(b"x" * 32).encode({"sub": "user"})
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            verifier.validate(token)
+    assert verifier.fetches == 1
+
+
+@pytest.mark.parametrize("document", [[], {"keys": {}}, {"keys": ["not-a-key"]}])
+def test_malformed_jwks_is_rejected(document):
+    from fastapi_jwtauth.jwtauth.core.jwks import keyring_from_jwks
+    with pytest.raises(ValueError):
+        keyring_from_jwks(document)
@@ -0,0 +1,67 @@
+import time
+import jwt
+import jwt.algorithms
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from fastapi_jwtauth.jwtauth.core import KeyRing
+
+
+def pem(private_key):
+    return private_key.private_bytes(serialization.Encoding.PEM,
+                                     serialization.PrivateFormat.PKCS8,
+                                     serialization.NoEncryption())
+
+
+def payload():
+    return {"sub": "testuser", "exp": int(time.time()) + 60}
+
+
+@pytest.mark.parametrize("algorithm, private_key", [
+    ("RS256", rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+    ("ES256", ec.generate_private_key(ec.SECP256R1())),
+    ("EdDSA", ed25519.Ed25519PrivateKey.generate()),
+])
+def test_asymmetric_keys_are_parsed_once(monkeypatch, algorithm, private_key):
+    ring = KeyRing(algorithm)
+    ring.add_key("k1", pem(private_key))
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError("PEM must not be parsed again")
+
+    monkeypatch.setattr(jwt.algorithms, "load_pem_private_key", fail_load)
+    monkeypatch.setattr(jwt.algorithms, "load_pem_public_key", fail_load)
+    token = ring.encode(payload())
+    assert jwt.get_unverified_header(token)["kid"] == "k1"
+    assert ring.decode(token)["sub"] == "testuser"
+
+
+def test_rotation_keeps_old_tokens_valid_during_overlap():
+    ring = KeyRing("HS256")
+    ring.add_key("old", "old-secret-key-with-enough-length!")
+    old_token = ring.encode(payload())
+    ring.rotate("new", "new-secret-key-with-enough-length!", overlap=60)
+    new_token = ring.encode(payload())
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert ring.decode(old_token)["sub"] == "testuser"
+
+    ring.rotate("newer", "newer-secret-key-with-enough-len!", overlap=0)
+    with pytest.raises(jwt.InvalidTokenError):
+        ring.decode(old_token)
+    with pytest.raises(jwt.InvalidTokenError):
+        ring.decode(new_token)
+
+
+def test_verify_only_key_and_algorithm_pinning():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    signer = KeyRing("RS256")
+    signer.add_key("k1", private_key)
+    verifier = KeyRing("RS256")
+    verifier.add_key("k1", None, public_key=private_key.public_key())
+    token = signer.encode(payload())
+    assert verifier.decode(token)["sub"] == "testuser"
+    with pytest.raises(RuntimeError):
+        verifier.encode(payload())
+    forged = jwt.encode(payload(), "not-the-key-but-long-enough-hs256!", algorithm="HS256", headers={"kid": "k1"})
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.decode(forged)
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import textwrap
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(code)],
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_validate_only_path_needs_no_database_or_bcrypt():
+    output = run_python("""
+        import sys
+        # Make the heavy dependencies unimportable.
+        sys.modules["sqlalchemy"] = None
+        sys.modules["bcrypt"] = None
+        import jwt
+        from fastapi_jwtauth.jwtauth.core.validation import TokenValidator
+        from fastapi_jwtauth.jwtauth.core.jwks import JWKSVerifier
+
+        secret = "validate-only-secret-of-32-bytes!"
+        validator = TokenValidator(secret)
+        print(validator.validate(jwt.encode({"sub": "user"}, secret)), validator.validate("garbage"))
+    """)
+    assert output.split() == ["True", "False"]
+
+
+def test_packages_import_before_configure_db():
+    output = run_python("""
+        import sys
+        from fastapi_jwtauth.jwtauth import core, models, services, utils
+        from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+        handler = JWTAuthHandler("handler-secret-key-of-32-bytes!!", "HS256")
+        print("fastapi_jwtauth.jwtauth.models.base" in sys.modules)
+        try:
+            models.Users
+        except RuntimeError:
+            print("unconfigured")
+    """)
+    assert output.split() == ["False", "unconfigured"]
@@ -0,0 +1,72 @@
+import bcrypt
+import pytest
+from sqlalchemy import event
+from fastapi_jwtauth.jwtauth.services import create_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+@pytest.fixture
+def handler(jwt_db):
+    create_user({"username": "testuser",
+                 "password": "password",
+                 "email": "test@example.com",
+                 "firstname": "Test",
+                 "lastname": "User"})
+    return JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30)
+
+
+@pytest.fixture
+def counters(jwt_db, monkeypatch):
+    counts = {"hash": 0, "queries": 0, "user_lookups": 0, "commits": 0}
+    checkpw = bcrypt.checkpw
+
+    def counting_checkpw(*args):
+        counts["hash"] += 1
+        return checkpw(*args)
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["queries"] += 1
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            counts["user_lookups"] += 1
+
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    monkeypatch.setattr(bcrypt, "checkpw", counting_checkpw)
+    event.listen(jwt_db, "before_cursor_execute", on_execute)
+    event.listen(jwt_db, "commit", on_commit)
+    yield counts
+    event.remove(jwt_db, "before_cursor_execute", on_execute)
+    event.remove(jwt_db, "commit", on_commit)
+
+
+def test_login_hashes_once(handler, counters):
+    tokens = handler.jwt_generate_token("testuser", "password")
+    assert "access_token" in tokens
+    assert counters["hash"] == 1
+    assert counters["user_lookups"] == 1
+    assert counters["commits"] == 1
+    # user lookup, one UPDATE expiring previous sessions, one INSERT
+    assert counters["queries"] == 3
+
+
+def test_login_rejects_bad_password(handler, counters):
+    with pytest.raises(ValueError):
+        handler.jwt_generate_token("testuser", "wrong")
+    assert counters["hash"] == 1
+    assert counters["commits"] == 0
+
+
+def test_max_sessions_per_user(handler):
+    from fastapi_jwtauth.jwtauth.db.database import db_config
+    from fastapi_jwtauth.jwtauth.models import JwtTokens
+
+    handler.max_sessions_per_user = 2
+    for _ in range(3):
+        handler.jwt_generate_token("testuser", "password")
+    session = db_config.get_session()()
+    try:
+        active = session.query(JwtTokens).filter_by(is_active=True).order_by(JwtTokens.id).all()
+        assert [token.id for token in active] == [2, 3]
+    finally:
+        session.close()
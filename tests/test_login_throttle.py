@@ -0,0 +1,87 @@
+import asyncio
+import time
+import bcrypt
+import pytest
+from sqlalchemy import event
+from fastapi_jwtauth.jwtauth.core import (LoginThrottle,
+                                          LoginThrottledError,
+                                          MemoryThrottleStore,
+                                          RateLimit,
+                                          RedisThrottleStore)
+from fastapi_jwtauth.jwtauth.services import create_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+@pytest.fixture
+def handler(jwt_db):
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    throttle = LoginThrottle(per_username=RateLimit(2, 60), per_client=RateLimit(3, 60))
+    return JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30, login_throttle=throttle)
+
+
+def test_rejected_attempts_do_no_db_or_hash_work(handler, jwt_db, monkeypatch):
+    work = []
+    checkpw = bcrypt.checkpw
+    monkeypatch.setattr(bcrypt, "checkpw", lambda *args: work.append("hash") or checkpw(*args))
+    on_execute = lambda *args: work.append("query")
+    event.listen(jwt_db, "before_cursor_execute", on_execute)
+    try:
+        handler.jwt_generate_token("testuser", "password", client_key="10.0.0.1")
+        with pytest.raises(ValueError):
+            handler.jwt_generate_token("TestUser", "wrong", client_key="10.0.0.2")
+        work.clear()
+        with pytest.raises(LoginThrottledError) as raised:
+            handler.jwt_generate_token("testuser", "password", client_key="10.0.0.3")
+        assert work == []
+    finally:
+        event.remove(jwt_db, "before_cursor_execute", on_execute)
+    assert raised.value.limit == "username"
+    assert 0 < raised.value.retry_after <= 30
+    assert handler.login_throttle.stats() == {"allowed": 2, "rejected": 1, "rejected_client": 0,
+                                              "rejected_username": 1, "rejected_global": 0}
+
+
+def test_blocked_client_does_not_drain_username_budgets(handler):
+    throttle = handler.login_throttle
+    for username in ("a", "b", "c"):
+        with pytest.raises(ValueError):
+            handler.jwt_generate_token(username, "guess", client_key="attacker")
+    with pytest.raises(LoginThrottledError) as raised:
+        handler.jwt_generate_token("testuser", "guess", client_key="attacker")
+    assert raised.value.limit == "client"
+    assert throttle.remaining("testuser")["username"] == pytest.approx(2, abs=0.01)
+    assert asyncio.run(handler.ajwt_generate_token("testuser", "password", client_key="user"))["access_token"]
+
+
+def test_buckets_refill_and_global_limit():
+    throttle = LoginThrottle(per_username=None, per_client=None, global_limit=RateLimit(2, 0.2),
+                             store=MemoryThrottleStore(max_keys=10))
+    throttle.check("a")
+    throttle.check("b")
+    with pytest.raises(LoginThrottledError):
+        throttle.check("c")
+    time.sleep(0.15)
+    assert throttle.check("c")["global"] <= 1
+
+
+class FakeRedis:
+    """Records the bucket script calls and answers like the script does."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def eval(self, script, numkeys, *args):
+        self.calls.append((numkeys, args))
+        return self.answers.pop(0)
+
+
+def test_redis_store():
+    client = FakeRedis([[1, b"4", b"0"], [0, b"0.5", b"6.25"]])
+    throttle = LoginThrottle(per_client=None, per_username=RateLimit(5, 60), store=RedisThrottleStore(client))
+    assert throttle.check("Alice") == {"username": 4.0}
+    with pytest.raises(LoginThrottledError) as raised:
+        throttle.check("alice")
+    assert raised.value.retry_after == 6.25
+    assert client.calls[0] == (1, ("jwtauth:throttle:user:alice", 5, 5 / 60, 1.0))
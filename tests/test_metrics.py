@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import contextmanager
+import pytest
+from fastapi_jwtauth.jwtauth.core import (Instrumentation,
+                                          MetricsRegistry,
+                                          OpenTelemetryInstrumentation,
+                                          configure_instrumentation)
+from fastapi_jwtauth.jwtauth.services import create_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+@pytest.fixture
+def handler(jwt_db):
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    return JWTAuthHandler(SECRET, "HS256", 15, 30)
+
+
+@pytest.fixture
+def registry():
+    registry = configure_instrumentation(MetricsRegistry())
+    yield registry
+    configure_instrumentation(None)
+
+
+def test_login_records_stages_and_queries(handler, registry):
+    tokens = handler.jwt_generate_token("testuser", "password")
+    assert handler.jwt_token_validate(tokens["access_token"])
+    assert not handler.jwt_token_validate("not-a-token")
+    stages = registry.snapshot()["stages"]
+    assert stages[("login", "ok")]["count"] == 1
+    assert stages[("password.verify", "ok")]["count"] == 1
+    assert stages[("token.encode", "ok")]["count"] == 1
+    assert stages[("db.commit", "ok")]["count"] >= 1
+    assert stages[("validate", "ok")]["count"] == 2
+    assert registry.counter("db_queries", operation="login") >= 3
+    assert registry.counter("tokens_rejected", reason="invalid") == 1
+
+
+def test_failed_operations_are_recorded_as_errors(handler, registry):
+    with pytest.raises(ValueError):
+        handler.jwt_generate_token("testuser", "wrong")
+    assert registry.snapshot()["stages"][("login", "error")]["count"] == 1
+
+
+def test_async_variant_is_recorded_once(handler, registry):
+    tokens = asyncio.run(handler.ajwt_generate_token("testuser", "password"))
+    asyncio.run(handler.ajwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token"))
+    stages = registry.snapshot()["stages"]
+    assert stages[("login", "ok")]["count"] == 1
+    assert stages[("refresh", "ok")]["count"] == 1
+
+
+def test_render_prometheus_text(registry):
+    registry.record_stage("login", 0.002, True, {})
+    registry.increment("db_queries", operation="login")
+    text = registry.render()
+    assert 'jwtauth_stage_seconds_bucket{stage="login",outcome="ok",le="0.0025"} 1' in text
+    assert 'jwtauth_stage_seconds_count{stage="login",outcome="ok"} 1' in text
+    assert "# TYPE jwtauth_db_queries_total counter" in text
+    assert 'jwtauth_db_queries_total{operation="login"} 1.0' in text
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        self.spans.append(name)
+        yield name
+
+
+def test_opentelemetry_spans_wrap_operations_and_stages(handler):
+    tracer = FakeTracer()
+    metrics = MetricsRegistry()
+    configure_instrumentation(OpenTelemetryInstrumentation(tracer=tracer, metrics=metrics))
+    try:
+        handler.jwt_generate_token("testuser", "password")
+    finally:
+        configure_instrumentation(None)
+    assert tracer.spans[0] == "jwtauth.login"
+    assert "jwtauth.password.verify" in tracer.spans
+    assert metrics.snapshot()["stages"][("login", "ok")]["count"] == 1
+
+
+def test_default_instrumentation_is_disabled(handler):
+    instrumentation = configure_instrumentation(None)
+    assert type(instrumentation) is Instrumentation and not instrumentation.enabled
+    assert handler.jwt_generate_token("testuser", "password")["access_token"]
@@ -0,0 +1,73 @@
+import jwt
+from sqlalchemy import create_engine, inspect, text
+from fastapi_jwtauth.jwtauth.db.migrations import upgrade_token_storage
+from fastapi_jwtauth.jwtauth.models import token_digest
+
+LEGACY_SCHEMA = (
+    """CREATE TABLE users (id INTEGER PRIMARY KEY, firstname VARCHAR(100) NOT NULL,
+       lastname VARCHAR(100) NOT NULL, username VARCHAR(100) NOT NULL, password VARCHAR(100) NOT NULL,
+       scopes VARCHAR(100), email VARCHAR(100) NOT NULL, is_active BOOLEAN NOT NULL,
+       created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)""",
+    """CREATE TABLE jwttokens (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+       access_token VARCHAR(1000) NOT NULL, refresh_token VARCHAR(1000) NOT NULL,
+       access_expiry_time DATETIME NOT NULL, refresh_expiry_time DATETIME NOT NULL,
+       is_revoked BOOLEAN NOT NULL, revoked_at DATETIME, status VARCHAR(7) NOT NULL,
+       is_active BOOLEAN NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)""",
+)
+
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+def legacy_engine(tokens):
+    """An SQLite database in the pre-digest layout holding (access, refresh) token rows."""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users VALUES (1, 'T', 'U', 'testuser', 'x', NULL, 't@e.com', 1, "
+                          "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"))
+        for i, (access, refresh) in enumerate(tokens):
+            conn.execute(text("INSERT INTO jwttokens VALUES (:id, 1, :access, :refresh, CURRENT_TIMESTAMP, "
+                              "CURRENT_TIMESTAMP, 0, NULL, 'EXPIRED', 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"),
+                         {"id": i + 1, "access": access, "refresh": refresh})
+    return engine
+
+
+def test_upgrade_token_storage_backfills_digests():
+    access_token = jwt.encode({"sub": "testuser", "exp": 1, "role": "admin"}, SECRET, algorithm="HS256")
+    engine = legacy_engine([(f"{access_token}{i}", f"refresh-{i}") for i in range(3)])
+
+    result = upgrade_token_storage(engine, batch_size=2)
+    assert result["rows_migrated"] == 3
+    assert result["duplicates_removed"] == 0
+
+    columns = {column["name"] for column in inspect(engine).get_columns("jwttokens")}
+    assert "access_token" not in columns and "refresh_token" not in columns
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("jwttokens")}
+    assert indexes["ix_jwttokens_refresh_token_digest"]["unique"]
+    assert "ix_jwttokens_user_id_is_active" in indexes
+    user_indexes = {index["name"]: index for index in inspect(engine).get_indexes("users")}
+    assert user_indexes["ix_users_username"]["unique"]
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT refresh_token_digest, claims FROM jwttokens WHERE id = 1")).one()
+    assert row.refresh_token_digest == token_digest("refresh-0")
+    assert '"role": "admin"' in row.claims
+
+    assert upgrade_token_storage(engine) == {"rows_migrated": 0, "duplicates_removed": 0, "indexes_created": 0}
+
+
+def test_upgrade_token_storage_keeps_newest_of_duplicate_tokens():
+    # Before tokens carried a jti, two logins in the same second issued the same access token.
+    access_token = jwt.encode({"sub": "testuser", "exp": 1}, SECRET, algorithm="HS256")
+    engine = legacy_engine([(access_token, "refresh-0"), (access_token, "refresh-1"), ("other", "refresh-2")])
+
+    result = upgrade_token_storage(engine)
+    assert result == {"rows_migrated": 3, "duplicates_removed": 1, "indexes_created": result["indexes_created"]}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id FROM jwttokens ORDER BY id")).scalars().all() == [2, 3]
+    columns = {column["name"]: column for column in inspect(engine).get_columns("jwttokens")}
+    assert "access_token" not in columns
+    assert not columns["access_token_digest"]["nullable"] and not columns["refresh_token_digest"]["nullable"]
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("jwttokens")}
+    assert indexes["ix_jwttokens_access_token_digest"]["unique"]
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from fastapi_jwtauth.jwtauth.core import (BcryptHasher,
+                                          ScryptHasher,
+                                          Argon2Hasher,
+                                          configure_password_hasher,
+                                          hash_password,
+                                          needs_rehash,
+                                          verify_password)
+from fastapi_jwtauth.jwtauth.services import create_user, check_login, get_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+@pytest.fixture
+def hasher():
+    yield
+    configure_password_hasher(BcryptHasher())
+
+
+def test_scrypt_hashes_are_self_describing(hasher):
+    configure_password_hasher(ScryptHasher(ln=10))
+    hashed = hash_password("password")
+    assert hashed.startswith("$scrypt$ln=10,r=8,p=1$")
+    assert verify_password("password", hashed) and not verify_password("wrong", hashed)
+    assert not needs_rehash(hashed)
+    configure_password_hasher(ScryptHasher(ln=11))
+    assert verify_password("password", hashed)
+    assert needs_rehash(hashed)
+
+
+def test_argon2(hasher):
+    pytest.importorskip("argon2")
+    configure_password_hasher(Argon2Hasher(time_cost=1, memory_cost=1024, parallelism=1))
+    hashed = hash_password("password")
+    assert hashed.startswith("$argon2id$")
+    assert verify_password("password", hashed) and not verify_password("wrong", hashed)
+
+
+def test_outdated_hash_is_upgraded_on_login(jwt_db, hasher):
+    configure_password_hasher(BcryptHasher(rounds=4))
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    old_hash = get_user("testuser").password
+    assert old_hash.startswith("$2b$04$")
+
+    configure_password_hasher(BcryptHasher(rounds=5))
+    assert check_login("testuser", "wrong") is False
+    assert get_user("testuser").password == old_hash
+    assert check_login("testuser", "password")
+    assert get_user("testuser").password.startswith("$2b$05$")
+
+    configure_password_hasher(ScryptHasher(ln=10))
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30)
+    asyncio.run(handler.ajwt_generate_token("testuser", "password"))
+    upgraded = get_user("testuser").password
+    assert upgraded.startswith("$scrypt$ln=10,")
+    assert check_login("testuser", "password")
+    assert get_user("testuser").password == upgraded
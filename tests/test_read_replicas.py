@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi_jwtauth.jwtauth.db.database import ReplicaSet, db_config
+from fastapi_jwtauth.jwtauth.models import Users
+from fastapi_jwtauth.jwtauth.services import check_login, configure_user_cache, create_user, get_user, update_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+USER = {"username": "testuser",
+        "password": "password",
+        "email": "test@example.com",
+        "firstname": "Test",
+        "lastname": "User"}
+
+
+def make_replica(primary):
+    """An in-memory database holding a copy of the primary's users table."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db_config.Base.metadata.create_all(bind=engine)
+    with primary.connect() as source, engine.begin() as target:
+        rows = source.execute(select(Users.__table__)).mappings().all()
+        if rows:
+            target.execute(Users.__table__.insert(), [dict(row) for row in rows])
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def replicas(jwt_db):
+    create_user(dict(USER))
+    yield lambda factories, strategy="round_robin": setattr(db_config, "readers", ReplicaSet(factories, strategy))
+    db_config.readers = None
+    db_config._recent_writes.clear()
+
+
+def test_reads_go_to_replicas_and_writes_to_primary(replicas, jwt_db):
+    replicas([make_replica(jwt_db)])
+    # A write by another process that has not replicated yet.
+    with jwt_db.begin() as conn:
+        conn.execute(text("UPDATE users SET email = 'new@example.com'"))
+    assert get_user("testuser").email == "test@example.com"
+    with db_config.primary_reads():
+        assert get_user("testuser").email == "new@example.com"
+    assert db_config.readers.stats()["reads"] == 1
+
+
+def test_round_robin_and_least_loaded_selection(replicas, jwt_db):
+    replicas([make_replica(jwt_db), make_replica(jwt_db)])
+    assert [db_config.readers.candidates()[0] for _ in range(4)] == [0, 1, 0, 1]
+    replicas([make_replica(jwt_db), make_replica(jwt_db)], "least_loaded")
+    with db_config.session_scope(replica=True):
+        assert db_config.readers.stats()["open_sessions"] == [1, 0]
+        assert db_config.readers.candidates() == [1, 0]
+    assert db_config.readers.stats()["open_sessions"] == [0, 0]
+
+
+def test_unhealthy_replicas_fall_back_to_primary(replicas, jwt_db, tmp_path):
+    unreachable = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path}/missing/replica.db"))
+    replicas([unreachable])
+    assert get_user("testuser").email == "test@example.com"
+    assert get_user("testuser").email == "test@example.com"
+    stats = db_config.readers.stats()
+    # The failing replica is skipped after its first error.
+    assert stats["failures"] == 1 and stats["healthy"] == 0
+    assert stats["fallbacks"] == 2 and stats["reads"] == 0
+
+
+def test_refresh_rotation_stays_on_primary(replicas, jwt_db):
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30)
+    tokens = handler.jwt_generate_token("testuser", "password")
+    # A replica that has lost the user cannot serve the rotation.
+    replica = make_replica(jwt_db)
+    with replica() as session, session.begin():
+        session.query(Users).delete()
+    replicas([replica])
+    assert handler.jwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token")["access_token"]
+
+
+def test_writes_are_rejected_inside_a_replica_scope(replicas, jwt_db):
+    replicas([make_replica(jwt_db)])
+    with pytest.raises(RuntimeError):
+        with db_config.session_scope(replica=True):
+            update_user("testuser", {"email": "new@example.com"})
+    assert get_user("testuser").email == "test@example.com"
+
+
+def test_changed_password_applies_before_replication(replicas, jwt_db):
+    replicas([make_replica(jwt_db)])
+    update_user("testuser", {"password": "new-password"})
+    assert check_login("testuser", "password") is False
+    assert check_login("testuser", "new-password")
+
+
+def test_new_user_can_log_in_before_replication(replicas, jwt_db):
+    replicas([make_replica(jwt_db)])
+    create_user(dict(USER, username="newuser", email="new@example.com"))
+    assert get_user("newuser") is not None
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30)
+    assert handler.jwt_generate_token("newuser", "password")["access_token"]
+
+
+def test_user_cache_is_not_filled_from_a_lagging_replica(replicas, jwt_db):
+    replicas([make_replica(jwt_db)])
+    configure_user_cache()
+    try:
+        assert get_user("testuser").email == "test@example.com"
+        update_user("testuser", {"email": "new@example.com"})
+        assert get_user("testuser").email == "new@example.com"
+        assert get_user("testuser").email == "new@example.com"
+    finally:
+        configure_user_cache(maxsize=0)
@@ -0,0 +1,111 @@
+import time
+import pytest
+from fastapi_jwtauth.jwtauth.core import MemoryRevocationStore, RedisRevocationStore, token_digest
+from fastapi_jwtauth.jwtauth.services import create_user, SQLRevocationStore
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+
+class FakeRedis:
+    """Minimal stand-in for the redis-py calls the store makes."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, name, value, px=None):
+        self.data[name] = time.time() + px / 1000
+
+    def exists(self, name):
+        return int(self.data.get(name, 0) > time.time())
+
+
+class FakePipelineRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.executed = 0
+
+    def pipeline(self):
+        client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def set(self, *args, **kwargs):
+                self.calls.append((client.set, args, kwargs))
+
+            def exists(self, *args):
+                self.calls.append((client.exists, args, {}))
+
+            def execute(self):
+                client.executed += 1
+                return [call(*args, **kwargs) for call, args, kwargs in self.calls]
+
+        return Pipeline()
+
+
+def test_memory_store_drops_expired_entries():
+    store = MemoryRevocationStore(purge_every=2)
+    store.revoke("live", time.time() + 60)
+    store.revoke("gone", time.time() - 1)
+    assert store.is_revoked("live")
+    assert not store.is_revoked("gone")
+    assert len(store) == 1
+
+
+@pytest.mark.parametrize("client", [FakeRedis(), FakePipelineRedis()])
+def test_redis_store(client):
+    store = RedisRevocationStore(client)
+    store.revoke_many([("a", time.time() + 60), ("b", time.time() - 1)])
+    assert store.is_revoked("a")
+    assert not store.is_revoked("b")
+    assert "jwtauth:revoked:b" not in client.data
+    assert store.revoked_digests(["a", "b"]) == {"a"}
+    if isinstance(client, FakePipelineRedis):
+        assert client.executed == 2
+
+
+@pytest.fixture
+def user(jwt_db):
+    return create_user({"username": "testuser",
+                        "password": "password",
+                        "email": "test@example.com",
+                        "firstname": "Test",
+                        "lastname": "User"})
+
+
+@pytest.mark.parametrize("store_class", [MemoryRevocationStore, SQLRevocationStore])
+def test_logout_revokes_access_token(user, store_class):
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30,
+                             revocation_store=store_class())
+    tokens = handler.jwt_generate_token("testuser", "password")
+    assert handler.jwt_token_validate(tokens["access_token"]) is True
+    handler.jwt_logout("testuser")
+    assert handler.jwt_token_validate(tokens["access_token"]) is False
+    assert handler.revocation_store.is_revoked(token_digest(tokens["refresh_token"]))
+    assert handler.validate_many([tokens["access_token"]]) == [False]
+
+
+def test_refresh_revokes_previous_pair(user):
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30,
+                             revocation_store=MemoryRevocationStore())
+    tokens = handler.jwt_generate_token("testuser", "password")
+    refreshed = handler.jwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token")
+    assert handler.jwt_token_validate(tokens["access_token"]) is False
+    assert handler.jwt_token_validate(refreshed["access_token"]) is True
+
+
+def test_revocations_are_mirrored_after_commit(user):
+    from fastapi_jwtauth.jwtauth.db.database import db_config
+    store = MemoryRevocationStore()
+    handler = JWTAuthHandler("test-secret-key-with-enough-length!", "HS256", 15, 30, revocation_store=store)
+    tokens = handler.jwt_generate_token("testuser", "password")
+    digest = token_digest(tokens["access_token"])
+    with pytest.raises(RuntimeError):
+        with db_config.session_scope():
+            handler.jwt_logout("testuser")
+            assert not store.is_revoked(digest)
+            raise RuntimeError("commit never happens")
+    assert not store.is_revoked(digest)
+    assert handler.jwt_token_validate(tokens["access_token"]) is True
+    handler.jwt_logout("testuser")
+    assert store.is_revoked(digest)
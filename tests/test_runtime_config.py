@@ -0,0 +1,82 @@
+import time
+import jwt
+import pytest
+from sqlalchemy import event
+from fastapi_jwtauth.jwtauth.config import RuntimeConfigStore
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from fastapi_jwtauth.jwtauth.models import EnvVarsModel, JwtAccessTokenPayload
+from fastapi_jwtauth.jwtauth.services import create_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+@pytest.fixture
+def config_rows(jwt_db):
+    with db_config.session_scope() as session:
+        session.add_all([EnvVarsModel(env_name="JWT_ACCESS_TOKEN_EXPIRY", env_value="5"),
+                         EnvVarsModel(env_name="TENANT", env_value="acme"),
+                         JwtAccessTokenPayload(payload_key="tenant", payload_value="acme"),
+                         JwtAccessTokenPayload(payload_key="roles", payload_value=["reader"]),
+                         JwtAccessTokenPayload(payload_key="old", payload_value=1, is_active=False)])
+    yield
+    with db_config.session_scope() as session:
+        session.query(EnvVarsModel).delete()
+        session.query(JwtAccessTokenPayload).delete()
+
+
+@pytest.fixture
+def config_queries(jwt_db):
+    queries = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if "jwt_env_vars" in statement or "jwt_access_token_payload" in statement:
+            queries.append(statement)
+
+    event.listen(jwt_db, "before_cursor_execute", on_execute)
+    yield queries
+    event.remove(jwt_db, "before_cursor_execute", on_execute)
+
+
+def test_snapshot_is_loaded_once_until_bumped(config_rows, config_queries):
+    store = RuntimeConfigStore(refresh_interval=None)
+    config = store.get()
+    assert config.access_token_expiry == 5
+    assert config.algorithm == "HS256"
+    assert config.settings["TENANT"] == "acme"
+    assert dict(config.claims_template) == {"tenant": "acme", "roles": ["reader"]}
+    assert store.get() is config
+    assert len(config_queries) == 2
+
+    store.bump()
+    assert store.get() is not config
+    assert len(config_queries) == 4
+    with pytest.raises(TypeError):
+        config.claims_template["iss"] = "other"
+
+
+def test_snapshot_expires_after_refresh_interval():
+    calls = []
+    store = RuntimeConfigStore(refresh_interval=0.01,
+                               loader=lambda: calls.append(1) or ({}, {}))
+    store.get()
+    store.get()
+    time.sleep(0.02)
+    store.get()
+    assert len(calls) == 2
+
+
+def test_claim_template_is_added_without_querying(config_rows, config_queries):
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    store = RuntimeConfigStore(refresh_interval=None)
+    store.load()
+    config_queries.clear()
+    handler = JWTAuthHandler(SECRET, "HS256", 15, 30, runtime_config=store)
+    tokens = handler.jwt_generate_token("testuser", "password", {"roles": ["admin"]})
+    payload = jwt.decode(tokens["access_token"], SECRET, algorithms=["HS256"])
+    assert payload["tenant"] == "acme"
+    # Per-login data wins over the template, registered claims win over both.
+    assert payload["roles"] == ["admin"]
+    assert payload["sub"] == "testuser"
+    assert config_queries == []
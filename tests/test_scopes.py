@@ -0,0 +1,61 @@
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from fastapi_jwtauth.jwtauth.core import ScopeRegistry
+from fastapi_jwtauth.jwtauth.services import create_user, update_user
+from fastapi_jwtauth.jwtauth.utils import jwt_scopes_dependency
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+def test_registry_masks_and_encodings():
+    registry = ScopeRegistry(["read", "write", "admin"])
+    assert registry.mask("read, admin") == registry.mask(["read", "admin"]) == 0b101
+    assert registry.names(0b101) == ["read", "admin"]
+    with pytest.raises(ValueError):
+        registry.mask("read delete")
+    assert registry.mask("read delete", strict=False) == 0b1
+
+    wide = ScopeRegistry([f"scope{i}" for i in range(200)], encoding="base64")
+    claims = wide.claims(["scope0", "scope199"])
+    assert isinstance(claims["scp"], str)
+    assert wide.scopes_of(claims) == ["scope0", "scope199"]
+    assert wide.require("scope199")(claims)
+    assert not wide.require("scope0", "scope1")(claims)
+
+
+def test_login_embeds_user_scopes_and_refresh_rereads_them(jwt_db):
+    registry = ScopeRegistry(["read", "write", "admin"])
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User", "scopes": "read,write,unknown"})
+    handler = JWTAuthHandler(SECRET, "HS256", 15, 30, scope_registry=registry)
+    tokens = handler.jwt_generate_token("testuser", "password", {"scp": -1})
+    claims = jwt.decode(tokens["access_token"], SECRET, algorithms=["HS256"])
+    assert claims["scp"] == 0b011
+    assert handler.require_scopes("read", "write")(claims)
+    assert not handler.require_scopes("admin")(claims)
+
+    update_user("testuser", {"scopes": "admin"})
+    tokens = handler.jwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token")
+    claims = jwt.decode(tokens["access_token"], SECRET, algorithms=["HS256"])
+    assert registry.scopes_of(claims) == ["admin"]
+
+
+def test_scopes_dependency():
+    handler = JWTAuthHandler(SECRET, "HS256", scope_registry=ScopeRegistry(["read", "write"]))
+    app = FastAPI()
+
+    @app.get("/write")
+    def write(claims=Depends(jwt_scopes_dependency(handler, "write"))):
+        return {"sub": claims["sub"]}
+
+    client = TestClient(app)
+    reader = handler.keyring.encode({"sub": "reader", "scp": 0b01})
+    writer = handler.keyring.encode({"sub": "writer", "scp": 0b11})
+    assert client.get("/write").status_code == 401
+    response = client.get("/write", headers={"Authorization": f"Bearer {reader}"})
+    assert response.status_code == 403
+    assert 'error="insufficient_scope"' in response.headers["www-authenticate"]
+    assert client.get("/write", headers={"Authorization": f"Bearer {writer}"}).json() == {"sub": "writer"}
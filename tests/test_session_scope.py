@@ -0,0 +1,42 @@
+import pytest
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from fastapi_jwtauth.jwtauth.services import create_user, get_user, check_login
+
+
+USER = {"username": "testuser",
+        "password": "password",
+        "email": "test@example.com",
+        "firstname": "Test",
+        "lastname": "User"}
+
+
+def test_services_return_sessions_to_pool(jwt_db):
+    db_config.metrics.reset()
+    create_user(dict(USER))
+    assert get_user("testuser").email == "test@example.com"
+    assert check_login("testuser", "password")
+    metrics = db_config.pool_metrics()
+    assert metrics["sessions_opened"] == metrics["sessions_closed"] == 3
+    assert metrics["checked_out"] == 0
+    assert metrics["wait_count"] == 3
+
+
+def test_nested_calls_share_one_session(jwt_db):
+    create_user(dict(USER))
+    db_config.metrics.reset()
+    with db_config.session_scope() as session:
+        user = get_user("testuser")
+        login_user = check_login("testuser", "password")
+        assert login_user in session
+        assert login_user.id == user.id
+    metrics = db_config.pool_metrics()
+    assert metrics["sessions_opened"] == 1
+    assert metrics["checkouts"] == 1
+
+
+def test_scope_rolls_back_on_error(jwt_db):
+    with pytest.raises(RuntimeError):
+        with db_config.session_scope():
+            create_user(dict(USER))
+            raise RuntimeError("boom")
+    assert get_user("testuser") is None
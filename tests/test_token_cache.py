@@ -0,0 +1,43 @@
+import time
+import jwt
+from fastapi_jwtauth.jwtauth.core import TokenCache
+from fastapi_jwtauth.jwtauth.utils.helpers import validate_token
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+def make_token(sub="testuser", expires_in=60):
+    now = int(time.time())
+    return jwt.encode({"sub": sub, "iat": now, "exp": now + expires_in}, SECRET, algorithm="HS256")
+
+
+def test_repeat_validation_hits_cache(monkeypatch):
+    cache = TokenCache(maxsize=8)
+    token = make_token()
+    assert validate_token(token, SECRET, "HS256", cache=cache) is True
+
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("cached token must not be decoded again")
+
+    monkeypatch.setattr(jwt, "decode", fail_decode)
+    assert validate_token(token, SECRET, "HS256", cache=cache) is True
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_with_token():
+    cache = TokenCache(maxsize=8, ttl=300)
+    token = make_token()
+    cache.put_claims(token, {"sub": "testuser", "exp": time.time() - 1})
+    assert cache.get_claims(token) is None
+
+
+def test_lru_eviction_and_subject_invalidation():
+    cache = TokenCache(maxsize=2)
+    first, second, third = make_token("a"), make_token("b"), make_token("b", 120)
+    for token in (first, second, third):
+        cache.put_claims(token, jwt.decode(token, SECRET, algorithms=["HS256"]))
+    assert cache.get_claims(first) is None
+    assert cache.stats()["evictions"] == 1
+    cache.invalidate_subject("b")
+    assert len(cache) == 0
@@ -0,0 +1,49 @@
+import time
+import jwt
+import pytest
+from fastapi_jwtauth.jwtauth.services import create_user
+from fastapi_jwtauth.jwtauth.utils.jwtauth import JWTAuthHandler
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    return calls
+
+
+def test_expired_payload_is_decoded_once(decodes):
+    handler = JWTAuthHandler(SECRET, "HS256")
+    token = handler.keyring.encode({"sub": "testuser", "exp": int(time.time()) - 5})
+    payload, expired = handler.get_token_payload(token, ignore_expiry=True)
+    assert payload["sub"] == "testuser" and expired is True
+    assert len(decodes) == 1
+    with pytest.raises(ValueError, match="expired"):
+        handler.get_token_payload(token)
+
+    result = handler.inspect_token(handler.keyring.encode({"sub": "testuser", "exp": int(time.time()) + 60}))
+    assert result.expired is False and 55 < result.expires_in <= 60
+
+
+def test_refresh_verifies_access_token_once(jwt_db, decodes):
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    handler = JWTAuthHandler(SECRET, "HS256", 15, 30)
+    tokens = handler.jwt_generate_token("testuser", "password", {"role": "admin"})
+    decodes.clear()
+    refreshed = handler.jwt_refresh_token("testuser", tokens["refresh_token"], "refresh_token",
+                                          access_token=tokens["access_token"])
+    assert len(decodes) == 1
+    assert handler.get_token_payload(refreshed["access_token"])["role"] == "admin"
+
+    with pytest.raises(ValueError, match="belong"):
+        handler.jwt_refresh_token("someone-else", refreshed["refresh_token"], "refresh_token",
+                                  access_token=refreshed["access_token"])
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, UTC
+import pytest
+from sqlalchemy import select
+from fastapi_jwtauth.jwtauth.db.database import db_config
+from fastapi_jwtauth.jwtauth.models import JwtTokens, TokenStatus
+from fastapi_jwtauth.jwtauth.services import SQLRevocationStore, TokenReaper, create_user, get_user
+
+NOW = datetime.now(UTC)
+
+
+def add_token(user_id, name, access_expiry, refresh_expiry, active):
+    with db_config.session_scope() as session:
+        session.add(JwtTokens(user_id=user_id, access_token_digest=f"{name}-access",
+                              refresh_token_digest=f"{name}-refresh",
+                              access_expiry_time=access_expiry, refresh_expiry_time=refresh_expiry,
+                              status=TokenStatus.ACTIVE if active else TokenStatus.EXPIRED, is_active=active))
+
+
+@pytest.fixture
+def token_rows(jwt_db):
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    user_id = get_user("testuser").id
+    add_token(user_id, "live", NOW + timedelta(minutes=5), NOW + timedelta(days=30), True)
+    add_token(user_id, "revoked-valid", NOW + timedelta(minutes=5), NOW + timedelta(days=30), False)
+    for i in range(3):
+        add_token(user_id, f"expired{i}", NOW - timedelta(days=31), NOW - timedelta(days=1), True)
+        add_token(user_id, f"revoked{i}", NOW - timedelta(hours=2), NOW + timedelta(days=29), False)
+
+
+def remaining_digests():
+    with db_config.session_scope(readonly=True) as session:
+        return sorted(session.scalars(select(JwtTokens.access_token_digest)))
+
+
+def test_reaper_purges_in_batches_and_keeps_live_rows(token_rows):
+    archived = []
+    reaper = TokenReaper(batch_size=2, archive=archived.extend)
+    report = reaper.run_once()
+    assert report["purged"] == report["purged_expired"] + report["purged_revoked"] == 6
+    assert report["batches"] == 4
+    assert report["table_rows"] == 2
+    assert len(archived) == 6
+    assert remaining_digests() == ["live-access", "revoked-valid-access"]
+    # The revoked row whose access token is still valid keeps rejecting that token.
+    assert SQLRevocationStore().is_revoked("revoked-valid-access")
+    assert reaper.run_once()["purged"] == 0
+
+
+def test_retention_windows_and_batch_limit(token_rows):
+    report = TokenReaper(expired_retention=timedelta(days=2), revoked_retention=timedelta(hours=1),
+                         batch_size=1).run_once(max_batches=2)
+    assert (report["purged_expired"], report["purged_revoked"], report["batches"]) == (0, 2, 2)
+    report = TokenReaper(expired_retention=timedelta(hours=12), revoked_retention=timedelta(hours=3)).run_once()
+    assert (report["purged_expired"], report["purged_revoked"]) == (3, 0)
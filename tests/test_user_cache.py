@@ -0,0 +1,90 @@
+import threading
+import pytest
+from sqlalchemy import event
+from fastapi_jwtauth.jwtauth.services import (configure_user_cache,
+                                              create_user,
+                                              delete_user,
+                                              get_user,
+                                              update_user,
+                                              UserSnapshot)
+
+
+@pytest.fixture
+def user_cache(jwt_db):
+    cache = configure_user_cache(maxsize=16, ttl=60)
+    yield cache
+    configure_user_cache(maxsize=0)
+
+
+@pytest.fixture
+def user_queries(jwt_db):
+    queries = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            queries.append(statement)
+
+    event.listen(jwt_db, "before_cursor_execute", on_execute)
+    yield queries
+    event.remove(jwt_db, "before_cursor_execute", on_execute)
+
+
+def test_get_user_is_cached_and_invalidated(user_cache, user_queries):
+    assert get_user("testuser") is None
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    user_queries.clear()
+
+    user = get_user("testuser")
+    assert isinstance(user, UserSnapshot)
+    assert get_user("testuser") is user
+    assert len(user_queries) == 1
+
+    update_user("testuser", {"firstname": "Changed", "password": "new-password"})
+    user_queries.clear()
+    updated = get_user("testuser")
+    assert updated.firstname == "Changed"
+    assert updated.password.startswith("$2b$") and updated.password != user.password
+    delete_user("testuser")
+    user_queries.clear()
+    assert get_user("testuser").is_active is False
+    assert len(user_queries) == 1
+
+    stats = user_cache.stats()
+    assert stats["hits"] == 1
+    with pytest.raises(AttributeError):
+        updated.firstname = "Mutated"
+
+
+def test_user_cache_disabled_by_default(jwt_db, user_queries):
+    create_user({"username": "testuser", "password": "password", "email": "test@example.com",
+                 "firstname": "Test", "lastname": "User"})
+    user_queries.clear()
+    get_user("testuser")
+    get_user("testuser")
+    assert len(user_queries) == 2
+
+
+def test_store_after_invalidation_is_dropped(user_cache):
+    snapshot = UserSnapshot(1, "bob", "bob@example.com", "Bob", "User", "hash", None, True)
+    generation = user_cache.generation
+    user_cache.invalidate("bob")
+    user_cache.store("bob", snapshot, generation)
+    assert user_cache.lookup("bob") == (False, None)
+
+
+def test_invalidation_during_store_is_not_lost(user_cache, monkeypatch):
+    snapshot = UserSnapshot(1, "bob", "bob@example.com", "Bob", "User", "hash", None, True)
+    set_entry = type(user_cache).set
+    invalidation = threading.Thread(target=user_cache.invalidate, args=("bob",))
+
+    def set_during_invalidation(self, key, value, expires_at=None):
+        # A concurrent update_user invalidates the user between the generation check and the insert.
+        invalidation.start()
+        invalidation.join(timeout=0.2)
+        set_entry(self, key, value, expires_at)
+
+    monkeypatch.setattr(type(user_cache), "set", set_during_invalidation)
+    user_cache.store("bob", snapshot, user_cache.generation)
+    invalidation.join()
+    assert user_cache.lookup("bob") == (False, None)
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi_jwtauth.jwtauth.core import KeyRing, MemoryRevocationStore, TokenCache, token_digest
+from fastapi_jwtauth.jwtauth.utils.helpers import validate_many
+
+SECRET = "test-secret-key-with-enough-length!"
+
+
+def make_token(sub="testuser", expires_in=60, key=SECRET):
+    now = int(time.time())
+    return jwt.encode({"sub": sub, "iat": now, "exp": now + expires_in}, key, algorithm="HS256")
+
+
+def test_results_follow_input_order_and_duplicates_decode_once(monkeypatch):
+    good, other = make_token("a"), make_token("b")
+    expired, forged = make_token(expires_in=-10), make_token(key="wrong-secret-key-with-enough-length")
+    decode = jwt.decode
+    calls = []
+
+    def counting_decode(token, *args, **kwargs):
+        calls.append(token)
+        return decode(token, *args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    tokens = [good, expired, good, "not-a-jwt", other, forged, good, None]
+    assert validate_many(tokens, SECRET, "HS256") == [True, False, True, False, True, False, True, False]
+    assert calls.count(good) == 1
+
+
+def test_unhashable_items_are_invalid():
+    good = make_token()
+    assert validate_many([good, ["a"], {"token": good}, 42, good], SECRET, "HS256") == [True, False, False, False, True]
+
+
+def test_revoked_and_cached_tokens():
+    revoked, cached, fresh = make_token("a"), make_token("b"), make_token("c")
+    store = MemoryRevocationStore()
+    store.revoke(token_digest(revoked), time.time() + 60)
+    cache = TokenCache()
+    cache.put_claims(cached, {"sub": "b", "exp": time.time() + 60})
+    assert validate_many([revoked, cached, fresh], SECRET, "HS256", cache=cache,
+                         revocation_store=store) == [False, True, True]
+    assert cache.get_claims(fresh) is not None
+
+
+def test_process_pool_fan_out():
+    ring = KeyRing("RS256")
+    ring.add_key("k1", rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    now = int(time.time())
+    tokens = [ring.encode({"sub": f"user{i}", "exp": now + 60}) for i in range(20)]
+    tokens.append(tokens[0][:-4] + "AAAA")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = validate_many(tokens, None, None, keyring=ring, executor=executor)
+    assert results == [True] * 20 + [False]